@@ -0,0 +1,251 @@
+"""Pluggable storage for generated project ZIPs.
+
+Artifacts are content-addressed: the key is the SHA-256 of the ZIP bytes, so
+identical projects are stored once. Two backends are provided:
+
+- LocalDiskStorage keeps ZIPs under a directory on this node and /download
+  streams them with send_file. The directory is bounded by ARTIFACT_MAX_MB:
+  once a new ZIP takes it past that size, the least recently stored or read
+  ZIPs are deleted. Packaging is deterministic, so the apps rebuild a deleted
+  ZIP from the session's recorded configuration under the same key.
+- S3Storage uploads to any S3-compatible service (AWS S3, MinIO, ...) with
+  multipart upload, and /download redirects to a presigned URL so the bytes
+  never pass through the app servers.
+
+Select the backend with ARTIFACT_STORAGE=local|s3 (see get_storage()).
+"""
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+# A prune deletes down to this fraction of max_bytes, so it does not run again on the next put
+PRUNE_TARGET = 0.9
+
+
+def artifact_key(data):
+    """Content address of an artifact."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ArtifactStorage:
+    """Interface shared by the storage backends."""
+
+    def put(self, data):
+        """Store ZIP bytes and return their key."""
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return the stored bytes, or None if the key is unknown."""
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def local_path(self, key):
+        """Path of the artifact on this node, or None if it is not stored locally."""
+        return None
+
+    def download_url(self, key, filename):
+        """URL the client can fetch the artifact from directly, or None to stream it from the app."""
+        return None
+
+
+class LocalDiskStorage(ArtifactStorage):
+    """Content-addressed ZIPs under `root/<first two hex chars>/<key>.zip`.
+
+    With `max_bytes`, the least recently used ZIPs (by modification time, which
+    get() and local_path() refresh) are pruned whenever a put() exceeds it.
+    """
+
+    def __init__(self, root, max_bytes=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.total_bytes = sum(size for _, size, _ in self.blobs())
+
+    def path_for(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.zip")
+
+    def blobs(self):
+        """(mtime, size, path) of every stored ZIP."""
+        with os.scandir(self.root) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith('.zip'):
+                            continue
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        yield stat.st_mtime, stat.st_size, entry.path
+
+    def touch(self, path):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def put(self, data):
+        key = artifact_key(data)
+        path = self.path_for(key)
+        if os.path.exists(path):
+            self.touch(path)
+            return key
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial ZIP
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.total_bytes += len(data)
+            over = self.max_bytes is not None and self.total_bytes > self.max_bytes
+        if over:
+            self.prune(int(self.max_bytes * PRUNE_TARGET), keep=path)
+        return key
+
+    def prune(self, max_bytes, keep=None):
+        """Delete the least recently used ZIPs until at most `max_bytes` remain; returns the bytes freed.
+
+        `keep` is a path that is never deleted, such as the ZIP just stored.
+        """
+        with self.lock:
+            blobs = sorted(self.blobs())
+            total = sum(size for _, size, _ in blobs)
+            freed = 0
+            for _, size, path in blobs:
+                if total - freed <= max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                freed += size
+            self.total_bytes = total - freed
+        return freed
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self.touch(path)
+        return data
+
+    def exists(self, key):
+        return os.path.exists(self.path_for(key))
+
+    def local_path(self, key):
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        self.touch(path)
+        return path
+
+
+class S3Storage(ArtifactStorage):
+    """S3-compatible backend; `endpoint_url` points it at MinIO or another stand-in."""
+
+    def __init__(self, bucket, prefix='artifacts/', endpoint_url=None, region_name=None,
+                 presign_expires=3600, multipart_chunksize=8 * 1024 * 1024):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.presign_expires = presign_expires
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region_name)
+        # Anything above one chunk is sent as a multipart upload with parallel parts
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_chunksize,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=4,
+        )
+
+    def object_key(self, key):
+        return f"{self.prefix}{key}.zip"
+
+    def put(self, data):
+        key = artifact_key(data)
+        if not self.exists(key):
+            self.client.upload_fileobj(
+                io.BytesIO(data), self.bucket, self.object_key(key),
+                ExtraArgs={'ContentType': 'application/zip'},
+                Config=self.transfer_config,
+            )
+        return key
+
+    def get(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))
+        except ClientError:
+            return None
+        return response['Body'].read()
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+            return True
+        except ClientError:
+            return False
+
+    def download_url(self, key, filename):
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': self.object_key(key),
+                'ResponseContentDisposition': f'attachment; filename="{filename}"',
+                'ResponseContentType': 'application/zip',
+            },
+            ExpiresIn=self.presign_expires,
+        )
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Return the process-wide storage backend configured from the environment.
+
+    ARTIFACT_STORAGE   local (default) or s3
+    ARTIFACT_DIR       root directory for the local backend (default: <tmp>/crewai_artifacts)
+    ARTIFACT_MAX_MB    size the local backend prunes back under (default: 1024; 0 keeps everything)
+    S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION, S3_PRESIGN_EXPIRES
+    """
+    global _storage
+    if _storage is not None:
+        return _storage
+    with _storage_lock:
+        if _storage is None:
+            backend = os.getenv('ARTIFACT_STORAGE', 'local').lower()
+            if backend == 's3':
+                _storage = S3Storage(
+                    bucket=os.environ['S3_BUCKET'],
+                    prefix=os.getenv('S3_PREFIX', 'artifacts/'),
+                    endpoint_url=os.getenv('S3_ENDPOINT_URL') or None,
+                    region_name=os.getenv('S3_REGION') or None,
+                    presign_expires=int(os.getenv('S3_PRESIGN_EXPIRES', '3600')),
+                )
+            elif backend == 'local':
+                max_mb = float(os.getenv('ARTIFACT_MAX_MB', '1024'))
+                _storage = LocalDiskStorage(
+                    os.getenv('ARTIFACT_DIR') or os.path.join(tempfile.gettempdir(), 'crewai_artifacts'),
+                    max_bytes=int(max_mb * 1024 * 1024) if max_mb > 0 else None,
+                )
+            else:
+                raise ValueError(f"Unknown ARTIFACT_STORAGE backend: {backend}")
+    return _storage
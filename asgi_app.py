@@ -0,0 +1,280 @@
+"""ASGI serving mode for the generation endpoints.
+
+Same routes and generation pipelines (generation_service) as app.py, but every
+generation is an asyncio task awaiting the async provider call, so one process
+can hold thousands of open generations and status streams without a thread
+each. Run it with any ASGI server:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+"""
+import asyncio
+import time
+
+from quart import Quart, Response, jsonify, redirect, render_template, request, send_file
+
+from crew_engine import (
+    AI_MODELS,
+    rate_limiters,
+    generation_stats,
+    model_router,
+)
+from artifact_storage import get_storage
+from job_status import TERMINAL_STAGES, NOT_FOUND_BODY, parse_since, parse_wait
+from generation_service import GenerationService, RequestError, caller_token, history_results, run_steps_async
+from owner_tokens import request_owner_token, set_owner_cookie
+from tracing import get_tracer, span
+from prompt_templates import prompt_variant, template_catalog
+from static_assets import html_asset, model_assets, model_list_response
+from profiler import ProfilerBusy, is_authorized, profile_report, profiler_token
+from warmup import start_warmup, warmup_state, is_ready
+
+app = Quart(__name__)
+
+# An event per streamed session that is set (and replaced) on every status change
+status_events = {}
+# Strong references so running generation tasks are not garbage collected
+background_tasks = set()
+# The page and model lists only depend on AI_MODELS; the page is rendered when the server starts
+index_asset = None
+models_assets = model_assets(AI_MODELS)
+
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def start_pipeline(steps):
+    """Run a generation pipeline as a task on the event loop."""
+    task = asyncio.create_task(run_steps_async(steps))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+def wake_streams(session_id):
+    """Wake everyone streaming or long-polling the session."""
+    event = status_events.pop(session_id, None)
+    if event is not None:
+        event.set()
+
+
+def drop_events(session_id):
+    status_events.pop(session_id, None)
+
+
+# Sessions, their status records and project state; the pipelines live in generation_service
+service = GenerationService(start_pipeline, on_status=wake_streams, on_evict=drop_events)
+generation_status = service.jobs
+
+
+def static_response(parts):
+    body, status, headers = parts
+    return Response(body, status=status, headers=headers)
+
+
+@app.errorhandler(RequestError)
+async def request_error(error):
+    return jsonify(error.body), error.status, error.headers
+
+
+@app.before_request
+async def trigger_warmup():
+    start_warmup()
+
+
+@app.route('/healthz')
+async def healthz():
+    """Liveness: the process is up and accepting traffic."""
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/readyz')
+async def readyz():
+    """Readiness: heavy modules are imported and the LLM client is warmed."""
+    if is_ready():
+        return jsonify({'status': 'ready', **warmup_state})
+    return jsonify({'status': 'warming', **warmup_state}), 503
+
+
+@app.before_serving
+async def render_index():
+    global index_asset
+    index_asset = html_asset(await render_template('index.html', ai_models=AI_MODELS))
+
+
+@app.route('/')
+async def index():
+    return static_response(index_asset.respond(request.headers))
+
+
+@app.route('/generate', methods=['POST'])
+async def generate():
+    # Only the client holding this token can download, regenerate or find the project later
+    owner_token, issued = caller_token(request.headers, request.cookies)
+    session_id = service.generate(await request.get_json(), owner_token)
+    response = jsonify({'session_id': session_id, **({'owner_token': owner_token} if issued else {})})
+    set_owner_cookie(response, owner_token, request.is_secure)
+    return response
+
+
+@app.route('/regenerate/<session_id>', methods=['POST'])
+async def regenerate(session_id):
+    """Re-run only part of a finished project: a new model, tasks only, or an extra agent."""
+    owner_token = request_owner_token(request.headers, request.cookies)
+    return jsonify(await run_steps_async(service.regenerate(session_id, await request.get_json(), owner_token)))
+
+
+@app.route('/status/<session_id>')
+async def get_status(session_id):
+    """Current status; with ?since=<version>, 304 and no body if nothing changed since then.
+
+    Adding &wait=<seconds> long-polls on the session's status event instead of
+    blocking a thread, for clients behind proxies that break SSE.
+    """
+    job = generation_status.get(session_id)
+    if job is None:
+        return Response(NOT_FOUND_BODY, mimetype='application/json')
+    since = parse_since(request.args.get('since'))
+    if since is not None:
+        deadline = time.monotonic() + parse_wait(request.args.get('wait'))
+        event = None
+        while job.version == since:
+            # Take the event before re-checking the version so no change is missed
+            event = status_events.setdefault(session_id, asyncio.Event())
+            remaining = deadline - time.monotonic()
+            if job.version != since or remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+        if job.stage in TERMINAL_STAGES and event is not None and status_events.get(session_id) is event:
+            # A finished job may never change again, so its event is not left behind; other
+            # waiters wake up, see the same version and take a new one
+            status_events.pop(session_id).set()
+        if job.version == since:
+            return Response(b'', status=304)
+    return Response(job.to_json(), mimetype='application/json')
+
+
+@app.route('/status/<session_id>/stream')
+async def stream_status(session_id):
+    """Server-sent events: one `data:` message per status change until the job finishes."""
+    async def events():
+        while True:
+            job = generation_status.get(session_id)
+            if job is None or job.stage in TERMINAL_STAGES:
+                # Nothing left to wait for, so no event is created for a finished or unknown job
+                yield b"data: " + (job.to_json() if job else NOT_FOUND_BODY) + b"\n\n"
+                return
+            # Take the event before reading the status again so no change is missed
+            event = status_events.setdefault(session_id, asyncio.Event())
+            yield b"data: " + job.to_json() + b"\n\n"
+            try:
+                await asyncio.wait_for(event.wait(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+
+    response = Response(events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.timeout = None
+    return response
+
+
+@app.route('/download/<session_id>')
+async def download(session_id):
+    owner_token = request_owner_token(request.headers, request.cookies)
+    artifact_key, download_name = await run_steps_async(service.download_target(session_id, owner_token))
+    storage = get_storage()
+
+    with span('GET /download', session_id, artifact_key=artifact_key) as download_span:
+        # Presigned URLs come from a signing call, not a network round trip
+        url = storage.download_url(artifact_key, download_name) if artifact_key else None
+        download_span.set('redirect', url is not None)
+        if url:
+            return redirect(url, code=302)
+
+        zip_path = storage.local_path(artifact_key) if artifact_key else None
+        if not zip_path and artifact_key:
+            # Pruned from local storage; rebuilt from the recorded configuration under the same key
+            rebuilt_key = await run_steps_async(service.rebuild_artifact(session_id))
+            zip_path = storage.local_path(rebuilt_key) if rebuilt_key else None
+        if not zip_path:
+            return jsonify({'error': 'Download file not found'}), 404
+
+        return await send_file(
+            zip_path,
+            as_attachment=True,
+            attachment_filename=download_name,
+            mimetype='application/zip'
+        )
+
+
+@app.route('/history/search')
+async def search_history():
+    """Search the caller's earlier generations by topic and YAML content; an empty ?q= lists the most recent."""
+    owner_token = request_owner_token(request.headers, request.cookies)
+    return jsonify(await run_steps_async(
+        history_results(request.args.get('q', ''), owner_token, request.args.get('limit'))
+    ))
+
+
+@app.route('/debug/trace/<session_id>')
+async def debug_trace(session_id):
+    """Waterfall of one session's spans; ?format=json returns the raw spans."""
+    rows = get_tracer().waterfall(session_id)
+    if rows is None:
+        return jsonify({'error': 'No trace for this session'}), 404
+    if request.args.get('format') == 'json':
+        return jsonify(rows)
+    return await render_template('trace.html', session_id=session_id, rows=rows)
+
+
+@app.route('/debug/profile')
+async def debug_profile():
+    """Profile the live process for ?seconds=N: collapsed stacks, or ?mode=memory for allocation growth."""
+    # Opt-in: the endpoint does not exist unless PROFILER_TOKEN is configured
+    if profiler_token() is None:
+        return jsonify({'error': 'Not found'}), 404
+    if not is_authorized(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        # Sample from a worker thread so the event loop itself shows up in the stacks
+        report = await asyncio.to_thread(profile_report, dict(request.args), service.counts())
+    except ProfilerBusy:
+        return jsonify({'error': 'A profile is already running'}), 409
+    return Response(report, mimetype='text/plain')
+
+
+@app.route('/api/models/<provider>')
+async def get_models(provider):
+    """Get available models for a specific AI provider."""
+    return static_response(model_list_response(models_assets, provider, request.headers))
+
+
+@app.route('/api/quota')
+async def get_quota():
+    """Get request/token usage and remaining quota per provider model."""
+    return jsonify(rate_limiters.stats())
+
+
+@app.route('/api/generation-stats')
+async def get_generation_stats():
+    """Get LLM calls, retries and fallback rates per output mode, and token usage per prompt template."""
+    return jsonify({**generation_stats.metrics(), 'prompt_variant': prompt_variant(), 'prompt_templates': template_catalog()})
+
+
+@app.route('/api/router')
+async def get_router_stats():
+    """Get per-model latency, error and validation statistics behind the "auto" model."""
+    return jsonify(model_router().stats())
+
+
+@app.route('/api/catalog')
+async def get_catalog_metrics():
+    """Get crew catalog freshness and hit rate."""
+    catalog = get_catalog()
+    return jsonify(catalog.metrics() if catalog else {'enabled': False})
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
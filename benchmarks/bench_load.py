@@ -0,0 +1,213 @@
+"""Load benchmark: threaded Flask mode vs the ASGI (asyncio) mode.
+
+Starts the chosen server in a subprocess with the LLM call replaced by a fixed
+sleep (so no network or API key is needed), then drives N concurrent clients
+through /generate -> /status (polling, long-polling with --long-poll, or SSE
+with --sse) -> /download while a probe measures /healthz latency under load.
+
+    python benchmarks/bench_load.py --mode threaded --clients 200 --llm-delay 2
+    python benchmarks/bench_load.py --mode threaded --clients 200 --llm-delay 2 --long-poll
+    python benchmarks/bench_load.py --mode asgi --clients 2000 --llm-delay 2 --sse
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def serve(mode, port, llm_delay):
+    """Run a server with a simulated LLM latency (invoked in a subprocess)."""
+    import crew_engine
+
+    def fake_generate(prompt, current_year, ai_provider='gemini', model_name=None, api_key=None, agent_count=None):
+        time.sleep(llm_delay)
+        return crew_engine.fallback_config(prompt.strip())
+
+    async def fake_generate_async(prompt, current_year, ai_provider='gemini', model_name=None, api_key=None,
+                                  agent_count=None):
+        await asyncio.sleep(llm_delay)
+        return crew_engine.fallback_config(prompt.strip())
+
+    # Patch before the app modules bind these names
+    crew_engine.generate_yaml_from_prompt = fake_generate
+    crew_engine.generate_yaml_from_prompt_async = fake_generate_async
+
+    if mode == 'threaded':
+        from werkzeug.serving import run_simple
+        import app
+        run_simple('127.0.0.1', port, app.app, threaded=True)
+    else:
+        import uvicorn
+        import asgi_app
+        uvicorn.run(asgi_app.app, host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+
+
+async def http_request(port, method, path, body=None, headers=None):
+    """Minimal HTTP/1.1 client (Connection: close); returns (status, body bytes)."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    payload = json.dumps(body).encode() if body is not None else b''
+    extra = ''.join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    head = (f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n{extra}"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n")
+    writer.write(head.encode() + payload)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    header, _, content = data.partition(b'\r\n\r\n')
+    return int(header.split()[1]), content
+
+
+# Number of /status requests issued by all clients
+status_requests = 0
+
+
+async def client(port, index, use_sse, poll_interval, long_poll=False):
+    started = time.perf_counter()
+    status, content = await http_request(port, 'POST', '/generate', {'prompt': f'research topic {index}'})
+    if status != 200:
+        raise RuntimeError(f"/generate returned {status}")
+    generated = json.loads(content)
+    session_id = generated['session_id']
+
+    if use_sse:
+        status, content = await http_request(port, 'GET', f'/status/{session_id}/stream')
+        if b'"completed"' not in content:
+            raise RuntimeError("stream ended without completion")
+    elif long_poll:
+        global status_requests
+        version = 0
+        while True:
+            status_requests += 1
+            status, content = await http_request(port, 'GET', f'/status/{session_id}?since={version}&wait=25')
+            if status == 304:
+                continue
+            data = json.loads(content)
+            if data['status'] == 'completed':
+                break
+            if data['status'] == 'error':
+                raise RuntimeError("generation failed")
+            version = data['version']
+    else:
+        while True:
+            status_requests += 1
+            status, content = await http_request(port, 'GET', f'/status/{session_id}')
+            state = json.loads(content)['status']
+            if state == 'completed':
+                break
+            if state == 'error':
+                raise RuntimeError("generation failed")
+            await asyncio.sleep(poll_interval)
+
+    # Downloads are scoped to the client that started the generation
+    status, content = await http_request(port, 'GET', f'/download/{session_id}',
+                                         headers={'X-Owner-Token': generated['owner_token']})
+    if status != 200 or not content.startswith(b'PK'):
+        raise RuntimeError(f"/download returned {status}")
+    return time.perf_counter() - started
+
+
+async def probe(port, stop, samples):
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            await http_request(port, 'GET', '/healthz')
+            samples.append(time.perf_counter() - started)
+        except OSError:
+            pass
+        await asyncio.sleep(0.1)
+
+
+async def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await http_request(port, 'GET', '/healthz')
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise SystemExit("server did not start")
+
+
+def summarize(name, values):
+    if not values:
+        return f"{name}: no samples"
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(0.95 * len(values)))]
+    return (f"{name}: p50 {statistics.median(values) * 1000:.1f} ms, "
+            f"p95 {p95 * 1000:.1f} ms, max {values[-1] * 1000:.1f} ms")
+
+
+async def drive(args):
+    await wait_until_up(args.port)
+    stop = asyncio.Event()
+    probe_samples = []
+    probe_task = asyncio.create_task(probe(args.port, stop, probe_samples))
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(client(args.port, i, args.sse, args.poll_interval, args.long_poll) for i in range(args.clients)),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    latencies = [r for r in results if isinstance(r, float)]
+    errors = [r for r in results if not isinstance(r, float)]
+    print(f"mode={args.mode} clients={args.clients} llm_delay={args.llm_delay}s sse={args.sse} long_poll={args.long_poll}")
+    print(f"completed {len(latencies)}/{args.clients} in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.1f} generations/s), {len(errors)} errors")
+    if not args.sse:
+        print(f"/status requests: {status_requests} ({status_requests / max(1, len(latencies)):.1f} per generation)")
+    print(summarize("end-to-end", latencies))
+    print(summarize("/healthz under load", probe_samples))
+    if errors:
+        print(f"first error: {errors[0]!r}")
+
+
+def raise_fd_limit():
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['threaded', 'asgi'], default='asgi')
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--llm-delay', type=float, default=2.0, help='simulated LLM latency in seconds')
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    parser.add_argument('--sse', action='store_true', help='use /status/<id>/stream (ASGI mode only)')
+    parser.add_argument('--long-poll', action='store_true', help='use /status/<id>?since=&wait= instead of fixed polling')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    if args.serve:
+        serve(args.mode, args.port, args.llm_delay)
+        sys.exit(0)
+    if args.sse and args.mode != 'asgi':
+        parser.error('--sse requires --mode asgi')
+
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', '--mode', args.mode,
+         '--port', str(args.port), '--llm-delay', str(args.llm_delay)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env={**os.environ, 'GEMINI_API_KEY': ''}
+    )
+    try:
+        asyncio.run(drive(args))
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,145 @@
+"""Packaging benchmark: /status latency while many ZIPs are being built.
+
+Starts the threaded Flask app in a subprocess once per packaging executor, with
+the LLM call replaced by an instant, padded configuration so every generation
+is dominated by CPU-bound rendering and DEFLATE. A closed loop of clients keeps
+generations in flight while a probe polls /status of a finished session. With
+packaging in the request threads the probe queues behind the GIL; the process
+pool mainly shortens that tail, by more the more idle cores the machine has.
+
+    python benchmarks/bench_packaging.py --executors inline process --concurrency 16 --payload-kb 256
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_load import http_request, raise_fd_limit, summarize, wait_until_up  # noqa: E402
+
+
+def padding(kilobytes, seed=0):
+    """Pseudo-random prose, so DEFLATE does real work instead of collapsing repeats."""
+    words = ['agent', 'task', 'crew', 'report', 'analysis', 'market', 'customer', 'quarterly',
+             'research', 'deliverable', 'context', 'summary', 'insight', 'pipeline', 'review']
+    rng = random.Random(seed)
+    text, size = [], 0
+    while size < kilobytes * 1024:
+        word = rng.choice(words) + str(rng.randint(0, 999))
+        text.append(word)
+        size += len(word) + 1
+    return ' '.join(text)
+
+
+def serve(port, payload_kb):
+    """Run the threaded app with an instant LLM and a large configuration (invoked in a subprocess)."""
+    import crew_engine
+
+    backstory = padding(payload_kb)
+
+    def fake_generate(prompt, current_year, ai_provider='gemini', model_name=None, api_key=None, agent_count=None):
+        agents_yaml, tasks_yaml = crew_engine.fallback_config(prompt.strip())
+        return agents_yaml.replace('backstory:', f'backstory: {backstory!r} #', 1), tasks_yaml
+
+    crew_engine.generate_yaml_from_prompt = fake_generate
+
+    from werkzeug.serving import run_simple
+    import app
+    run_simple('127.0.0.1', port, app.app, threaded=True)
+
+
+async def generate_one(port, index):
+    status, content = await http_request(port, 'POST', '/generate', {'prompt': f'research topic {index}'})
+    if status != 200:
+        raise RuntimeError(f"/generate returned {status}")
+    session_id = json.loads(content)['session_id']
+    while True:
+        status, content = await http_request(port, 'GET', f'/status/{session_id}')
+        state = json.loads(content)['status']
+        if state == 'completed':
+            return session_id
+        if state == 'error':
+            raise RuntimeError(json.loads(content)['message'])
+        await asyncio.sleep(0.05)
+
+
+async def worker(port, index, deadline, completed):
+    while time.monotonic() < deadline:
+        await generate_one(port, index)
+        completed.append(time.monotonic())
+        index += 1000
+
+
+async def probe(port, session_id, seconds, interval):
+    samples = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        await http_request(port, 'GET', f'/status/{session_id}')
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def drive(args):
+    await wait_until_up(args.port)
+    # Let the warm-up thread spawn the packaging workers before measuring
+    for _ in range(100):
+        status, content = await http_request(args.port, 'GET', '/readyz')
+        if status == 200:
+            break
+        await asyncio.sleep(0.1)
+    session_id = await generate_one(args.port, -1)
+
+    idle = await probe(args.port, session_id, 2, args.probe_interval)
+
+    completed = []
+    deadline = time.monotonic() + args.duration
+    workers = [asyncio.create_task(worker(args.port, i, deadline, completed)) for i in range(args.concurrency)]
+    loaded = await probe(args.port, session_id, args.duration, args.probe_interval)
+    await asyncio.gather(*workers)
+
+    print(summarize("  /status idle", idle))
+    print(summarize("  /status under packaging load", loaded))
+    print(f"  {len(completed)} projects in {args.duration:.0f}s ({len(completed) / args.duration:.1f} ZIPs/s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--executors', nargs='+', choices=['inline', 'process', 'interpreter'],
+                        default=['inline', 'process'])
+    parser.add_argument('--concurrency', type=int, default=16, help='generations kept in flight')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load per executor')
+    parser.add_argument('--payload-kb', type=int, default=256, help='size of the padded agent backstory')
+    parser.add_argument('--workers', type=int, default=None, help='PACKAGING_WORKERS for the pool')
+    parser.add_argument('--probe-interval', type=float, default=0.02)
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    if args.serve:
+        serve(args.port, args.payload_kb)
+        sys.exit(0)
+
+    for executor in args.executors:
+        env = {**os.environ, 'GEMINI_API_KEY': '', 'CREW_CATALOG_ENABLED': '0', 'PACKAGING_EXECUTOR': executor}
+        if args.workers:
+            env['PACKAGING_WORKERS'] = str(args.workers)
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(args.port),
+             '--payload-kb', str(args.payload_kb)],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env
+        )
+        try:
+            print(f"executor={executor} concurrency={args.concurrency} payload={args.payload_kb} KB")
+            asyncio.run(drive(args))
+        finally:
+            server.terminate()
+            server.wait()
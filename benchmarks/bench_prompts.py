@@ -0,0 +1,80 @@
+"""Compare prompt template variants on size and, optionally, on live validation results.
+
+Offline, prints every registered template's fixed size and the rendered size
+of the configuration prompts per provider. With --live (and GEMINI_API_KEY
+set), runs each configuration variant over the sample topics through
+crew_engine.generate_config, the same validation path the app uses, and
+reports the valid rate, tokens and latency per variant.
+
+    python benchmarks/bench_prompts.py
+    GEMINI_API_KEY=... python benchmarks/bench_prompts.py --live --runs 3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crew_engine  # noqa: E402
+import prompt_templates  # noqa: E402
+
+TOPICS = [
+    "Market research on electric vehicles",
+    "Email campaign for a product launch",
+    "Data pipeline for customer churn analysis",
+    "Content calendar for a tech blog",
+]
+
+CONFIG_BUILDERS = (crew_engine.build_prompt, crew_engine.build_structured_prompt)
+VARIANTS = ('full', 'compact')
+PROVIDERS = tuple(prompt_templates.CHARS_PER_TOKEN)
+
+
+def report_sizes():
+    print(f"{'template':<30} {'fixed chars':>11} " + ' '.join(f"{p + ' tok':>14}" for p in PROVIDERS))
+    for template in prompt_templates.TEMPLATES.values():
+        print(f"{template.id:<30} {len(template.static_text):>11} "
+              + ' '.join(f"{template.static_tokens(p):>14}" for p in PROVIDERS))
+
+    print(f"\nrendered, averaged over {len(TOPICS)} topics:")
+    # Render through the engine's own prompt builders, so the arguments always match the templates
+    for variant in VARIANTS:
+        os.environ['PROMPT_VARIANT'] = variant
+        for build in CONFIG_BUILDERS:
+            prompts = [build(topic, 2025) for topic in TOPICS]
+            tokens = {p: sum(prompt_templates.count_tokens(text, p) for text in prompts) / len(prompts)
+                      for p in PROVIDERS}
+            print(f"{prompts[0].template_id:<30} " + ' '.join(f"{p} {tokens[p]:7.1f}" for p in PROVIDERS))
+
+
+def run_live(runs, model_name):
+    for structured in (False, True):
+        os.environ['STRUCTURED_OUTPUT'] = '1' if structured else '0'
+        for variant in VARIANTS:
+            os.environ['PROMPT_VARIANT'] = variant
+            valid, latencies = 0, []
+            for i in range(runs * len(TOPICS)):
+                started = time.perf_counter()
+                _, _, reason = crew_engine.generate_config(TOPICS[i % len(TOPICS)], 2025, 'gemini', model_name)
+                latencies.append(time.perf_counter() - started)
+                valid += reason is None
+            template_id = prompt_templates.get_template('config_structured' if structured else 'config').id
+            usage = crew_engine.generation_stats.metrics()['templates'].get(template_id, {})
+            print(f"{template_id:<30} valid {valid}/{len(latencies)}  "
+                  f"avg {sum(latencies) / len(latencies):.2f}s  "
+                  f"input {usage.get('avg_input_tokens', 0):.0f} tok  output {usage.get('avg_output_tokens', 0):.0f} tok")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--live', action='store_true', help='call the model and validate each variant')
+    parser.add_argument('--runs', type=int, default=1, help='live runs per topic and variant')
+    parser.add_argument('--model', default=crew_engine.DEFAULT_MODEL)
+    args = parser.parse_args()
+    report_sizes()
+    if args.live:
+        if not os.getenv('GEMINI_API_KEY'):
+            sys.exit("--live needs GEMINI_API_KEY")
+        print()
+        run_live(args.runs, args.model)
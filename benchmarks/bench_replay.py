@@ -0,0 +1,107 @@
+"""Record real LLM responses once, then replay the generation pipeline offline.
+
+--record (with GEMINI_API_KEY set) runs every sample topic through
+crew_engine.generate_yaml_from_prompt_async. Each provider call, with its real
+latency, is appended to the corpus. Without --record, the same generations
+are replayed from the corpus with no network access. They run --concurrency
+at a time, at recorded timing divided by --speed. For each generation the
+benchmark measures the end-to-end latency (prompt, replayed call, validation,
+packaging), and it reports the corpus hit rate and fallback reasons.
+
+Prompts embed the year, so both runs use --year (default 2025). Keep
+STRUCTURED_OUTPUT and PROMPT_VARIANT the same for recording and replay.
+
+    GEMINI_API_KEY=... python benchmarks/bench_replay.py --record --runs 3
+    python benchmarks/bench_replay.py --concurrency 16 --speed 1
+    python benchmarks/bench_replay.py --speed 0 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('CREW_CATALOG_ENABLED', '0')
+
+import crew_engine  # noqa: E402
+from llm_replay import get_replay  # noqa: E402
+
+TOPICS = [
+    "Market research on electric vehicles",
+    "Email campaign for a product launch",
+    "Data pipeline for customer churn analysis",
+    "Content calendar for a tech blog",
+]
+
+
+async def generate(topic, args):
+    started = time.perf_counter()
+    agents_yaml, tasks_yaml = await crew_engine.generate_yaml_from_prompt_async(
+        topic, args.year, 'gemini', args.model, agent_count=args.agent_count
+    )
+    crew_engine.package_zip(crew_engine.project_name_from_prompt(topic), topic, agents_yaml, tasks_yaml)
+    return time.perf_counter() - started
+
+
+async def run(args, jobs):
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(topic):
+        async with semaphore:
+            return await generate(topic, args)
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(limited(topic) for topic in jobs))
+    return latencies, time.perf_counter() - started
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--record', action='store_true', help='call the real model and append to the corpus')
+    parser.add_argument('--corpus', default=os.getenv('LLM_REPLAY_CORPUS', 'llm_corpus.jsonl.gz'))
+    parser.add_argument('--runs', type=int, default=1, help='recordings per topic (--record)')
+    parser.add_argument('--repeat', type=int, default=5, help='replays per topic')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--speed', type=float, default=1.0, help='replay time divisor; 0 replays instantly')
+    parser.add_argument('--year', type=int, default=2025)
+    parser.add_argument('--model', default=crew_engine.DEFAULT_MODEL)
+    parser.add_argument('--agent-count', type=int, default=None)
+    args = parser.parse_args()
+
+    os.environ['LLM_REPLAY'] = 'record' if args.record else 'replay'
+    os.environ['LLM_REPLAY_CORPUS'] = args.corpus
+    os.environ['LLM_REPLAY_SPEED'] = str(args.speed)
+    if args.record:
+        if not os.getenv('GEMINI_API_KEY'):
+            sys.exit("--record needs GEMINI_API_KEY")
+        # One at a time, so recorded latencies are not inflated by our own concurrency
+        args.concurrency = 1
+        jobs = TOPICS * args.runs
+    else:
+        if not os.path.exists(args.corpus):
+            sys.exit(f"No corpus at {args.corpus}; record one first with --record")
+        jobs = TOPICS * args.repeat
+
+    latencies, elapsed = asyncio.run(run(args, jobs))
+    replay = get_replay()
+    stats = replay.stats()
+    recorded = [entry['latency'] for entries in replay.corpus.by_key.values() for entry in entries]
+    print(f"mode={replay.mode} corpus={args.corpus} generations={len(jobs)} concurrency={args.concurrency} "
+          f"speed={args.speed}")
+    print(f"end-to-end: p50 {statistics.median(latencies):.3f}s  p95 {percentile(latencies, 0.95):.3f}s  "
+          f"max {max(latencies):.3f}s  wall {elapsed:.2f}s")
+    if recorded:
+        print(f"recorded calls: {len(recorded)}  p50 {statistics.median(recorded):.3f}s  "
+              f"p95 {percentile(recorded, 0.95):.3f}s")
+    print(f"corpus: {stats['prompts']} prompts, {stats['entries']} entries, hits {stats['hits']}, "
+          f"prompt-only hits {stats['prompt_only_hits']}, misses {stats['misses']}")
+    for mode, mode_stats in crew_engine.generation_stats.metrics()['modes'].items():
+        print(f"{mode}: {mode_stats['requests']} requests, {mode_stats['llm_calls']} calls, "
+              f"fallbacks {mode_stats['fallbacks']}")
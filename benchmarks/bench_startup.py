@@ -0,0 +1,88 @@
+"""Cold-start benchmark for the web app based on `python -X importtime`.
+
+Imports app.py in fresh interpreters, reports the median import cost, the
+slowest modules by cumulative time, and whether modules that should load
+lazily (provider SDKs, yaml, dotenv) leaked into startup.
+
+    python benchmarks/bench_startup.py --runs 5 --json startup.json --max-ms 400
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported when app.py is imported
+LAZY_MODULES = ['google.generativeai', 'yaml', 'dotenv']
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(module):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return wall_ms, parse_importtime(result.stderr)
+
+
+def run(module, runs, top):
+    wall_times, import_times, modules = [], [], {}
+    for _ in range(runs):
+        wall_ms, modules = measure(module)
+        wall_times.append(wall_ms)
+        import_times.append(modules[module][1] / 1000)
+
+    slowest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    leaked = [name for name in LAZY_MODULES if name in modules]
+    return {
+        'module': module,
+        'runs': runs,
+        'import_ms_median': round(statistics.median(import_times), 2),
+        'wall_ms_median': round(statistics.median(wall_times), 2),
+        'modules_imported': len(modules),
+        'slowest': [{'module': name, 'self_ms': s / 1000, 'cumulative_ms': c / 1000} for name, (s, c) in slowest],
+        'eagerly_imported_lazy_modules': leaked,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', metavar='PATH', help='write the report as JSON for tracking over time')
+    parser.add_argument('--max-ms', type=float, help='exit non-zero if the median import time exceeds this budget')
+    args = parser.parse_args()
+
+    report = run(args.module, args.runs, args.top)
+    print(f"import {report['module']}: median {report['import_ms_median']} ms "
+          f"(process wall {report['wall_ms_median']} ms, {report['modules_imported']} modules)")
+    for entry in report['slowest']:
+        print(f"  {entry['cumulative_ms']:9.2f} ms  {entry['module']}")
+    if report['eagerly_imported_lazy_modules']:
+        print(f"WARNING: imported at startup: {', '.join(report['eagerly_imported_lazy_modules'])}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    over_budget = args.max_ms is not None and report['import_ms_median'] > args.max_ms
+    sys.exit(1 if over_budget or report['eagerly_imported_lazy_modules'] else 0)
@@ -0,0 +1,52 @@
+"""Compare per-request rendering of the index page with the precomputed static assets.
+
+Runs requests through the Flask test client as a browser would (gzip/br
+accepted): a route that renders index.html on every hit as / used to, the
+precomputed / route, and a conditional request that ends in a 304. Also prints
+the stored size of every encoding.
+
+    python benchmarks/bench_static.py --requests 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the catalog's background generations from competing for the CPU
+os.environ.setdefault('CREW_CATALOG_ENABLED', '0')
+
+import app  # noqa: E402
+from flask import render_template  # noqa: E402
+
+BROWSER_HEADERS = {'Accept-Encoding': 'gzip, deflate, br'}
+
+
+def time_requests(client, requests, headers, path='/'):
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(path, headers=headers)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+@app.app.route('/bench/rendered')
+def rendered_index():
+    # The previous / route: render the template on every request, uncompressed
+    return render_template('index.html', ai_models=app.AI_MODELS)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    client = app.app.test_client()
+    etag = client.get('/', headers=BROWSER_HEADERS).headers['ETag']
+    print(f"index page sizes: {app.get_index_asset().describe()['bytes']}")
+    print(f"{'GET / (rendered per request)':<40} "
+          f"{time_requests(client, args.requests, BROWSER_HEADERS, '/bench/rendered'):8.1f} us/request")
+    print(f"{'GET / (precompressed)':<40} {time_requests(client, args.requests, BROWSER_HEADERS):8.1f} us/request")
+    print(f"{'GET / (If-None-Match -> 304)':<40} "
+          f"{time_requests(client, args.requests, {**BROWSER_HEADERS, 'If-None-Match': etag}):8.1f} us/request")
+    print(f"{'GET /api/models/gemini':<40} "
+          f"{time_requests(client, args.requests, BROWSER_HEADERS, '/api/models/gemini'):8.1f} us/request")
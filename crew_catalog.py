@@ -0,0 +1,170 @@
+"""Warm catalog of pre-generated crews for the popular fallback domains.
+
+When enabled, a background thread started by warm-up (and then on a schedule)
+asks the LLM for one high-quality agents/tasks configuration per popular
+domain. The sentinel is the topic and the domain is passed as its own prompt
+line. Prompts that match a catalog domain are then served
+instantly by substituting the user's topic into the cached configuration,
+skipping the LLM round trip entirely.
+
+Configuration (environment):
+    CREW_CATALOG_ENABLED           1 / 0 (default); each refresh costs one LLM call per domain
+    CREW_CATALOG_DOMAINS           comma-separated DOMAIN_KEYWORDS keys (default: all)
+    CREW_CATALOG_MODEL             model used to build entries (default: DEFAULT_MODEL)
+    CREW_CATALOG_REFRESH_SECONDS   regeneration interval (default: 21600)
+"""
+import os
+import threading
+import time
+
+from crew_engine import (
+    DEFAULT_MODEL,
+    DOMAIN_KEYWORDS,
+    dump_yaml,
+    generate_config,
+    load_yaml,
+    match_domain,
+    resolve_model,
+)
+
+TOPIC_SENTINEL = '[[TOPIC]]'
+# Retry interval while some domains have no entry yet (e.g. after a 429 or no API key)
+INCOMPLETE_RETRY_SECONDS = 300
+
+
+def substitute_topic(value, topic):
+    """Replace the sentinel in every string of a parsed YAML structure."""
+    if isinstance(value, str):
+        return value.replace(TOPIC_SENTINEL, topic)
+    if isinstance(value, dict):
+        return {key: substitute_topic(item, topic) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute_topic(item, topic) for item in value]
+    return value
+
+
+class CrewCatalog:
+    """Thread-safe store of pre-generated configurations keyed by domain."""
+
+    def __init__(self, domains, model, refresh_seconds):
+        self.domains = list(domains)
+        self.model = model
+        self.refresh_seconds = refresh_seconds
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_failures': 0}
+
+    def refresh_domain(self, domain):
+        """Generate and store one entry; only real LLM output is cached."""
+        # The topic is only the sentinel, so no catalog wording ends up in configs served to users
+        agents_yaml, tasks_yaml, fallback_reason = generate_config(
+            TOPIC_SENTINEL, time.localtime().tm_year, 'gemini', self.model, domain=domain
+        )
+        if fallback_reason is not None:
+            with self.lock:
+                self.stats['refresh_failures'] += 1
+                entry = self.entries.get(domain)
+                if entry:
+                    entry['last_error'] = fallback_reason
+            return False
+
+        entry = {
+            'agents': load_yaml(agents_yaml),
+            'tasks': load_yaml(tasks_yaml),
+            'generated_at': time.time(),
+            'model': self.model,
+            'hits': 0,
+            'last_error': None,
+        }
+        with self.lock:
+            self.entries[domain] = entry
+            self.stats['refreshes'] += 1
+        return True
+
+    def refresh_stale(self):
+        now = time.time()
+        for domain in self.domains:
+            with self.lock:
+                entry = self.entries.get(domain)
+            if entry is None or now - entry['generated_at'] >= self.refresh_seconds:
+                self.refresh_domain(domain)
+
+    def run(self):
+        while True:
+            try:
+                self.refresh_stale()
+            except Exception as e:
+                print(f"Catalog refresh failed: {e}")
+            with self.lock:
+                complete = len(self.entries) == len(self.domains)
+            time.sleep(self.refresh_seconds if complete else min(self.refresh_seconds, INCOMPLETE_RETRY_SECONDS))
+
+    def start(self):
+        """Start the background warm/refresh loop once."""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self.run, name='crew-catalog', daemon=True)
+            self.thread.start()
+
+    def lookup(self, prompt, ai_provider='gemini', model_name=DEFAULT_MODEL):
+        """Return (agents_yaml, tasks_yaml) for a matching prompt, or None.
+
+        Only requests that would have been served by the catalog's model are
+        answered, so picking a different model still gets a fresh generation.
+        """
+        topic = prompt.strip()
+        domain = match_domain(topic)
+        eligible = domain in self.domains and resolve_model(ai_provider, model_name) == self.model
+        with self.lock:
+            entry = self.entries.get(domain) if eligible else None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            entry['hits'] += 1
+            self.stats['hits'] += 1
+            agents, tasks = entry['agents'], entry['tasks']
+
+        return dump_yaml(substitute_topic(agents, topic)), dump_yaml(substitute_topic(tasks, topic))
+
+    def metrics(self):
+        now = time.time()
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0.0,
+                'model': self.model,
+                'refresh_seconds': self.refresh_seconds,
+                'domains': {
+                    domain: {
+                        'ready': domain in self.entries,
+                        'age_seconds': round(now - self.entries[domain]['generated_at'], 1) if domain in self.entries else None,
+                        'hits': self.entries[domain]['hits'] if domain in self.entries else 0,
+                        'last_error': self.entries[domain]['last_error'] if domain in self.entries else None,
+                    }
+                    for domain in self.domains
+                },
+            }
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Return the process-wide catalog configured from the environment, or None if disabled."""
+    global _catalog
+    if os.getenv('CREW_CATALOG_ENABLED', '0') != '1':
+        return None
+    with _catalog_lock:
+        if _catalog is None:
+            domains = os.getenv('CREW_CATALOG_DOMAINS')
+            domains = [d.strip() for d in domains.split(',') if d.strip() in DOMAIN_KEYWORDS] if domains else list(DOMAIN_KEYWORDS)
+            _catalog = CrewCatalog(
+                domains,
+                os.getenv('CREW_CATALOG_MODEL', DEFAULT_MODEL),
+                int(os.getenv('CREW_CATALOG_REFRESH_SECONDS', '21600')),
+            )
+    return _catalog
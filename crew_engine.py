@@ -0,0 +1,1446 @@
+"""Shared CrewAI project generation engine used by the web app and the CLI.
+
+The pipeline is: build the prompt, call the (cached, rate limited) LLM client,
+validate the response in a single pass, render the project files from
+templates and package them in memory.
+
+Models listed under `structured_output_models` are asked for JSON constrained
+to CONFIG_SCHEMA instead of free-form YAML; the JSON is checked once against
+the schema and the YAML files are rendered locally.
+
+Requests for the "auto" model are routed by model_router to the fastest
+healthy Gemini model; every call and validation result feeds its statistics.
+
+With LLM_REPLAY set, provider calls are recorded to or replayed from an
+on-disk corpus (see llm_replay).
+
+Configuration (environment):
+    STRUCTURED_OUTPUT           0 to always request free-form YAML (default: 1)
+    STRUCTURED_OUTPUT_RETRIES   extra attempts after an invalid structured response (default: 1)
+    LLM_TIMEOUT_SECONDS         per-call provider timeout (default: 60)
+"""
+import functools
+import os
+import threading
+import time
+
+from generation_stats import GenerationStats, counts_as_call
+from llm_replay import get_replay
+from prompt_templates import count_tokens, render_prompt
+from model_router import AUTO_MODEL, get_router
+from rate_limiter import QuotaExhausted, RateLimiterRegistry, estimate_tokens
+from tracing import set_attributes, span
+
+# yaml, zipfile, subprocess and the provider SDKs are imported on first use so
+# that importing this module (and app.py) stays cheap on cold start.
+
+# AI Models configuration
+AI_MODELS = {
+    'gemini': {
+        'name': 'Google Gemini',
+        'models': [
+            'gemini-1.5-flash',
+            'gemini-1.5-pro',
+            'gemini-1.0-pro'
+        ],
+        'api_key_env': 'GEMINI_API_KEY',
+        # Models that accept a response_schema and return constrained JSON
+        'structured_output_models': ['gemini-1.5-flash', 'gemini-1.5-pro'],
+        'rate_limits': {
+            'default': {'requests_per_minute': 15, 'tokens_per_minute': 1000000},
+            'gemini-1.5-pro': {'requests_per_minute': 2, 'tokens_per_minute': 32000},
+            'gemini-1.0-pro': {'requests_per_minute': 15, 'tokens_per_minute': 32000}
+        }
+    },
+    'openai': {
+        'name': 'OpenAI GPT',
+        'models': [
+            'gpt-4',
+            'gpt-4-turbo',
+            'gpt-3.5-turbo'
+        ],
+        'api_key_env': 'OPENAI_API_KEY',
+        'rate_limits': {
+            'default': {'requests_per_minute': 500, 'tokens_per_minute': 30000}
+        }
+    },
+    'anthropic': {
+        'name': 'Anthropic Claude',
+        'models': [
+            'claude-3-opus',
+            'claude-3-sonnet',
+            'claude-3-haiku'
+        ],
+        'api_key_env': 'ANTHROPIC_API_KEY',
+        'rate_limits': {
+            'default': {'requests_per_minute': 50, 'tokens_per_minute': 40000}
+        }
+    }
+}
+
+# Per-(provider, model) request/token buckets, configured from AI_MODELS
+rate_limiters = RateLimiterRegistry(AI_MODELS)
+
+# Calls, retries and fallbacks per output mode, reported at /api/generation-stats
+generation_stats = GenerationStats()
+
+DEFAULT_MODEL = 'gemini-1.5-flash'
+
+
+def run_command_output(cmd_list, timeout=300):
+    """Run a command (no shell) and return its stripped stdout; raise on failure."""
+    import subprocess
+    try:
+        result = subprocess.run(cmd_list, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise Exception(f"Command timed out after {timeout} seconds: {' '.join(cmd_list)}")
+    if result.returncode != 0:
+        raise Exception(f"Error running command: {' '.join(cmd_list)}\n{result.stderr}")
+    return result.stdout.strip()
+
+
+def run_command_interactive(cmd_list, timeout=None):
+    """Run a command attached to the terminal, wait for it to exit and return its exit code."""
+    import subprocess
+    process = subprocess.Popen(cmd_list)
+    try:
+        return process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        raise Exception(f"Command timed out after {timeout} seconds: {' '.join(cmd_list)}")
+
+
+# Domain keyword -> (agent1, agent2, task1, task2) names used by the fallback
+DOMAIN_KEYWORDS = {
+    'email': ('content_analyzer', 'email_composer', 'analyze_content_task', 'compose_email_task'),
+    'research': ('researcher', 'analyst', 'research_task', 'analysis_task'),
+    'development': ('developer', 'tester', 'development_task', 'testing_task'),
+    'marketing': ('marketer', 'strategist', 'market_analysis_task', 'strategy_task'),
+    'data': ('data_scientist', 'analyst', 'data_collection_task', 'data_analysis_task'),
+    'content': ('content_creator', 'editor', 'content_creation_task', 'editing_task')
+}
+DEFAULT_DOMAIN_NAMES = ('content_analyzer', 'email_composer', 'analyze_content_task', 'compose_email_task')
+
+
+def match_domain(topic):
+    """Return the first DOMAIN_KEYWORDS keyword found in the topic, or None."""
+    lowered = topic.lower()
+    for keyword in DOMAIN_KEYWORDS:
+        if keyword in lowered:
+            return keyword
+    return None
+
+
+def generate_dynamic_fallback(topic):
+    """Build domain-specific agents/tasks YAML without calling an LLM."""
+    agent1_name, agent2_name, task1_name, task2_name = DOMAIN_KEYWORDS.get(match_domain(topic), DEFAULT_DOMAIN_NAMES)
+    
+    fallback_agents = f"""{agent1_name}:
+  role: >
+    {topic} Content Analyzer
+  goal: >
+    Analyze and extract key information from provided content related to {topic}
+  backstory: >
+    You are a skilled content analyst specializing in {topic}. Your expertise allows you to 
+    quickly identify important details, context, and requirements from various types of content
+    to facilitate effective communication and deliverable creation.
+  verbose: true
+  allow_delegation: true
+
+{agent2_name}:
+  role: >
+    {topic} Content Creator
+  goal: >
+    Create professional, well-structured content based on analyzed information for {topic}
+  backstory: >
+    You are an expert content creator with extensive experience in {topic}. You excel at 
+    transforming analyzed information into polished, professional deliverables that meet 
+    specific requirements and maintain high quality standards.
+  verbose: true
+  allow_delegation: false"""
+
+    fallback_tasks = f"""{task1_name}:
+  description: >
+    Analyze the provided topic: "{{topic}}" and all user-provided information.
+    Extract and understand ALL available inputs including any of these common variables:
+    {{recipient_name}}, {{subject}}, {{sender_name}}, {{additional_context}}, 
+    {{project_details}}, {{requirements}}, {{target_audience}}, {{research_scope}},
+    {{product_service}}, {{content_type}}, {{key_points}}, or any other user inputs.
+    
+    Identify the purpose, requirements, and approach needed for creating the deliverable.
+    Pay special attention to personalization details provided by the user.
+    Current year: {{current_year}}
+  expected_output: >
+    A comprehensive analysis that identifies all user-provided information and creates
+    a clear plan for using this information in the final deliverable. Must include
+    specific recommendations for incorporating user inputs into the output.
+  agent: {agent1_name}
+
+{task2_name}:
+  description: >
+    Create the final deliverable for "{{topic}}" using the analysis from the previous task.
+    
+    CRITICAL: Use ALL available user-provided information from inputs. This may include:
+    - {{recipient_name}} (use as recipient/addressee)
+    - {{subject}} (use as subject line/title)  
+    - {{sender_name}} (use as sender/author)
+    - {{additional_context}} (incorporate into main content)
+    - {{project_details}} (use for project specifications)
+    - {{requirements}} (ensure all requirements are met)
+    - {{target_audience}} (tailor content appropriately)
+    - {{research_scope}} (focus research accordingly)
+    - {{product_service}} (feature in content)
+    - {{content_type}} (format output correctly)
+    - {{key_points}} (include these points)
+    - Any other user inputs provided
+    
+    The output MUST be personalized with the actual user data, not generic examples.
+    Current year: {{current_year}}
+  expected_output: >
+    A complete, professional deliverable that incorporates ALL user-provided information.
+    The output must be personalized with actual user inputs (names, subjects, context, etc.)
+    and ready for immediate use. No generic placeholders or example content allowed.
+  agent: {agent2_name}"""
+    
+    return fallback_agents, fallback_tasks
+
+
+def domain_line(domain):
+    """Prompt line naming the crew's domain; empty for ordinary prompts, whose topic says it all."""
+    return f"\nDomain: {domain}" if domain else ''
+
+
+def build_prompt(topic, current_year, domain=None):
+    """Build the single prompt that asks for both agents.yaml and tasks.yaml (PROMPT_VARIANT selects full or compact)."""
+    return render_prompt('config', topic=topic, current_year=current_year, domain_line=domain_line(domain))
+
+
+# OpenAPI-subset schema for the structured output mode; Gemini constrains its
+# JSON to it, and validate_structured checks responses against it once
+CONFIG_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'agents': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'name': {'type': 'string', 'description': 'snake_case agent name'},
+                    'role': {'type': 'string'},
+                    'goal': {'type': 'string'},
+                    'backstory': {'type': 'string'},
+                    'allow_delegation': {'type': 'boolean'},
+                },
+                'required': ['name', 'role', 'goal', 'backstory', 'allow_delegation'],
+            },
+        },
+        'tasks': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'name': {'type': 'string', 'description': 'snake_case task name'},
+                    'description': {'type': 'string'},
+                    'expected_output': {'type': 'string'},
+                    'agent': {'type': 'string', 'description': 'name of the agent that performs the task'},
+                },
+                'required': ['name', 'description', 'expected_output', 'agent'],
+            },
+        },
+    },
+    'required': ['agents', 'tasks'],
+}
+
+
+def structured_output_enabled(ai_provider, model_name):
+    """True if the model that will serve the request can return schema-constrained JSON."""
+    if os.getenv('STRUCTURED_OUTPUT', '1') == '0':
+        return False
+    # Every provider is currently served by Gemini (see resolve_model)
+    return resolve_model(ai_provider, model_name) in AI_MODELS['gemini'].get('structured_output_models', ())
+
+
+def structured_generation_config():
+    return {'response_mime_type': 'application/json', 'response_schema': CONFIG_SCHEMA}
+
+
+def build_structured_prompt(topic, current_year, domain=None):
+    """Prompt for the structured mode; the layout comes from the schema, so no YAML skeleton is needed."""
+    return render_prompt('config_structured', topic=topic, current_year=current_year, domain_line=domain_line(domain))
+
+_client_lock = threading.Lock()
+_configured_api_key = None
+_gemini_models = {}
+
+
+def get_gemini_model(model_name, api_key):
+    """Return a cached GenerativeModel, configuring the SDK only when the key changes."""
+    global _configured_api_key
+    with _client_lock:
+        import google.generativeai as genai
+        if api_key != _configured_api_key:
+            genai.configure(api_key=api_key)
+            _configured_api_key = api_key
+            _gemini_models.clear()
+        model = _gemini_models.get(model_name)
+        if model is None:
+            model = _gemini_models[model_name] = genai.GenerativeModel(model_name)
+        return model
+
+
+def resolve_model(ai_provider, model_name):
+    """Map the requested provider/model to the Gemini model actually called."""
+    # For now, we use Gemini for all providers as the base implementation
+    if ai_provider == 'gemini' and model_name and model_name.startswith('gemini'):
+        return model_name
+    return DEFAULT_MODEL
+
+
+def split_response(text):
+    """Split a raw LLM response into (agents_yaml, tasks_yaml), or None if it has no tasks section."""
+    text = text.strip()
+    # Remove markdown formatting if present
+    if "```yaml" in text:
+        text = text.split("```yaml")[1].split("```")[0].strip()
+    elif "```" in text:
+        text = text.split("```")[1].strip()
+
+    parts = text.split("--- tasks.yaml ---")
+    if len(parts) != 2:
+        return None
+    return parts[0].replace("--- agents.yaml ---", "").strip(), parts[1].strip()
+
+
+@functools.lru_cache(maxsize=None)
+def _yaml_loader():
+    """PyYAML's safe loader, using the libyaml C bindings when PyYAML was built with them."""
+    import yaml
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=None)
+def _yaml_dumper():
+    import yaml
+    return getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+def load_yaml(text):
+    """Safe-load YAML text; malformed YAML raises ValueError."""
+    import yaml
+    try:
+        return yaml.load(text, Loader=_yaml_loader())
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML: {e}") from e
+
+
+def dump_yaml(data):
+    """Dump data as block-style YAML, keeping key order."""
+    import yaml
+    return yaml.dump(data, Dumper=_yaml_dumper(), default_flow_style=False, sort_keys=False)
+
+
+def validate_config(agents_yaml, tasks_yaml):
+    """Parse, clean and check both files in one pass.
+
+    Drops any `tools` sections from agents, requires every task's agent to be
+    defined, and returns normalized (agents_yaml, tasks_yaml) or None if invalid.
+    """
+    with span('validate_config', yaml_chars=len(agents_yaml) + len(tasks_yaml)) as validate_span:
+        try:
+            agents_data = load_yaml(agents_yaml)
+            tasks_data = load_yaml(tasks_yaml)
+        except ValueError:
+            validate_span.set('valid', False)
+            return None
+        if not isinstance(agents_data, dict) or not isinstance(tasks_data, dict):
+            validate_span.set('valid', False)
+            return None
+
+        for agent_config in agents_data.values():
+            if isinstance(agent_config, dict):
+                agent_config.pop('tools', None)
+
+        task_agent_names = {
+            task_config['agent'] for task_config in tasks_data.values()
+            if isinstance(task_config, dict) and 'agent' in task_config
+        }
+        validate_span.set_attributes(valid=task_agent_names.issubset(agents_data), agents=len(agents_data), tasks=len(tasks_data))
+        if not task_agent_names.issubset(agents_data):
+            return None
+
+        return tuple(map(dump_yaml, rename_members(agents_data, tasks_data)))
+
+
+def schema_error(value, schema, path='$'):
+    """First place `value` violates the CONFIG_SCHEMA-style `schema`, or None."""
+    expected = schema['type']
+    if expected == 'object':
+        if not isinstance(value, dict):
+            return f"{path}: expected object"
+        for key in schema.get('required', ()):
+            if key not in value:
+                return f"{path}.{key}: missing"
+        for key, child in schema.get('properties', {}).items():
+            if key in value:
+                error = schema_error(value[key], child, f"{path}.{key}")
+                if error:
+                    return error
+        return None
+    if expected == 'array':
+        if not isinstance(value, list) or not value:
+            return f"{path}: expected non-empty array"
+        for index, item in enumerate(value):
+            error = schema_error(item, schema['items'], f"{path}[{index}]")
+            if error:
+                return error
+        return None
+    if expected == 'boolean':
+        return None if isinstance(value, bool) else f"{path}: expected boolean"
+    if not isinstance(value, str) or not value.strip():
+        return f"{path}: expected non-empty string"
+    return None
+
+
+def validate_structured(response_text):
+    """Check a structured response against CONFIG_SCHEMA and render it locally.
+
+    One pass: parse the JSON, check it against the schema and the agent
+    references, then dump (agents_yaml, tasks_yaml). Returns None if invalid.
+    """
+    import json
+    with span('validate_structured', response_chars=len(response_text)) as validate_span:
+        try:
+            data = json.loads(response_text)
+        except ValueError:
+            data = None
+        error = schema_error(data, CONFIG_SCHEMA) if data is not None else 'invalid JSON'
+        if error is None:
+            agent_names = [agent['name'].strip() for agent in data['agents']]
+            task_names = [task['name'].strip() for task in data['tasks']]
+            if len(set(agent_names)) != len(agent_names) or len(set(task_names)) != len(task_names):
+                error = 'duplicate names'
+            elif not {task['agent'].strip() for task in data['tasks']}.issubset(agent_names):
+                error = 'task references an unknown agent'
+        validate_span.set_attributes(valid=error is None, error_detail=error)
+        if error is not None:
+            return None
+        validate_span.set_attributes(agents=len(data['agents']), tasks=len(data['tasks']))
+
+        agents = {
+            agent['name'].strip(): {
+                'role': agent['role'].strip(),
+                'goal': agent['goal'].strip(),
+                'backstory': agent['backstory'].strip(),
+                'verbose': True,
+                'allow_delegation': agent['allow_delegation'],
+            }
+            for agent in data['agents']
+        }
+        tasks = {
+            task['name'].strip(): {
+                'description': task['description'].strip(),
+                'expected_output': task['expected_output'].strip(),
+                'agent': task['agent'].strip(),
+            }
+            for task in data['tasks']
+        }
+        return tuple(map(dump_yaml, rename_members(agents, tasks)))
+
+def fallback_config(topic):
+    """Validated fallback agents/tasks YAML for a topic."""
+    with span('fallback', domain=match_domain(topic)):
+        agents_yaml, tasks_yaml = generate_dynamic_fallback(topic)
+        return validate_config(agents_yaml, tasks_yaml) or (agents_yaml, tasks_yaml)
+
+
+def quota_limiter(effective_model):
+    """The Gemini quota limiter for a model; while replaying, the one on the replay clock."""
+    limiter = rate_limiters.get('gemini', effective_model)
+    replay = get_replay()
+    return replay.limiter(limiter) if replay is not None and replay.replaying else limiter
+
+
+def resolve_client(ai_provider, model_name, api_key=None):
+    """Return (model, limiter, fallback_reason) for the Gemini model that will serve the request.
+
+    model is None and fallback_reason is set when no API key is configured or
+    the client cannot be built.
+    """
+    effective_model = resolve_model(ai_provider, model_name)
+    replay = get_replay()
+    if replay is not None and replay.replaying:
+        # Served from the recorded corpus: no API key or network needed
+        return replay.replay_model(effective_model), quota_limiter(effective_model), None
+
+    api_key = api_key or os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        print("Warning: GEMINI_API_KEY not found, using fallback generation")
+        return None, None, 'no_api_key'
+
+    try:
+        model = get_gemini_model(effective_model, api_key)
+    except Exception as e:
+        print(f"Failed to configure AI model: {str(e)}, using fallback")
+        return None, None, 'client_error'
+    if replay is not None:
+        model = replay.wrap(model, effective_model)
+
+    # Calls are scheduled under the Gemini quota for the model actually used
+    return model, rate_limiters.get('gemini', effective_model), None
+
+
+def llm_span(prompt_text, ai_provider, model_name, generation_config=None):
+    """Span around one provider call, tagged with the model, prompt template, prompt size and output mode."""
+    return span('llm.call', provider=ai_provider, model=resolve_model(ai_provider, model_name),
+                template=getattr(prompt_text, 'template_id', None), prompt_chars=len(prompt_text),
+                prompt_tokens=count_tokens(prompt_text, 'gemini'), structured=generation_config is not None)
+
+
+def record_usage(call_span, prompt_text, response):
+    """Log and record the input/output tokens of one call, from the provider's usage metadata when present."""
+    usage = getattr(response, 'usage_metadata', None)
+    # Every provider is currently served by Gemini, so local counts use its tokenizer ratio
+    input_tokens = getattr(usage, 'prompt_token_count', None) or count_tokens(prompt_text, 'gemini')
+    output_tokens = getattr(usage, 'candidates_token_count', None)
+    if output_tokens is None:
+        output_tokens = count_tokens(response.text, 'gemini')
+    template_id = getattr(prompt_text, 'template_id', None) or 'untemplated'
+    call_span.set_attributes(response_chars=len(response.text), input_tokens=input_tokens, output_tokens=output_tokens)
+    generation_stats.record_tokens(template_id, input_tokens, output_tokens)
+    print(f"LLM call {template_id} on {call_span.attributes['model']}: "
+          f"{input_tokens} input tokens, {output_tokens} output tokens")
+
+
+def model_router():
+    # "auto" chooses among the Gemini models, which serve every provider (see resolve_model)
+    return get_router(AI_MODELS['gemini']['models'])
+
+
+def route_model(ai_provider, model_name):
+    """Resolve the "auto" model to the router's current pick; other choices pass through."""
+    if model_name != AUTO_MODEL:
+        return ai_provider, model_name
+    model_name = model_router().choose()
+    set_attributes(routed_model=model_name)
+    return 'gemini', model_name
+
+
+def observe_validation(ai_provider, model_name, fallback_reason):
+    """Report whether a generation's response passed validation to the model router."""
+    if fallback_reason in (None, 'invalid_response'):
+        model_router().observe_validation(resolve_model(ai_provider, model_name), fallback_reason is None)
+
+
+def request_options():
+    return {'timeout': float(os.getenv('LLM_TIMEOUT_SECONDS', '60'))}
+
+
+def call_failed(call_span, error, sent):
+    """Fallback for a failed call; `sent` is False when no request reached the provider."""
+    print(f"Error generating YAML: {error}")
+    # A call that could not get quota in time is reported apart from provider errors,
+    # and one refused before its first request is not a provider call at all
+    if isinstance(error, QuotaExhausted):
+        reason = 'rate_limited' if sent else 'quota_rejected'
+    else:
+        reason = 'llm_error'
+    call_span.set_attributes(fallback_reason=reason, error_type=type(error).__name__)
+    return None, reason
+
+
+def quota_retry_after(ai_provider, model_name):
+    """Seconds until a new generation could get quota, or None if it can start within the limiter's maximum wait.
+
+    "auto" requests are never refused here: the router picks among several models' quotas.
+    """
+    if model_name == AUTO_MODEL:
+        return None
+    limiter = quota_limiter(resolve_model(ai_provider, model_name))
+    if not limiter.would_reject():
+        return None
+    return limiter.expected_wait()
+
+
+def call_llm(prompt_text, ai_provider='gemini', model_name=DEFAULT_MODEL, api_key=None, generation_config=None):
+    """Send one prompt; returns (response_text, fallback_reason) with exactly one of them set."""
+    with llm_span(prompt_text, ai_provider, model_name, generation_config) as call_span:
+        model, limiter, reason = resolve_client(ai_provider, model_name, api_key)
+        if model is None:
+            call_span.set('fallback_reason', reason)
+            return None, reason
+        # Timed inside the limiter so throttling waits do not count as model latency
+        started = time.perf_counter()
+        sent = False
+
+        def request():
+            nonlocal started, sent
+            started, sent = time.perf_counter(), True
+            return model.generate_content(prompt_text, generation_config=generation_config,
+                                          request_options=request_options())
+
+        try:
+            response = limiter.call(request, estimate_tokens(prompt_text))
+        except Exception as e:
+            model_router().observe_call(resolve_model(ai_provider, model_name), time.perf_counter() - started, e)
+            return call_failed(call_span, e, sent)
+        model_router().observe_call(resolve_model(ai_provider, model_name), time.perf_counter() - started)
+        record_usage(call_span, prompt_text, response)
+        return response.text, None
+
+
+async def call_llm_async(prompt_text, ai_provider='gemini', model_name=DEFAULT_MODEL, api_key=None,
+                         generation_config=None):
+    """Async variant of call_llm that awaits the provider call on the event loop."""
+    with llm_span(prompt_text, ai_provider, model_name, generation_config) as call_span:
+        model, limiter, reason = resolve_client(ai_provider, model_name, api_key)
+        if model is None:
+            call_span.set('fallback_reason', reason)
+            return None, reason
+        started = time.perf_counter()
+        sent = False
+
+        async def request():
+            nonlocal started, sent
+            started, sent = time.perf_counter(), True
+            return await model.generate_content_async(prompt_text, generation_config=generation_config,
+                                                      request_options=request_options())
+
+        try:
+            response = await limiter.call_async(request, estimate_tokens(prompt_text))
+        except Exception as e:
+            model_router().observe_call(resolve_model(ai_provider, model_name), time.perf_counter() - started, e)
+            return call_failed(call_span, e, sent)
+        model_router().observe_call(resolve_model(ai_provider, model_name), time.perf_counter() - started)
+        record_usage(call_span, prompt_text, response)
+        return response.text, None
+
+
+def finish_generation(topic, response_text):
+    """Validate a raw LLM response; returns (agents_yaml, tasks_yaml, fallback_reason)."""
+    parts = split_response(response_text)
+    config = validate_config(*parts) if parts else None
+    if config is None:
+        print("⚠️ Invalid or inconsistent AI response. Using dynamic fallback...")
+        return (*fallback_config(topic), 'invalid_response')
+    return (*config, None)
+
+
+def finish_text(topic, prompt_text, response_text, reason):
+    """Text-mode result for one call, recorded in generation_stats."""
+    result = (*fallback_config(topic), reason) if response_text is None else finish_generation(topic, response_text)
+    generation_stats.record('text', int(counts_as_call(reason)), fallback_reason=result[2],
+                            template_id=prompt_text.template_id)
+    return result
+
+
+def structured_attempts():
+    return 1 + max(0, int(os.getenv('STRUCTURED_OUTPUT_RETRIES', '1')))
+
+
+def finish_structured(topic, prompt_text, calls, config, reason):
+    """Structured-mode result after `calls` provider calls, recorded in generation_stats."""
+    # Only invalid responses are retried, so every call after the first is a retry
+    generation_stats.record('structured', calls, retries=max(calls - 1, 0),
+                            fallback_reason=None if config else reason, template_id=prompt_text.template_id)
+    if config is None:
+        if reason == 'invalid_response':
+            print("⚠️ Structured response failed schema validation. Using dynamic fallback...")
+        return (*fallback_config(topic), reason)
+    return (*config, None)
+
+
+def generate_structured_config(topic, current_year, ai_provider='gemini', model_name=DEFAULT_MODEL, api_key=None,
+                               domain=None):
+    """generate_config for models with structured output: schema-constrained JSON rendered to YAML locally.
+
+    An invalid response is retried up to STRUCTURED_OUTPUT_RETRIES times before
+    falling back; provider errors fall back immediately, as in text mode.
+    """
+    prompt_text = build_structured_prompt(topic, current_year, domain)
+    calls, config, reason = 0, None, None
+    for _ in range(structured_attempts()):
+        response_text, reason = call_llm(prompt_text, ai_provider, model_name, api_key, structured_generation_config())
+        calls += counts_as_call(reason)
+        if response_text is None:
+            break
+        config = validate_structured(response_text)
+        if config is not None:
+            break
+        reason = 'invalid_response'
+    return finish_structured(topic, prompt_text, calls, config, reason)
+
+
+async def generate_structured_config_async(topic, current_year, ai_provider='gemini', model_name=DEFAULT_MODEL,
+                                           api_key=None, domain=None):
+    """Async variant of generate_structured_config."""
+    prompt_text = build_structured_prompt(topic, current_year, domain)
+    calls, config, reason = 0, None, None
+    for _ in range(structured_attempts()):
+        response_text, reason = await call_llm_async(
+            prompt_text, ai_provider, model_name, api_key, structured_generation_config()
+        )
+        calls += counts_as_call(reason)
+        if response_text is None:
+            break
+        config = validate_structured(response_text)
+        if config is not None:
+            break
+        reason = 'invalid_response'
+    return finish_structured(topic, prompt_text, calls, config, reason)
+
+
+def generate_config(prompt, current_year, ai_provider='gemini', model_name=DEFAULT_MODEL, api_key=None,
+                    agent_count=None, domain=None):
+    """Generate (agents_yaml, tasks_yaml, fallback_reason).
+
+    fallback_reason is None when the LLM response was used, otherwise one of
+    'no_api_key', 'client_error', 'llm_error', 'rate_limited', 'quota_rejected' or
+    'invalid_response'. With
+    `agent_count`, the crew is planned first and each agent generated in parallel.
+    `domain` adds a domain line to the two-agent prompt without touching the topic.
+    Models with structured output get a JSON-schema request instead of free-form YAML,
+    and model_name 'auto' is routed to the fastest healthy model.
+    """
+    ai_provider, model_name = route_model(ai_provider, model_name)
+    topic = prompt.strip()
+    if agent_count:
+        result = generate_crew_config(prompt, current_year, agent_count, ai_provider, model_name, api_key)
+    elif structured_output_enabled(ai_provider, model_name):
+        result = generate_structured_config(topic, current_year, ai_provider, model_name, api_key, domain)
+    else:
+        prompt_text = build_prompt(topic, current_year, domain)
+        response_text, reason = call_llm(prompt_text, ai_provider, model_name, api_key)
+        result = finish_text(topic, prompt_text, response_text, reason)
+    observe_validation(ai_provider, model_name, result[2])
+    return result
+
+
+async def generate_config_async(prompt, current_year, ai_provider='gemini', model_name=DEFAULT_MODEL, api_key=None,
+                                agent_count=None, domain=None):
+    """Async variant of generate_config."""
+    ai_provider, model_name = route_model(ai_provider, model_name)
+    topic = prompt.strip()
+    if agent_count:
+        result = await generate_crew_config_async(prompt, current_year, agent_count, ai_provider, model_name, api_key)
+    elif structured_output_enabled(ai_provider, model_name):
+        result = await generate_structured_config_async(topic, current_year, ai_provider, model_name, api_key, domain)
+    else:
+        prompt_text = build_prompt(topic, current_year, domain)
+        response_text, reason = await call_llm_async(prompt_text, ai_provider, model_name, api_key)
+        result = finish_text(topic, prompt_text, response_text, reason)
+    observe_validation(ai_provider, model_name, result[2])
+    return result
+
+
+def generate_yaml_from_prompt(prompt, current_year, ai_provider='gemini', model_name=DEFAULT_MODEL, api_key=None,
+                              agent_count=None):
+    """Generate YAML configurations using specified AI provider and model."""
+    agents_yaml, tasks_yaml, fallback_reason = generate_config(prompt, current_year, ai_provider, model_name, api_key, agent_count)
+    set_attributes(fallback_reason=fallback_reason)
+    return agents_yaml, tasks_yaml
+
+
+async def generate_yaml_from_prompt_async(prompt, current_year, ai_provider='gemini', model_name=DEFAULT_MODEL, api_key=None,
+                                          agent_count=None):
+    """Async variant of generate_yaml_from_prompt."""
+    agents_yaml, tasks_yaml, fallback_reason = await generate_config_async(
+        prompt, current_year, ai_provider, model_name, api_key, agent_count
+    )
+    set_attributes(fallback_reason=fallback_reason)
+    return agents_yaml, tasks_yaml
+
+
+MAX_CREW_AGENTS = 8
+
+
+def build_plan_prompt(topic, agent_count, current_year):
+    """Short prompt that only plans the crew roster: names, roles and one task per agent."""
+    return render_prompt('crew_plan', topic=topic, agent_count=agent_count, current_year=current_year)
+
+
+def parse_plan(text, agent_count):
+    """Parse a roster response into [{'agent', 'role', 'task', 'summary'}], or None if unusable."""
+    import re
+    try:
+        plan = load_yaml(strip_fences(text))
+    except ValueError:
+        return None
+    if not isinstance(plan, list) or not plan:
+        return None
+
+    members = []
+    for item in plan[:agent_count]:
+        if not isinstance(item, dict):
+            return None
+        member = {key: str(item.get(key) or '').strip() for key in ('agent', 'role', 'task', 'summary')}
+        if not all(re.fullmatch(r'[a-z][a-z0-9_]*', member[key]) for key in ('agent', 'task')):
+            return None
+        members.append(member)
+
+    names = [m['agent'] for m in members] + [m['task'] for m in members]
+    if len(set(names)) != len(names):
+        return None
+    return members
+
+
+def build_member_prompt(topic, plan, index, current_year):
+    """Small per-agent prompt: write one planned agent and its task with the rest of the roster as context."""
+    member = plan[index]
+    roster = "\n".join(
+        f"{position}. {m['agent']} ({m['role']}) -> {m['task']}: {m['summary']}"
+        for position, m in enumerate(plan, 1)
+    )
+    position = "the FINAL deliverable" if index == len(plan) - 1 else f"step {index + 1} of {len(plan)}"
+    return render_prompt('crew_member', topic=topic, roster=roster, agent=member['agent'], task=member['task'],
+                         position=position, current_year=current_year)
+
+
+def assemble_crew(plan, responses):
+    """Merge per-agent responses under the planned names; returns (agents_yaml, tasks_yaml) or None."""
+    agents, tasks = {}, {}
+    for member, response_text in zip(plan, responses):
+        parts = split_response(response_text)
+        if parts is None:
+            return None
+        try:
+            agent_data, task_data = load_yaml(parts[0]), load_yaml(parts[1])
+        except ValueError:
+            return None
+        if not isinstance(agent_data, dict) or not isinstance(task_data, dict):
+            return None
+        # The model may rename things; the roster is authoritative
+        agent_config = agent_data.get(member['agent'], next(iter(agent_data.values()), None))
+        task_config = task_data.get(member['task'], next(iter(task_data.values()), None))
+        if not isinstance(agent_config, dict) or not isinstance(task_config, dict):
+            return None
+        agents[member['agent']] = agent_config
+        tasks[member['task']] = {**task_config, 'agent': member['agent']}
+    return dump_yaml(agents), dump_yaml(tasks)
+
+
+def plan_fallback(topic, reason):
+    """Fallback for a failed planning call, recorded against the crew mode."""
+    generation_stats.record('crew', int(counts_as_call(reason)), fallback_reason=reason)
+    return (*fallback_config(topic), reason)
+
+
+def finish_crew(topic, plan, results):
+    """Combine per-agent (response_text, reason) results into (agents_yaml, tasks_yaml, fallback_reason)."""
+    result = None
+    for response_text, reason in results:
+        if response_text is None:
+            result = (*fallback_config(topic), reason)
+            break
+    if result is None:
+        merged = assemble_crew(plan, [response_text for response_text, _ in results])
+        config = validate_config(*merged) if merged else None
+        if config is None:
+            print("⚠️ Invalid or inconsistent AI response. Using dynamic fallback...")
+            result = (*fallback_config(topic), 'invalid_response')
+        else:
+            result = (*config, None)
+    # The planning call plus every per-agent call that reached the provider
+    calls = 1 + sum(counts_as_call(reason) for _, reason in results)
+    generation_stats.record('crew', calls, fallback_reason=result[2])
+    return result
+
+
+def generate_crew_config(prompt, current_year, agent_count, ai_provider='gemini', model_name=DEFAULT_MODEL, api_key=None):
+    """Plan an N-agent crew with one short call, then generate every agent in parallel.
+
+    Wall time is roughly the planning call plus the slowest per-agent call;
+    the rate limiter still paces the parallel calls against the model quota.
+    """
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    topic = prompt.strip()
+    agent_count = max(1, min(int(agent_count), MAX_CREW_AGENTS))
+    response_text, reason = call_llm(build_plan_prompt(topic, agent_count, current_year), ai_provider, model_name, api_key)
+    if response_text is None:
+        return plan_fallback(topic, reason)
+    plan = parse_plan(response_text, agent_count)
+    if plan is None:
+        print("⚠️ Invalid crew plan. Using dynamic fallback...")
+        return plan_fallback(topic, 'invalid_response')
+
+    # One context copy per call keeps the per-agent spans in this generation's trace
+    contexts = [contextvars.copy_context() for _ in plan]
+    with ThreadPoolExecutor(max_workers=len(plan)) as executor:
+        results = list(executor.map(
+            lambda index: contexts[index].run(
+                call_llm, build_member_prompt(topic, plan, index, current_year), ai_provider, model_name, api_key
+            ),
+            range(len(plan))
+        ))
+    return finish_crew(topic, plan, results)
+
+
+async def generate_crew_config_async(prompt, current_year, agent_count, ai_provider='gemini', model_name=DEFAULT_MODEL, api_key=None):
+    """Async variant of generate_crew_config; the per-agent calls are gathered on the event loop."""
+    import asyncio
+
+    topic = prompt.strip()
+    agent_count = max(1, min(int(agent_count), MAX_CREW_AGENTS))
+    response_text, reason = await call_llm_async(build_plan_prompt(topic, agent_count, current_year), ai_provider, model_name, api_key)
+    if response_text is None:
+        return plan_fallback(topic, reason)
+    plan = parse_plan(response_text, agent_count)
+    if plan is None:
+        print("⚠️ Invalid crew plan. Using dynamic fallback...")
+        return plan_fallback(topic, 'invalid_response')
+
+    results = await asyncio.gather(*(
+        call_llm_async(build_member_prompt(topic, plan, index, current_year), ai_provider, model_name, api_key)
+        for index in range(len(plan))
+    ))
+    return finish_crew(topic, plan, results)
+
+
+def build_tasks_prompt(topic, agents_yaml, current_year):
+    """Smaller prompt that rewrites tasks.yaml only, for an existing set of agents."""
+    return render_prompt('regenerate_tasks', topic=topic, agents_yaml=agents_yaml, current_year=current_year)
+
+
+def build_agent_prompt(topic, agents_yaml, description, current_year):
+    """Smaller prompt that adds one agent and the task it owns to an existing crew."""
+    return render_prompt('regenerate_agent', topic=topic, agents_yaml=agents_yaml, description=description,
+                         current_year=current_year)
+
+
+def strip_fences(text):
+    """Remove markdown code fences around a YAML response."""
+    text = text.strip()
+    if "```yaml" in text:
+        return text.split("```yaml")[1].split("```")[0].strip()
+    if "```" in text:
+        return text.split("```")[1].strip()
+    return text
+
+
+def merge_config(agents_yaml, tasks_yaml, new_agents_yaml, new_tasks_yaml):
+    """Append new agents/tasks to an existing configuration; None if names collide or parsing fails."""
+    try:
+        agents, tasks = load_yaml(agents_yaml), load_yaml(tasks_yaml)
+        new_agents, new_tasks = load_yaml(new_agents_yaml), load_yaml(new_tasks_yaml)
+    except ValueError:
+        return None
+    if not all(isinstance(d, dict) and d for d in (new_agents, new_tasks)):
+        return None
+    if set(new_agents) & set(agents) or set(new_tasks) & set(tasks):
+        return None
+    return dump_yaml({**agents, **new_agents}), dump_yaml({**tasks, **new_tasks})
+
+
+REGENERATE_CHANGES = ('model', 'tasks', 'add_agent')
+
+
+def regenerate_prompt(change, topic, agents_yaml, current_year, description=None):
+    """The single LLM prompt for a 'tasks' or 'add_agent' regeneration."""
+    if change == 'tasks':
+        return build_tasks_prompt(topic, agents_yaml, current_year)
+    if change == 'add_agent':
+        return build_agent_prompt(topic, agents_yaml, description or "a reviewer who checks the final deliverable", current_year)
+    raise ValueError(f"Unknown change: {change}")
+
+
+def finish_regeneration(change, agents_yaml, tasks_yaml, response_text, reason):
+    """Apply a regeneration response; returns (agents_yaml, tasks_yaml, fallback_reason)."""
+    if response_text is None:
+        return agents_yaml, tasks_yaml, reason
+    if change == 'tasks':
+        config = validate_config(agents_yaml, strip_fences(response_text))
+    else:
+        parts = split_response(response_text)
+        merged = merge_config(agents_yaml, tasks_yaml, *parts) if parts else None
+        config = validate_config(*merged) if merged else None
+    return (*config, None) if config else (agents_yaml, tasks_yaml, 'invalid_response')
+
+
+def regenerate_config(change, prompt, agents_yaml, tasks_yaml, current_year,
+                      ai_provider='gemini', model_name=DEFAULT_MODEL, description=None, api_key=None,
+                      agent_count=None):
+    """Regenerate only the part of a configuration named by `change`.
+
+    'model' reruns the full prompt with another model, 'tasks' rewrites
+    tasks.yaml for the existing agents, and 'add_agent' appends one agent and
+    its task. Returns (agents_yaml, tasks_yaml, fallback_reason); on failure
+    the previous configuration is returned unchanged with the reason set.
+    """
+    ai_provider, model_name = route_model(ai_provider, model_name)
+    if change == 'model':
+        new_agents, new_tasks, reason = generate_config(prompt, current_year, ai_provider, model_name, api_key, agent_count)
+        if reason is not None:
+            return agents_yaml, tasks_yaml, reason
+        return new_agents, new_tasks, None
+
+    prompt_text = regenerate_prompt(change, prompt.strip(), agents_yaml, current_year, description)
+    response_text, reason = call_llm(prompt_text, ai_provider, model_name, api_key)
+    return finish_regeneration(change, agents_yaml, tasks_yaml, response_text, reason)
+
+
+async def regenerate_config_async(change, prompt, agents_yaml, tasks_yaml, current_year,
+                                  ai_provider='gemini', model_name=DEFAULT_MODEL, description=None, api_key=None,
+                                  agent_count=None):
+    """Async variant of regenerate_config."""
+    ai_provider, model_name = route_model(ai_provider, model_name)
+    if change == 'model':
+        new_agents, new_tasks, reason = await generate_config_async(prompt, current_year, ai_provider, model_name,
+                                                                    api_key, agent_count)
+        if reason is not None:
+            return agents_yaml, tasks_yaml, reason
+        return new_agents, new_tasks, None
+
+    prompt_text = regenerate_prompt(change, prompt.strip(), agents_yaml, current_year, description)
+    response_text, reason = await call_llm_async(prompt_text, ai_provider, model_name, api_key)
+    return finish_regeneration(change, agents_yaml, tasks_yaml, response_text, reason)
+
+
+def config_paths(project_name):
+    """Relative paths of agents.yaml and tasks.yaml inside a rendered project."""
+    return f"src/{project_name}/config/agents.yaml", f"src/{project_name}/config/tasks.yaml"
+
+
+def project_name_from_prompt(prompt):
+    """Derive the project/package name from the user prompt."""
+    return prompt.lower().replace(" ", "_").replace("-", "_")
+
+
+# Names a generated method must not shadow on the @CrewBase class
+_RESERVED_CREW_ATTRIBUTES = {'crew', 'agents', 'tasks', 'agents_config', 'tasks_config'}
+
+
+def crew_roster(agents_yaml, tasks_yaml):
+    """Agent and task names in file order, as the generated crew.py must declare them."""
+    try:
+        agents, tasks = load_yaml(agents_yaml), load_yaml(tasks_yaml)
+    except ValueError:
+        return [], []
+    return (list(agents) if isinstance(agents, dict) else [],
+            list(tasks) if isinstance(tasks, dict) else [])
+
+
+def method_name(name, taken):
+    """A unique Python identifier for a config key, used as the decorated method name.
+
+    Maps a name that already is a valid, unreserved and unused identifier to itself.
+    """
+    import keyword
+    import re
+    identifier = re.sub(r'\W', '_', str(name)).strip('_').lower() or 'member'
+    if identifier[0].isdigit() or keyword.iskeyword(identifier) or identifier in _RESERVED_CREW_ATTRIBUTES:
+        identifier = f"{identifier}_"
+    candidate, suffix = identifier, 2
+    while candidate in taken:
+        candidate, suffix = f"{identifier}_{suffix}", suffix + 1
+    taken.add(candidate)
+    return candidate
+
+
+def rename_members(agents, tasks):
+    """Key agents and tasks by the method names crew.py declares for them.
+
+    CrewAI finds a task's agent (and its `context` tasks) by method name, so
+    keywords, reserved attributes and names an agent shares with a task are
+    renamed in the config as well, with every reference following. For a
+    renamed config, method_name() is the identity.
+    """
+    taken = set()
+    agent_names = {name: method_name(name, taken) for name in agents}
+    task_names = {name: method_name(name, taken) for name in tasks}
+    renamed_tasks = {}
+    for name, config in tasks.items():
+        if isinstance(config, dict):
+            config = dict(config)
+            if 'agent' in config:
+                config['agent'] = agent_names.get(config['agent'], config['agent'])
+            context = config.get('context')
+            if isinstance(context, list):
+                config['context'] = [task_names.get(item, item) if isinstance(item, str) else item
+                                     for item in context]
+        renamed_tasks[task_names[name]] = config
+    return {agent_names[name]: config for name, config in agents.items()}, renamed_tasks
+
+
+def render_crew_methods(agents_yaml, tasks_yaml):
+    """Render the @agent and @task methods for every agent and task in the configuration."""
+    agent_names, task_names = crew_roster(agents_yaml, tasks_yaml)
+    taken = set()
+    agent_methods = []
+    for name in agent_names:
+        agent_methods.append(f'''    @agent
+    def {method_name(name, taken)}(self) -> Agent:
+        return Agent(
+            config=self.agents_config[{str(name)!r}], # type: ignore[index]
+            verbose=True
+        )
+''')
+    task_methods = []
+    for position, name in enumerate(task_names):
+        # The last task writes the final deliverable to report.md
+        output_file = "\n            output_file='report.md'" if position == len(task_names) - 1 else ""
+        task_methods.append(f'''    @task
+    def {method_name(name, taken)}(self) -> Task:
+        return Task(
+            config=self.tasks_config[{str(name)!r}], # type: ignore[index]{output_file}
+        )
+''')
+    return "\n".join(agent_methods), "\n".join(task_methods)
+
+
+def render_project_files(project_name, prompt, agents_yaml, tasks_yaml):
+    """Render every file of a CrewAI project as {relative path: content}."""
+    class_name = project_name.replace('_', ' ').title().replace(' ', '')
+    src = f"src/{project_name}"
+    agent_methods, task_methods = render_crew_methods(agents_yaml, tasks_yaml)
+
+    pyproject_content = f'''[project]
+name = "{project_name}"
+version = "0.1.0"
+description = "{project_name} using crewAI"
+authors = [{{ name = "Your Name", email = "you@example.com" }}]
+requires-python = ">=3.10,<3.14"
+dependencies = [
+    "crewai[tools]>=0.140.0,<1.0.0"
+]
+
+[project.scripts]
+{project_name} = "{project_name}.main:run"
+run_crew = "{project_name}.main:run"
+train = "{project_name}.main:train"
+replay = "{project_name}.main:replay"
+test = "{project_name}.main:test"
+
+[build-system]
+requires = ["hatchling"]
+build-backend = "hatchling.build"
+
+[tool.crewai]
+type = "crew"
+'''
+
+    readme_content = f'''# {project_name.replace('_', ' ').title()} Crew
+
+Welcome to the {project_name.replace('_', ' ').title()} Crew project, powered by [crewAI](https://crewai.com). This template is designed to help you set up a multi-agent AI system with ease, leveraging the powerful and flexible framework provided by crewAI. Our goal is to enable your agents to collaborate effectively on complex tasks, maximizing their collective intelligence and capabilities.
+
+## Installation
+
+Ensure you have Python >=3.10 <3.14 installed on your system. This project uses [UV](https://docs.astral.sh/uv/) for dependency management and package handling, offering a seamless setup and execution experience.
+
+First, if you haven't already, install uv:
+
+```bash
+pip install uv
+```
+
+Next, navigate to your project directory and install the dependencies:
+
+(Optional) Lock the dependencies and install them by using the CLI command:
+```bash
+crewai install
+```
+
+### Customizing
+
+**Add your `OPENAI_API_KEY` into the `.env` file**
+
+- Modify `src/{project_name}/config/agents.yaml` to define your agents
+- Modify `src/{project_name}/config/tasks.yaml` to define your tasks
+- Modify `src/{project_name}/crew.py` to add your own logic, tools and specific args
+- Modify `src/{project_name}/main.py` to add custom inputs for your agents and tasks
+
+## Running the Project
+
+To kickstart your crew of AI agents and begin task execution, run this from the root folder of your project:
+
+```bash
+$ crewai run
+```
+
+This command initializes the {project_name} Crew, assembling the agents and assigning them tasks as defined in your configuration.
+
+This example, unmodified, will run the create a `report.md` file with the output of a research on LLMs in the root folder.
+
+## Understanding Your Crew
+
+The {project_name} Crew is composed of multiple AI agents, each with unique roles, goals, and tools. These agents collaborate on a series of tasks, defined in `config/tasks.yaml`, leveraging their collective skills to achieve complex objectives. The `config/agents.yaml` file outlines the capabilities and configurations of each agent in your crew.
+
+## Support
+
+For support, questions, or feedback regarding the {project_name.replace('_', ' ').title()} Crew or crewAI.
+- Visit our [documentation](https://docs.crewai.com)
+- Reach out to us through our [GitHub repository](https://github.com/joaomdmoura/crewai)
+'''
+
+    # crew.py (modern CrewAI format)
+    crew_py_content = f'''from crewai import Agent, Crew, Process, Task
+from crewai.project import CrewBase, agent, crew, task
+from crewai.agents.agent_builder.base_agent import BaseAgent
+from typing import List
+# If you want to run a snippet of code before or after the crew starts,
+# you can use the @before_kickoff and @after_kickoff decorators
+# https://docs.crewai.com/concepts/crews#example-crew-class-with-decorators
+
+@CrewBase
+class {class_name}():
+    """{project_name.replace('_', ' ').title()} crew"""
+
+    agents: List[BaseAgent]
+    tasks: List[Task]
+
+    # Learn more about YAML configuration files here:
+    # Agents: https://docs.crewai.com/concepts/agents#yaml-configuration-recommended
+    # Tasks: https://docs.crewai.com/concepts/tasks#yaml-configuration-recommended
+    
+    # If you would like to add tools to your agents, you can learn more about it here:
+    # https://docs.crewai.com/concepts/agents#agent-tools
+{agent_methods}
+    # To learn more about structured task outputs,
+    # task dependencies, and task callbacks, check out the documentation:
+    # https://docs.crewai.com/concepts/tasks#overview-of-a-task
+{task_methods}
+    @crew
+    def crew(self) -> Crew:
+        """Creates the {project_name.replace('_', ' ').title()} crew"""
+        # To learn how to add knowledge sources to your crew, check out the documentation:
+        # https://docs.crewai.com/concepts/knowledge#what-is-knowledge
+
+        return Crew(
+            agents=self.agents, # Automatically created by the @agent decorator
+            tasks=self.tasks, # Automatically created by the @task decorator
+            process=Process.sequential,
+            verbose=True,
+            # process=Process.hierarchical, # In case you wanna use that instead https://docs.crewai.com/how-to/Hierarchical/
+        )
+'''
+
+    # main.py (modern CrewAI format)
+    main_py_content = f'''#!/usr/bin/env python
+import sys
+import warnings
+
+from datetime import datetime
+
+from {project_name}.crew import {class_name}
+
+warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
+
+# This main file is intended to be a way for you to run your
+# crew locally, so refrain from adding unnecessary logic into this file.
+# Replace with inputs you want to test with, it will automatically
+# interpolate any tasks and agents information
+
+def run():
+    """
+    Run the crew.
+    """
+    inputs = {{
+        'topic': '{prompt}',
+        'current_year': str(datetime.now().year)
+    }}
+    
+    try:
+        {class_name}().crew().kickoff(inputs=inputs)
+    except Exception as e:
+        raise Exception(f"An error occurred while running the crew: {{e}}")
+
+
+def train():
+    """
+    Train the crew for a given number of iterations.
+    """
+    inputs = {{
+        "topic": "{prompt}",
+        'current_year': str(datetime.now().year)
+    }}
+    try:
+        {class_name}().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
+
+    except Exception as e:
+        raise Exception(f"An error occurred while training the crew: {{e}}")
+
+def replay():
+    """
+    Replay the crew execution from a specific task.
+    """
+    try:
+        {class_name}().crew().replay(task_id=sys.argv[1])
+
+    except Exception as e:
+        raise Exception(f"An error occurred while replaying the crew: {{e}}")
+
+def test():
+    """
+    Test the crew execution and returns the results.
+    """
+    inputs = {{
+        "topic": "{prompt}",
+        "current_year": str(datetime.now().year)
+    }}
+    
+    try:
+        {class_name}().crew().test(n_iterations=int(sys.argv[1]), eval_llm=sys.argv[2], inputs=inputs)
+
+    except Exception as e:
+        raise Exception(f"An error occurred while testing the crew: {{e}}")
+'''
+
+    custom_tool_content = '''from crewai.tools import BaseTool
+from typing import Type
+from pydantic import BaseModel, Field
+
+
+class MyCustomToolInput(BaseModel):
+    """Input schema for MyCustomTool."""
+    argument: str = Field(..., description="Description of the argument.")
+
+class MyCustomTool(BaseTool):
+    name: str = "Name of my tool"
+    description: str = (
+        "Clear description for what this tool is useful for, your agent will need this information to use it."
+    )
+    args_schema: Type[BaseModel] = MyCustomToolInput
+
+    def _run(self, argument: str) -> str:
+        # Implementation goes here
+        return "this is an example of a tool output, ignore it and move along."
+'''
+
+    gitignore_content = """__pycache__/
+*.pyc
+*.pyo
+*.pyd
+.Python
+env/
+venv/
+.env
+.venv/
+pip-log.txt
+pip-delete-this-directory.txt
+.DS_Store
+*.log
+dist/
+build/
+*.egg-info/
+"""
+
+    return {
+        "pyproject.toml": pyproject_content,
+        "README.md": readme_content,
+        ".env": "# Add your API keys here\nOPENAI_API_KEY=your_api_key_here\nGEMINI_API_KEY=your_api_key_here\nANTHROPIC_API_KEY=your_api_key_here\n",
+        ".gitignore": gitignore_content,
+        f"{src}/__init__.py": "",
+        f"{src}/crew.py": crew_py_content,
+        f"{src}/main.py": main_py_content,
+        f"{src}/config/__init__.py": "",
+        f"{src}/config/agents.yaml": agents_yaml,
+        f"{src}/config/tasks.yaml": tasks_yaml,
+        f"{src}/tools/__init__.py": "",
+        f"{src}/tools/custom_tool.py": custom_tool_content,
+    }
+
+
+def write_project(project_path, files):
+    """Write rendered project files (plus the empty tests/ and knowledge/ dirs) to disk."""
+    os.makedirs(os.path.join(project_path, "tests"), exist_ok=True)
+    os.makedirs(os.path.join(project_path, "knowledge"), exist_ok=True)
+    for rel_path, content in files.items():
+        file_path = os.path.join(project_path, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+_DOS_EPOCH_DATE = (0 << 9) | (1 << 5) | 1  # 1980-01-01, the earliest DOS date
+_DOS_EPOCH_TIME = 0
+
+
+def compress_entry(arcname, content):
+    """Raw-DEFLATE one file; returns (arcname, crc32, compressed bytes, uncompressed size)."""
+    import zlib
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    return arcname, zlib.crc32(data), compressed, len(data)
+
+
+def assemble_zip(entries):
+    """Write pre-compressed entries as a ZIP archive.
+
+    Every entry gets a fixed timestamp and mode, so identical projects produce
+    identical bytes (and therefore the same content-addressed artifact key).
+    """
+    import struct
+    local_parts, central_parts = [], []
+    offset = 0
+    for arcname, crc, compressed, size in entries:
+        name = arcname.encode('utf-8')
+        flags = 0x800 if not arcname.isascii() else 0
+        local = struct.pack(
+            '<IHHHHHIIIHH', 0x04034B50, 20, flags, 8, _DOS_EPOCH_TIME, _DOS_EPOCH_DATE,
+            crc, len(compressed), size, len(name), 0
+        ) + name
+        central_parts.append(struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014B50, (3 << 8) | 20, 20, flags, 8, _DOS_EPOCH_TIME, _DOS_EPOCH_DATE,
+            crc, len(compressed), size, len(name), 0, 0, 0, 0, 0o644 << 16, offset
+        ) + name)
+        local_parts.append(local)
+        local_parts.append(compressed)
+        offset += len(local) + len(compressed)
+    central = b''.join(central_parts)
+    end = struct.pack('<IHHHHIIH', 0x06054B50, 0, 0, len(entries), len(entries), len(central), offset, 0)
+    return b''.join(local_parts) + central + end
+
+
+def read_zip_entries(zip_bytes):
+    """Read (arcname, crc32, compressed bytes, size) for every entry without decompressing."""
+    import io
+    import struct
+    import zipfile
+    entries = []
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zipf:
+        for info in zipf.infolist():
+            if info.compress_type != zipfile.ZIP_DEFLATED:
+                raise ValueError(f"Cannot patch non-deflated entry {info.filename}")
+            name_len, extra_len = struct.unpack_from('<HH', zip_bytes, info.header_offset + 26)
+            start = info.header_offset + 30 + name_len + extra_len
+            entries.append((info.filename, info.CRC, zip_bytes[start:start + info.compress_size], info.file_size))
+    return entries
+
+
+def build_zip(project_name, files):
+    """Package rendered project files into an in-memory ZIP under `project_name/`."""
+    return assemble_zip([compress_entry(f"{project_name}/{rel_path}", content) for rel_path, content in files.items()])
+
+
+def patch_zip(zip_bytes, project_name, replacements):
+    """Return a copy of a project ZIP with some files replaced or added.
+
+    Unchanged entries are copied as their existing compressed bytes; only the
+    files in `replacements` ({relative path: content}) are compressed again.
+    """
+    replaced = {f"{project_name}/{rel_path}": content for rel_path, content in replacements.items()}
+    entries = []
+    for entry in read_zip_entries(zip_bytes):
+        arcname = entry[0]
+        entries.append(compress_entry(arcname, replaced.pop(arcname)) if arcname in replaced else entry)
+    entries.extend(compress_entry(arcname, content) for arcname, content in replaced.items())
+    return assemble_zip(entries)
+
+
+def config_files(project_name, prompt, agents_yaml, tasks_yaml):
+    """The files that depend on the agents/tasks config: both YAML files and crew.py."""
+    agents_path, tasks_path = config_paths(project_name)
+    crew_path = f"src/{project_name}/crew.py"
+    files = render_project_files(project_name, prompt, agents_yaml, tasks_yaml)
+    return {path: files[path] for path in (agents_path, tasks_path, crew_path)}
+
+
+def patch_config(zip_bytes, project_name, prompt, agents_yaml, tasks_yaml):
+    """Swap a new config into a packaged project; a top-level function so it can run in a worker process."""
+    return patch_zip(zip_bytes, project_name, config_files(project_name, prompt, agents_yaml, tasks_yaml))
+
+
+def package_zip(project_name, prompt, agents_yaml, tasks_yaml):
+    """Render and zip a whole project; a top-level function so it can run in a worker process."""
+    return build_zip(project_name, render_project_files(project_name, prompt, agents_yaml, tasks_yaml))
@@ -0,0 +1,202 @@
+"""Persistent, full-text searchable history of finished generations.
+
+Every completed project (and each later revision of it) is written to a
+SQLite database with its topic, provider/model, YAML and artifact key. An
+FTS5 index over the topic and both YAML files backs /history/search?q=, so
+an existing crew can be found and downloaded again instead of paying for
+another LLM generation. Every entry records its owner (see owner_tokens), and
+searches only return the caller's own entries. The YAML is kept so an evicted
+session can be regenerated again.
+
+Configuration (environment):
+    HISTORY_ENABLED   1 (default) / 0
+    HISTORY_DB        SQLite database path (default: generation_history.db)
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_SEARCH_RESULTS = 20
+MAX_SEARCH_RESULTS = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    topic TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    ai_provider TEXT,
+    model_name TEXT,
+    agent_count INTEGER,
+    agents_yaml TEXT NOT NULL,
+    tasks_yaml TEXT NOT NULL,
+    artifact_key TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    owner TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS generations_fts USING fts5(
+    topic, agents_yaml, tasks_yaml,
+    content='generations', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS generations_ai AFTER INSERT ON generations BEGIN
+    INSERT INTO generations_fts(rowid, topic, agents_yaml, tasks_yaml)
+    VALUES (new.id, new.topic, new.agents_yaml, new.tasks_yaml);
+END;
+CREATE TRIGGER IF NOT EXISTS generations_ad AFTER DELETE ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, topic, agents_yaml, tasks_yaml)
+    VALUES ('delete', old.id, old.topic, old.agents_yaml, old.tasks_yaml);
+END;
+CREATE TRIGGER IF NOT EXISTS generations_au AFTER UPDATE ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, topic, agents_yaml, tasks_yaml)
+    VALUES ('delete', old.id, old.topic, old.agents_yaml, old.tasks_yaml);
+    INSERT INTO generations_fts(rowid, topic, agents_yaml, tasks_yaml)
+    VALUES (new.id, new.topic, new.agents_yaml, new.tasks_yaml);
+END;
+"""
+
+# Created after the owner column is added to databases from before it existed
+OWNER_INDEX = 'CREATE INDEX IF NOT EXISTS generations_owner ON generations(owner, updated_at)'
+
+# Columns returned by search() and get(); the YAML stays out of search results
+SUMMARY_COLUMNS = ('session_id', 'created_at', 'updated_at', 'topic', 'project_name', 'ai_provider',
+                   'model_name', 'agent_count', 'artifact_key', 'revision')
+
+
+def match_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def parse_limit(value):
+    """The `limit` query argument, clamped to [1, MAX_SEARCH_RESULTS]."""
+    try:
+        limit = int(value) if value is not None else DEFAULT_SEARCH_RESULTS
+    except ValueError:
+        return DEFAULT_SEARCH_RESULTS
+    return min(max(limit, 1), MAX_SEARCH_RESULTS)
+
+
+class GenerationHistory:
+    """SQLite-backed store of finished generations, shared by all request threads."""
+
+    def __init__(self, path):
+        self.path = path
+        # One connection serialized by a lock; SQLite work here takes microseconds
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.executescript(SCHEMA)
+            columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(generations)')}
+            if 'owner' not in columns:
+                # Entries recorded before owners existed stay unowned, so nobody can list them
+                self.conn.execute('ALTER TABLE generations ADD COLUMN owner TEXT')
+            self.conn.execute(OWNER_INDEX)
+
+    def record(self, session_id, state):
+        """Insert or update a session's entry from its project_state record."""
+        now = time.time()
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    """
+                    INSERT INTO generations (session_id, created_at, updated_at, topic, project_name, ai_provider,
+                                             model_name, agent_count, agents_yaml, tasks_yaml, artifact_key, revision,
+                                             owner)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(session_id) DO UPDATE SET
+                        updated_at = excluded.updated_at, ai_provider = excluded.ai_provider,
+                        model_name = excluded.model_name, agents_yaml = excluded.agents_yaml,
+                        tasks_yaml = excluded.tasks_yaml, artifact_key = excluded.artifact_key,
+                        revision = excluded.revision
+                    """,
+                    (session_id, now, now, state['prompt'], state['project_name'], state['ai_provider'],
+                     state['model_name'], state['agent_count'], state['agents_yaml'], state['tasks_yaml'],
+                     state['artifact_key'], state['revision'], state.get('owner'))
+                )
+        except sqlite3.Error as e:
+            # History is best effort; a failed write must not fail the generation
+            print(f"History write failed: {e}")
+
+    def search(self, text, owner, limit=DEFAULT_SEARCH_RESULTS):
+        """`owner`'s best matches for `text` (topic weighted above the YAML), or most recent entries if empty."""
+        if owner is None:
+            return []
+        columns = ', '.join(f"g.{column}" for column in SUMMARY_COLUMNS)
+        query = match_query(text or '')
+        with self.lock:
+            if query is None:
+                rows = self.conn.execute(
+                    f"SELECT {columns}, NULL AS snippet FROM generations g WHERE g.owner = ? "
+                    "ORDER BY g.updated_at DESC LIMIT ?",
+                    (owner, limit)
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    f"""
+                    SELECT {columns}, snippet(generations_fts, -1, '[', ']', '…', 12) AS snippet
+                    FROM generations_fts JOIN generations g ON g.id = generations_fts.rowid
+                    WHERE generations_fts MATCH ? AND g.owner = ?
+                    ORDER BY bm25(generations_fts, 10.0, 1.0, 1.0)
+                    LIMIT ?
+                    """,
+                    (query, owner, limit)
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, session_id):
+        """The full entry for a session (including YAML and owner), or None."""
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)}, agents_yaml, tasks_yaml, owner FROM generations "
+                "WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def project_state(self, session_id):
+        """A session's entry in the apps' project_state shape, for picking up an evicted session again."""
+        entry = self.get(session_id)
+        if entry is None:
+            return None
+        return {
+            'prompt': entry['topic'],
+            'project_name': entry['project_name'],
+            'ai_provider': entry['ai_provider'],
+            'model_name': entry['model_name'],
+            'agent_count': entry['agent_count'],
+            'agents_yaml': entry['agents_yaml'],
+            'tasks_yaml': entry['tasks_yaml'],
+            'artifact_key': entry['artifact_key'],
+            'revision': entry['revision'],
+            'owner': entry['owner'],
+        }
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM generations').fetchone()[0]
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    """Return the process-wide history store, or None if disabled."""
+    global _history
+    if os.getenv('HISTORY_ENABLED', '1') == '0':
+        return None
+    with _history_lock:
+        if _history is None:
+            _history = GenerationHistory(os.getenv('HISTORY_DB', 'generation_history.db'))
+    return _history
@@ -0,0 +1,457 @@
+"""Generation sessions shared by the Flask (app.py) and ASGI (asgi_app.py) servers.
+
+The stage pipeline (draft, generation, upgrade, regeneration), request
+validation and owner checks are written once here; each server keeps only
+its framework glue. Pipelines are generators that yield a Step for every
+blocking call: the LLM request, packaging, and storage or history I/O.
+run_steps() performs each step in the calling thread, for Flask's worker
+threads. run_steps_async() awaits the async provider call and the packaging
+pool, and moves storage and history I/O to a worker thread, so the event
+loop never blocks.
+
+A GenerationService is built with the server's way of running a pipeline in
+the background (a thread or an asyncio task) and an optional callback for
+every status change, which the ASGI server uses to wake its status streams.
+Refused requests raise RequestError, which each server turns into a JSON
+error response.
+"""
+import asyncio
+import math
+import time
+import uuid
+
+from crew_engine import (
+    generate_yaml_from_prompt,
+    generate_yaml_from_prompt_async,
+    project_name_from_prompt,
+    package_zip,
+    MAX_CREW_AGENTS,
+    patch_config,
+    fallback_config,
+    regenerate_config,
+    regenerate_config_async,
+    REGENERATE_CHANGES,
+    quota_retry_after,
+)
+from artifact_storage import get_storage
+from job_status import JobRegistry, Stage, TERMINAL_STAGES
+from packaging_pool import run_packaging, run_packaging_async
+from crew_catalog import get_catalog
+from generation_history import get_history, parse_limit
+from owner_tokens import is_owner, new_owner_token, owner_id, request_owner_token
+from tracing import span
+from warmup import load_environment
+
+
+class RequestError(Exception):
+    """A refused request: the HTTP status, JSON body and extra headers to answer with."""
+
+    def __init__(self, status, message, headers=None, **fields):
+        super().__init__(message)
+        self.status = status
+        self.body = {'error': message, **fields}
+        self.headers = headers or {}
+
+
+class Step:
+    """One blocking call of a pipeline; the driver decides where it runs.
+
+    `async_fn`, when given, is the coroutine function the async driver awaits
+    in place of running `fn` in a worker thread.
+    """
+
+    __slots__ = ('fn', 'args', 'kwargs', 'async_fn')
+
+    def __init__(self, fn, *args, async_fn=None, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.async_fn = async_fn
+
+
+def run_steps(steps):
+    """Run a pipeline to completion in the calling thread and return its result."""
+    value, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            value = step.fn(*step.args, **step.kwargs)
+        except Exception as e:
+            error = e
+
+
+async def run_steps_async(steps):
+    """Run a pipeline on the event loop and return its result."""
+    value, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            if step.async_fn is not None:
+                value = await step.async_fn(*step.args, **step.kwargs)
+            else:
+                value = await asyncio.to_thread(step.fn, *step.args, **step.kwargs)
+        except Exception as e:
+            error = e
+
+
+def package_step(fn, *args):
+    # Rendering and DEFLATE are CPU-bound; they run in the packaging pool so they hold
+    # neither the GIL against request threads nor the event loop
+    return Step(run_packaging, fn, *args, async_fn=run_packaging_async)
+
+
+def config_step(zip_bytes, project_name, prompt, agents_yaml, tasks_yaml):
+    """Package a new config: patched into the stored ZIP, or in full if local storage pruned it."""
+    if zip_bytes is None:
+        return package_step(package_zip, project_name, prompt, agents_yaml, tasks_yaml)
+    return package_step(patch_config, zip_bytes, project_name, prompt, agents_yaml, tasks_yaml)
+
+
+def caller_token(headers, cookies):
+    """The caller's owner token, and whether it was just issued because the request had none."""
+    token = request_owner_token(headers, cookies)
+    if token is None:
+        return new_owner_token(), True
+    return token, False
+
+
+def generate_params(data):
+    """Validated /generate arguments: (prompt, ai_provider, model_name, agent_count, progressive)."""
+    data = data or {}
+    prompt = data.get('prompt', '').strip()
+    ai_provider = data.get('ai_provider', 'gemini')
+    model_name = data.get('model_name', 'gemini-1.5-flash')
+    agent_count = data.get('agent_count')
+    progressive = bool(data.get('progressive', False))
+
+    if not prompt:
+        raise RequestError(400, 'Prompt is required')
+    # JSON true/false are bools, which isinstance() would accept as ints
+    if agent_count is not None and (type(agent_count) is not int or not 1 <= agent_count <= MAX_CREW_AGENTS):
+        raise RequestError(400, f'agent_count must be between 1 and {MAX_CREW_AGENTS}')
+    # Refuse up front rather than queue a generation that would wait past the limiter's maximum
+    retry_after = quota_retry_after(ai_provider, model_name)
+    if retry_after is not None:
+        raise RequestError(429, 'Model quota exhausted, try again later', {'Retry-After': str(math.ceil(retry_after))},
+                           retry_after=round(retry_after, 1))
+    return prompt, ai_provider, model_name, agent_count, progressive
+
+
+def history_results(query, owner_token, limit):
+    """Steps searching the caller's earlier generations; returns the /history/search payload."""
+    history = get_history()
+    if history is None:
+        raise RequestError(404, 'Generation history is disabled')
+    results = yield Step(history.search, query, owner_id(owner_token), parse_limit(limit))
+    for result in results:
+        result['download_url'] = f"/download/{result['session_id']}"
+    return {'query': query, 'results': results}
+
+
+class GenerationService:
+    """Status records and project state of every session, and the pipelines that fill them.
+
+    `spawn(steps)` runs a pipeline in the background. `on_status(session_id)` is
+    called after every status change and `on_evict(session_id)` after a session
+    is evicted.
+    """
+
+    def __init__(self, spawn, on_status=None, on_evict=None):
+        self.spawn = spawn
+        self.on_status = on_status
+        self.on_evict = on_evict
+        self.jobs = JobRegistry(on_evict=self.forget_session)
+        # Inputs and current YAML of each finished project, for incremental regeneration
+        self.project_state = {}
+
+    def forget_session(self, session_id):
+        """Evicted jobs take their project state with them; the generation history still has the project."""
+        self.project_state.pop(session_id, None)
+        if self.on_evict is not None:
+            self.on_evict(session_id)
+
+    def set_status(self, session_id, stage, message_key=None, detail=None, **fields):
+        """Update the session's record in place and tell the server about it."""
+        self.jobs.get(session_id).update(stage, message_key, detail, **fields)
+        self.status_changed(session_id)
+
+    def status_changed(self, session_id):
+        if self.on_status is not None:
+            self.on_status(session_id)
+
+    def record_history(self, session_id):
+        """Steps adding the session's current revision to the searchable generation history."""
+        history = get_history()
+        if history is not None:
+            yield Step(history.record, session_id, self.project_state[session_id])
+
+    def restore_session(self, session_id, owner_token):
+        """Steps rebuilding an evicted session's project state and completed job from the generation history.
+
+        Returns None unless the history has the session and `owner_token` owns it.
+        """
+        history = get_history()
+        state = (yield Step(history.project_state, session_id)) if history is not None else None
+        if state is None or not is_owner(state['owner'], owner_token):
+            return None
+        if self.jobs.get(session_id) is None:
+            self.project_state[session_id] = state
+            self.jobs.create(session_id, state['owner'])
+            self.set_status(session_id, Stage.COMPLETED, artifact_key=state['artifact_key'],
+                            project_name=state['project_name'], revision=state['revision'])
+        return self.project_state.get(session_id)
+
+    def store_state(self, session_id, prompt, project_name, ai_provider, model_name, agent_count, agents_yaml,
+                    tasks_yaml, artifact_key):
+        self.project_state[session_id] = {
+            'prompt': prompt,
+            'project_name': project_name,
+            'ai_provider': ai_provider,
+            'model_name': model_name,
+            'agent_count': agent_count,
+            'agents_yaml': agents_yaml,
+            'tasks_yaml': tasks_yaml,
+            'artifact_key': artifact_key,
+            'revision': 1,
+            'owner': self.jobs.get(session_id).owner
+        }
+
+    def generate(self, data, owner_token):
+        """Validate a /generate body, register its session and start the pipeline; returns the session id."""
+        prompt, ai_provider, model_name, agent_count, progressive = generate_params(data)
+        session_id = str(uuid.uuid4())
+        # The request span is the root of this session's trace
+        with span('POST /generate', session_id, prompt_chars=len(prompt), provider=ai_provider, model=model_name,
+                  progressive=progressive):
+            # Register the job before the pipeline starts so /status never misses it
+            self.jobs.create(session_id, owner_id(owner_token))
+            self.spawn(self.generate_project(session_id, prompt, ai_provider, model_name, agent_count, progressive))
+        return session_id
+
+    def publish_draft(self, session_id, prompt, project_name, ai_provider, model_name, agent_count):
+        """Progressive mode: store the instant fallback project and advertise it as provisional revision 1."""
+        with span('stage.draft') as stage_span:
+            agents_yaml, tasks_yaml = fallback_config(prompt.strip())
+            zip_bytes = yield package_step(package_zip, project_name, prompt, agents_yaml, tasks_yaml)
+            artifact_key = yield Step(get_storage().put, zip_bytes)
+            stage_span.set('zip_bytes', len(zip_bytes))
+
+        self.store_state(session_id, prompt, project_name, ai_provider, model_name, agent_count, agents_yaml,
+                         tasks_yaml, artifact_key)
+        self.set_status(session_id, Stage.GENERATING_AI, 'progressive_ai',
+                        artifact_key=artifact_key, project_name=project_name, revision=1, provisional=True)
+
+    def upgrade_draft(self, session_id, agents_yaml, tasks_yaml):
+        """Progressive mode: swap the LLM config into the draft ZIP and advertise it as revision 2."""
+        draft = self.project_state[session_id]
+        if (agents_yaml, tasks_yaml) == (draft['agents_yaml'], draft['tasks_yaml']):
+            # The LLM fell back to the same configuration; the draft is final
+            yield from self.record_history(session_id)
+            self.set_status(session_id, Stage.COMPLETED, provisional=False)
+            return
+
+        self.set_status(session_id, Stage.ZIPPING)
+
+        with span('stage.zipping'):
+            # Only the config files and crew.py change; the rest of the draft is copied as-is
+            storage = get_storage()
+            draft_zip = yield Step(storage.get, draft['artifact_key'])
+            zip_bytes = yield config_step(draft_zip, draft['project_name'], draft['prompt'], agents_yaml, tasks_yaml)
+            artifact_key = yield Step(storage.put, zip_bytes)
+
+        draft.update({
+            'agents_yaml': agents_yaml,
+            'tasks_yaml': tasks_yaml,
+            'artifact_key': artifact_key,
+            'revision': 2
+        })
+        yield from self.record_history(session_id)
+        self.set_status(session_id, Stage.COMPLETED, 'upgraded', artifact_key=artifact_key, revision=2,
+                        provisional=False)
+
+    def generate_project(self, session_id, prompt, ai_provider, model_name, agent_count=None, progressive=False):
+        """Steps generating a CrewAI project.
+
+        With `progressive`, a fallback project is downloadable within milliseconds
+        and is replaced by the LLM version as a new revision when that is ready.
+        """
+        job = self.jobs.get(session_id)
+        with span('generate_project', session_id, provider=ai_provider, model=model_name, agent_count=agent_count,
+                  progressive=progressive):
+            try:
+                # API keys come from .env, which is loaded lazily
+                load_environment()
+                project_name = project_name_from_prompt(prompt)
+
+                self.set_status(session_id, Stage.GENERATING_AI)
+
+                with span('stage.generating_ai') as stage_span:
+                    # Popular domains are served from the pre-generated catalog without an LLM call;
+                    # it only holds the standard two-agent crews
+                    catalog = get_catalog() if not agent_count else None
+                    cached = catalog.lookup(prompt, ai_provider, model_name) if catalog else None
+                    stage_span.set('cache_hit', cached is not None)
+                    if cached:
+                        agents_yaml, tasks_yaml = cached
+                    else:
+                        if progressive:
+                            yield from self.publish_draft(session_id, prompt, project_name, ai_provider, model_name,
+                                                          agent_count)
+                        agents_yaml, tasks_yaml = yield Step(
+                            generate_yaml_from_prompt, prompt, time.localtime().tm_year, ai_provider, model_name,
+                            agent_count=agent_count, async_fn=generate_yaml_from_prompt_async
+                        )
+
+                if session_id in self.project_state:
+                    yield from self.upgrade_draft(session_id, agents_yaml, tasks_yaml)
+                    return
+
+                self.set_status(session_id, Stage.WRITING_CONFIG)
+
+                with span('stage.writing_config') as stage_span:
+                    zip_bytes = yield package_step(package_zip, project_name, prompt, agents_yaml, tasks_yaml)
+                    stage_span.set('zip_bytes', len(zip_bytes))
+
+                self.set_status(session_id, Stage.ZIPPING)
+
+                with span('stage.zipping'):
+                    # Hand the in-memory ZIP to the configured artifact storage
+                    artifact_key = yield Step(get_storage().put, zip_bytes)
+
+                self.store_state(session_id, prompt, project_name, ai_provider, model_name, agent_count, agents_yaml,
+                                 tasks_yaml, artifact_key)
+                yield from self.record_history(session_id)
+
+                self.set_status(session_id, Stage.COMPLETED, artifact_key=artifact_key, project_name=project_name,
+                                revision=1)
+
+            except Exception as e:
+                if job.revision:
+                    # A progressive draft is already downloadable; keep it rather than failing the session
+                    yield from self.record_history(session_id)
+                    self.set_status(session_id, Stage.COMPLETED, 'upgrade_failed', detail=str(e), provisional=False)
+                else:
+                    self.set_status(session_id, Stage.ERROR, detail=str(e))
+
+    def regenerate(self, session_id, data, owner_token):
+        """Steps validating a /regenerate body and starting its pipeline; returns the response payload."""
+        data = data or {}
+        change = data.get('change')
+        job = self.jobs.get(session_id)
+        if job is None:
+            # The job was evicted (or ran before a restart); pick the project up from the history
+            if (yield from self.restore_session(session_id, owner_token)) is not None:
+                job = self.jobs.get(session_id)
+        elif not is_owner(job.owner, owner_token):
+            # Someone else's session answers like an unknown one
+            job = None
+
+        if change not in REGENERATE_CHANGES:
+            raise RequestError(400, f"change must be one of: {', '.join(REGENERATE_CHANGES)}")
+        state = self.project_state.get(session_id) if job is not None else None
+        if job is None or (state is None and job.stage in TERMINAL_STAGES):
+            raise RequestError(404, 'Session not found')
+        # Checked and claimed in one step, so concurrent requests cannot both start a worker
+        if not job.transition_if(Stage.COMPLETED, Stage.STARTING, 'regenerate_starting'):
+            raise RequestError(409, 'Project is still being generated')
+        if self.jobs.get(session_id) is not job:
+            # Evicted just before it was claimed; the history still has the project
+            raise RequestError(404, 'Session not found')
+        self.status_changed(session_id)
+
+        ai_provider = data.get('ai_provider', state['ai_provider'])
+        model_name = data.get('model_name', state['model_name'])
+        self.spawn(self.regenerate_project(session_id, state, change, ai_provider, model_name,
+                                           data.get('description')))
+        return {'session_id': session_id, 'change': change}
+
+    def regenerate_project(self, session_id, state, change, ai_provider, model_name, description):
+        """Steps regenerating part of a finished project, patching its ZIP in place of a full rebuild."""
+        with span('regenerate_project', session_id, change=change, provider=ai_provider, model=model_name):
+            try:
+                load_environment()
+                self.set_status(session_id, Stage.GENERATING_AI, 'regenerate_ai')
+
+                with span('stage.generating_ai') as stage_span:
+                    agents_yaml, tasks_yaml, fallback_reason = yield Step(
+                        regenerate_config, change, state['prompt'], state['agents_yaml'], state['tasks_yaml'],
+                        time.localtime().tm_year, ai_provider, model_name, description,
+                        agent_count=state['agent_count'], async_fn=regenerate_config_async
+                    )
+                    stage_span.set('fallback_reason', fallback_reason)
+                if fallback_reason is not None:
+                    # Keep serving the previous revision
+                    self.set_status(session_id, Stage.COMPLETED, 'regenerate_failed', detail=fallback_reason)
+                    return
+
+                self.set_status(session_id, Stage.ZIPPING, 'regenerate_zipping')
+
+                with span('stage.zipping'):
+                    # Only the config files and crew.py are recompressed; the scaffold entries are copied as-is
+                    storage = get_storage()
+                    old_zip = yield Step(storage.get, state['artifact_key'])
+                    zip_bytes = yield config_step(old_zip, state['project_name'], state['prompt'], agents_yaml,
+                                                  tasks_yaml)
+                    artifact_key = yield Step(storage.put, zip_bytes)
+
+                state.update({
+                    'ai_provider': ai_provider,
+                    'model_name': model_name,
+                    'agents_yaml': agents_yaml,
+                    'tasks_yaml': tasks_yaml,
+                    'artifact_key': artifact_key,
+                    'revision': state['revision'] + 1
+                })
+                yield from self.record_history(session_id)
+                self.set_status(session_id, Stage.COMPLETED, 'regenerated', artifact_key=artifact_key,
+                                revision=state['revision'])
+
+            except Exception as e:
+                self.set_status(session_id, Stage.ERROR, detail=str(e))
+
+    def download_target(self, session_id, owner_token):
+        """Steps resolving the caller's download as (artifact_key, download_name)."""
+        job = self.jobs.get(session_id)
+        if job is not None:
+            # Someone else's session answers like an unknown one
+            if not is_owner(job.owner, owner_token):
+                raise RequestError(404, 'Session not found')
+            # Any advertised revision is downloadable, including a progressive draft
+            if not job.artifact_key:
+                raise RequestError(400, 'Project not ready for download')
+            return job.artifact_key, f"{job.project_name or 'crewai_project'}.zip"
+        # Evicted sessions and sessions from earlier runs are served from the generation history
+        history = get_history()
+        entry = (yield Step(history.get, session_id)) if history is not None else None
+        if entry is None or not is_owner(entry['owner'], owner_token):
+            raise RequestError(404, 'Session not found')
+        return entry['artifact_key'], f"{entry['project_name']}.zip"
+
+    def rebuild_artifact(self, session_id):
+        """Steps re-packaging a session's current revision from its recorded configuration; returns the key.
+
+        Packaging is deterministic, so a ZIP that local storage pruned comes back
+        under the key the session already advertises. Returns None if neither the
+        session nor the history has the project.
+        """
+        state = self.project_state.get(session_id)
+        if state is None:
+            history = get_history()
+            state = (yield Step(history.project_state, session_id)) if history is not None else None
+        if state is None:
+            return None
+        zip_bytes = yield package_step(package_zip, state['project_name'], state['prompt'], state['agents_yaml'],
+                                       state['tasks_yaml'])
+        return (yield Step(get_storage().put, zip_bytes))
+
+    def counts(self):
+        """Sizes of the per-session structures, for the profiler's memory report."""
+        return {'jobs': len(self.jobs), 'project_state': len(self.project_state)}
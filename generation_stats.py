@@ -0,0 +1,92 @@
+"""Per-output-mode accounting of LLM calls, retries and fallbacks.
+
+Every configuration request records how many provider calls it made, how many
+of those were retries after an invalid response, and why it fell back to the
+built-in configuration (if it did). Rates are reported per mode ('structured',
+'text', 'crew') so the structured JSON mode can be compared with free-form
+YAML on wasted calls.
+
+Every provider call also records its input and output tokens against the
+prompt template that produced it, so template variants and versions can be
+compared on cost and fallback rate.
+"""
+import threading
+from collections import Counter
+
+# Fallback reasons that never reached the provider; 'quota_rejected' is a call refused
+# by the rate limiter before its first request was sent
+NO_CALL_REASONS = ('no_api_key', 'client_error', 'quota_rejected')
+
+
+class GenerationStats:
+    """Thread-safe counters keyed by output mode and by prompt template."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.modes = {}
+        self.templates = {}
+
+    def template_stats(self, template_id):
+        stats = self.templates.get(template_id)
+        if stats is None:
+            stats = self.templates[template_id] = {
+                'requests': 0, 'fallbacks': 0, 'llm_calls': 0, 'input_tokens': 0, 'output_tokens': 0,
+            }
+        return stats
+
+    def record_tokens(self, template_id, input_tokens, output_tokens):
+        """Count one provider call and its token usage."""
+        with self.lock:
+            stats = self.template_stats(template_id)
+            stats['llm_calls'] += 1
+            stats['input_tokens'] += input_tokens
+            stats['output_tokens'] += output_tokens
+
+    def record(self, mode, llm_calls, retries=0, fallback_reason=None, template_id=None):
+        """Count one finished configuration request."""
+        with self.lock:
+            if template_id is not None:
+                template = self.template_stats(template_id)
+                template['requests'] += 1
+                template['fallbacks'] += fallback_reason is not None
+            stats = self.modes.get(mode)
+            if stats is None:
+                stats = self.modes[mode] = {'requests': 0, 'llm_calls': 0, 'retries': 0, 'fallbacks': Counter()}
+            stats['requests'] += 1
+            stats['llm_calls'] += llm_calls
+            stats['retries'] += retries
+            if fallback_reason is not None:
+                stats['fallbacks'][fallback_reason] += 1
+
+    def metrics(self):
+        with self.lock:
+            modes = {}
+            for mode, stats in self.modes.items():
+                requests = stats['requests']
+                fallbacks = sum(stats['fallbacks'].values())
+                # Calls whose output was thrown away: retried or replaced by the fallback
+                wasted = stats['retries'] + stats['fallbacks']['invalid_response'] + stats['fallbacks']['llm_error']
+                modes[mode] = {
+                    'requests': requests,
+                    'llm_calls': stats['llm_calls'],
+                    'retries': stats['retries'],
+                    'fallbacks': dict(stats['fallbacks']),
+                    'fallback_rate': round(fallbacks / requests, 4) if requests else 0.0,
+                    'retry_rate': round(stats['retries'] / requests, 4) if requests else 0.0,
+                    'wasted_call_rate': round(wasted / stats['llm_calls'], 4) if stats['llm_calls'] else 0.0,
+                }
+            templates = {}
+            for template_id, stats in self.templates.items():
+                calls = stats['llm_calls']
+                templates[template_id] = {
+                    **stats,
+                    'fallback_rate': round(stats['fallbacks'] / stats['requests'], 4) if stats['requests'] else 0.0,
+                    'avg_input_tokens': round(stats['input_tokens'] / calls, 1) if calls else 0.0,
+                    'avg_output_tokens': round(stats['output_tokens'] / calls, 1) if calls else 0.0,
+                }
+            return {'modes': modes, 'templates': templates}
+
+
+def counts_as_call(fallback_reason):
+    """True if a call that ended with `fallback_reason` reached the provider."""
+    return fallback_reason not in NO_CALL_REASONS
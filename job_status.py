@@ -0,0 +1,227 @@
+"""Compact, versioned status records for generation jobs.
+
+Each job is a small __slots__ object holding an enum stage, an integer
+progress and a key into the shared MESSAGES table, instead of a fresh dict of
+full strings per progress step. Updates mutate the record in place under its
+lock and bump `version`; the JSON body is serialized at most once per version,
+so /status?since=<version> can answer "unchanged" without serializing at all.
+The lock is a Condition, so /status?since=<version>&wait=<seconds> long-polls
+until the next update instead of the browser polling on a timer.
+
+A job advertises its artifact as soon as it has one, whatever the stage: in
+progressive mode a `provisional` fallback project is downloadable while the
+LLM version is still generating, and a higher `revision` replaces it.
+
+The registry is bounded: finished jobs are dropped once they have been idle
+for JOB_TTL_SECONDS, or sooner when more than JOB_MAX_SESSIONS are held.
+Running jobs are never dropped. The apps get a callback for each evicted
+session, so they can drop the state they keep for it.
+
+Configuration (environment):
+    JOB_MAX_SESSIONS   jobs kept before finished ones are evicted early (default: 5000)
+    JOB_TTL_SECONDS    idle time after which a finished job is evicted (default: 3600)
+"""
+import enum
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class Stage(enum.Enum):
+    STARTING = 'starting'
+    GENERATING_AI = 'generating_ai'
+    WRITING_CONFIG = 'writing_config'
+    ZIPPING = 'zipping'
+    COMPLETED = 'completed'
+    ERROR = 'error'
+
+
+TERMINAL_STAGES = (Stage.COMPLETED, Stage.ERROR)
+
+STAGE_PROGRESS = {
+    Stage.STARTING: 5,
+    Stage.GENERATING_AI: 25,
+    Stage.WRITING_CONFIG: 75,
+    Stage.ZIPPING: 95,
+    Stage.COMPLETED: 100,
+    Stage.ERROR: 0,
+}
+
+# Shared message table; records store the key, and `{detail}` is filled per job
+MESSAGES = {
+    'starting': 'Initializing project generation...',
+    'generating_ai': 'Generating AI configurations...',
+    'writing_config': 'Rendering project files...',
+    'zipping': 'Creating download package...',
+    'completed': 'Project generation completed!',
+    'progressive_ai': 'Draft project ready for download; generating the AI version...',
+    'upgraded': 'AI version ready! Download the updated project.',
+    'upgrade_failed': 'AI generation failed ({detail}); the draft project is kept.',
+    'regenerate_starting': 'Starting regeneration...',
+    'regenerate_ai': 'Regenerating configuration...',
+    'regenerate_zipping': 'Updating download package...',
+    'regenerated': 'Project regenerated!',
+    'regenerate_failed': 'Regeneration failed ({detail}); previous project kept.',
+    'error': 'Error: {detail}',
+}
+
+# Upper bound for ?wait=, kept below common proxy read timeouts
+MAX_STATUS_WAIT_SECONDS = 30
+
+# Jobs examined per create(); keeps eviction O(1) amortized however many jobs are held
+EVICTION_SCAN = 64
+
+NOT_FOUND_BODY = json.dumps({'status': 'not_found', 'message': 'Session not found'}).encode()
+
+
+class Job:
+    """Mutable status record of one generation session."""
+
+    __slots__ = ('stage', 'progress', 'message_key', 'detail', 'artifact_key', 'project_name',
+                 'revision', 'provisional', 'owner', 'version', 'updated_at', 'lock', '_body', '_body_version')
+
+    def __init__(self, owner=None):
+        self.stage = Stage.STARTING
+        self.progress = STAGE_PROGRESS[Stage.STARTING]
+        self.message_key = 'starting'
+        self.detail = None
+        self.artifact_key = None
+        self.project_name = None
+        self.revision = 0
+        self.provisional = False
+        # Hashed owner token (see owner_tokens); never part of the status payload
+        self.owner = owner
+        self.version = 1
+        self.updated_at = time.monotonic()
+        self.lock = threading.Condition()
+        self._body = None
+        self._body_version = 0
+
+    def update(self, stage, message_key=None, detail=None, **fields):
+        """Move to `stage` in place; `fields` set artifact_key, project_name, revision or provisional."""
+        with self.lock:
+            # Fields first, so an unlocked reader that sees COMPLETED also sees its artifact
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.progress = STAGE_PROGRESS[stage]
+            self.message_key = message_key or stage.value
+            self.detail = detail
+            self.stage = stage
+            self.version += 1
+            self.updated_at = time.monotonic()
+            self.lock.notify_all()
+
+    def transition_if(self, expected, stage, message_key=None, detail=None, **fields):
+        """update() only if the job is at stage `expected`, checked under the same lock; returns whether it moved."""
+        with self.lock:
+            if self.stage is not expected:
+                return False
+            self.update(stage, message_key, detail, **fields)
+            return True
+
+    def wait_for_change(self, since, timeout):
+        """Block until the version differs from `since` or `timeout` passes; returns the version."""
+        with self.lock:
+            self.lock.wait_for(lambda: self.version != since, timeout)
+            return self.version
+
+    @property
+    def status(self):
+        return self.stage.value
+
+    def snapshot(self):
+        """The /status payload as a dict."""
+        with self.lock:
+            data = {
+                'status': self.stage.value,
+                'message': MESSAGES[self.message_key].format(detail=self.detail),
+                'progress': self.progress,
+                'version': self.version,
+            }
+            if self.revision:
+                data.update(artifact_key=self.artifact_key, project_name=self.project_name, revision=self.revision,
+                            provisional=self.provisional)
+            return data
+
+    def to_json(self):
+        """Serialized snapshot, cached until the next update."""
+        body, version = self._body, self._body_version
+        if body is not None and version == self.version:
+            return body
+        data = self.snapshot()
+        body = json.dumps(data).encode()
+        with self.lock:
+            if data['version'] == self.version:
+                self._body, self._body_version = body, data['version']
+        return body
+
+
+class JobRegistry:
+    """Session id -> Job, evicting finished jobs by idle time and count.
+
+    `on_evict(session_id)` is called for every evicted job, outside the lock.
+    """
+
+    def __init__(self, max_jobs=None, ttl_seconds=None, on_evict=None):
+        self.max_jobs = max_jobs if max_jobs is not None else int(os.getenv('JOB_MAX_SESSIONS', '5000'))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('JOB_TTL_SECONDS', '3600'))
+        self.on_evict = on_evict
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, session_id, owner=None):
+        job = Job(owner)
+        with self._lock:
+            self._jobs[session_id] = job
+            self._jobs.move_to_end(session_id)
+            evicted = self._sweep(time.monotonic())
+        if self.on_evict is not None:
+            for evicted_id in evicted:
+                self.on_evict(evicted_id)
+        return job
+
+    def _sweep(self, now):
+        """Evict finished jobs from the oldest end while they are expired (or over capacity).
+
+        Running jobs met on the way are rotated to the back so they never block
+        eviction; the sweep stops at the first finished job that may stay. Each
+        job is checked and dropped under its lock, so a job that transition_if()
+        restarts is either kept or already gone.
+        """
+        evicted = []
+        for _ in range(min(EVICTION_SCAN, len(self._jobs) - 1)):
+            session_id, job = next(iter(self._jobs.items()))
+            with job.lock:
+                if job.stage not in TERMINAL_STAGES:
+                    self._jobs.move_to_end(session_id)
+                elif now - job.updated_at >= self.ttl_seconds or len(self._jobs) > self.max_jobs:
+                    del self._jobs[session_id]
+                    evicted.append(session_id)
+                else:
+                    break
+        return evicted
+
+    def get(self, session_id):
+        return self._jobs.get(session_id)
+
+    def __len__(self):
+        return len(self._jobs)
+
+
+def parse_since(value):
+    """The `since` query argument as an int version, or None."""
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def parse_wait(value):
+    """The `wait` query argument in seconds, clamped to [0, MAX_STATUS_WAIT_SECONDS]."""
+    try:
+        seconds = float(value) if value is not None else 0.0
+    except ValueError:
+        return 0.0
+    return min(max(seconds, 0.0), MAX_STATUS_WAIT_SECONDS) if seconds == seconds else 0.0
@@ -0,0 +1,288 @@
+"""Record/replay of LLM responses for offline, deterministic benchmarks and regression runs.
+
+In record mode, the Gemini model returned by crew_engine.resolve_client is
+wrapped. Every call's prompt, response text, token usage and real latency is
+appended to a gzip-compressed JSON-lines corpus. Failed calls are recorded
+too, with their error type and message, so timeouts and provider errors show
+up again on replay.
+
+In replay mode, no API key or network access is needed. resolve_client hands
+out a ReplayModel with the same generate_content / generate_content_async
+interface. It answers from the corpus after sleeping for the recorded latency
+divided by LLM_REPLAY_SPEED. The rate limiter, model router, spans and token
+accounting therefore all see the production sequence of calls. Lookups match
+the model, prompt and generation config exactly, then fall back to the same
+prompt on any model (for example after "auto" routed elsewhere). A prompt
+recorded several times replays its responses round-robin, which reproduces
+the recorded latency distribution. A prompt that was never recorded raises
+ReplayMiss, which the engine treats like any other provider error.
+
+Provider quotas run on the replay clock: at speed N, the rate limiter allows N
+times the configured requests and tokens per minute (unlimited at speed 0),
+and the queue budget and backoff shrink by the same factor, so throttling
+ends in QuotaExhausted exactly when it would have on the recorded run.
+
+Prompts include the current year, so a corpus replays exactly only in the
+year it was recorded unless callers pass a fixed year (the benchmarks do).
+
+Configuration (environment):
+    LLM_REPLAY          record / replay (default: off)
+    LLM_REPLAY_CORPUS   corpus path (default: llm_corpus.jsonl.gz)
+    LLM_REPLAY_SPEED    replay time divisor: 1 = recorded timing, 10 = ten times faster, 0 = instant (default: 1)
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from rate_limiter import ModelLimiter
+
+REPLAY_MODES = ('record', 'replay')
+
+
+class ReplayMiss(LookupError):
+    """Replay mode got a prompt that is not in the corpus."""
+
+
+class ReplayedError(Exception):
+    """A provider error recorded in the corpus, raised again on replay."""
+
+    def __init__(self, error_type, message):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+class ReplayedUsage:
+    __slots__ = ('prompt_token_count', 'candidates_token_count')
+
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class ReplayedResponse:
+    """The parts of a provider response the engine reads: text and usage metadata."""
+
+    __slots__ = ('text', 'usage_metadata')
+
+    def __init__(self, text, input_tokens=None, output_tokens=None):
+        self.text = text
+        self.usage_metadata = ReplayedUsage(input_tokens, output_tokens)
+
+
+def prompt_hash(prompt_text):
+    return hashlib.sha256(str(prompt_text).encode('utf-8')).hexdigest()
+
+
+def call_key(model_name, prompt_text, generation_config=None):
+    """Hash of everything that determines a response: model, prompt and generation config."""
+    config = json.dumps(generation_config, sort_keys=True, default=str) if generation_config else ''
+    return hashlib.sha256(f"{model_name}\0{config}\0{prompt_text}".encode('utf-8')).hexdigest()
+
+
+def entry_for(model_name, prompt_text, generation_config, latency, response=None, error=None):
+    entry = {
+        'key': call_key(model_name, prompt_text, generation_config),
+        'prompt_hash': prompt_hash(prompt_text),
+        'model': model_name,
+        'template': getattr(prompt_text, 'template_id', None),
+        'latency': round(latency, 4),
+    }
+    if error is not None:
+        entry['error'] = {'type': type(error).__name__, 'message': str(error)}
+    else:
+        usage = getattr(response, 'usage_metadata', None)
+        entry['text'] = response.text
+        entry['input_tokens'] = getattr(usage, 'prompt_token_count', None)
+        entry['output_tokens'] = getattr(usage, 'candidates_token_count', None)
+    return entry
+
+
+class ReplayCorpus:
+    """Prompt-hash to recorded-call index over a gzip JSON-lines file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.by_key = {}
+        self.by_prompt = {}
+        self.cursors = {}
+        self.counts = {'entries': 0, 'recorded': 0, 'hits': 0, 'prompt_only_hits': 0, 'misses': 0}
+        if os.path.exists(path):
+            # Each record() appends its own gzip member; gzip reads them back as one stream
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self.index(json.loads(line))
+
+    def index(self, entry):
+        self.by_key.setdefault(entry['key'], []).append(entry)
+        self.by_prompt.setdefault(entry['prompt_hash'], []).append(entry)
+        self.counts['entries'] += 1
+
+    def record(self, entry):
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self.lock:
+            with gzip.open(self.path, 'at', encoding='utf-8') as f:
+                f.write(line)
+            self.index(entry)
+            self.counts['recorded'] += 1
+
+    def lookup(self, model_name, prompt_text, generation_config=None):
+        """The next recorded entry for this call (round-robin), or None."""
+        key = call_key(model_name, prompt_text, generation_config)
+        with self.lock:
+            entries = self.by_key.get(key)
+            if entries:
+                self.counts['hits'] += 1
+            else:
+                key = prompt_hash(prompt_text)
+                entries = self.by_prompt.get(key)
+                if not entries:
+                    self.counts['misses'] += 1
+                    return None
+                self.counts['prompt_only_hits'] += 1
+            cursor = self.cursors.get(key, 0)
+            self.cursors[key] = cursor + 1
+            return entries[cursor % len(entries)]
+
+    def stats(self):
+        with self.lock:
+            return {'path': self.path, 'prompts': len(self.by_prompt), **self.counts}
+
+
+class RecordingModel:
+    """Wraps a provider model and appends every call to the corpus."""
+
+    def __init__(self, model, model_name, corpus):
+        self.model = model
+        self.model_name = model_name
+        self.corpus = corpus
+
+    def generate_content(self, prompt_text, generation_config=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.model.generate_content(prompt_text, generation_config=generation_config, **kwargs)
+        except Exception as e:
+            self.corpus.record(entry_for(self.model_name, prompt_text, generation_config,
+                                         time.perf_counter() - started, error=e))
+            raise
+        self.corpus.record(entry_for(self.model_name, prompt_text, generation_config,
+                                     time.perf_counter() - started, response))
+        return response
+
+    async def generate_content_async(self, prompt_text, generation_config=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.model.generate_content_async(prompt_text, generation_config=generation_config,
+                                                               **kwargs)
+        except Exception as e:
+            self.corpus.record(entry_for(self.model_name, prompt_text, generation_config,
+                                         time.perf_counter() - started, error=e))
+            raise
+        self.corpus.record(entry_for(self.model_name, prompt_text, generation_config,
+                                     time.perf_counter() - started, response))
+        return response
+
+
+class ReplayModel:
+    """Stands in for a provider model, answering from the corpus at recorded (or scaled) latency."""
+
+    def __init__(self, model_name, corpus, speed=1.0):
+        self.model_name = model_name
+        self.corpus = corpus
+        self.speed = speed
+
+    def delay(self, entry):
+        return entry['latency'] / self.speed if self.speed > 0 else 0.0
+
+    def find(self, prompt_text, generation_config):
+        entry = self.corpus.lookup(self.model_name, prompt_text, generation_config)
+        if entry is None:
+            raise ReplayMiss(f"No recorded response for {getattr(prompt_text, 'template_id', None) or 'prompt'} "
+                             f"{prompt_hash(prompt_text)[:12]} on {self.model_name}")
+        return entry
+
+    @staticmethod
+    def result(entry):
+        error = entry.get('error')
+        if error is not None:
+            raise ReplayedError(error['type'], error['message'])
+        return ReplayedResponse(entry['text'], entry.get('input_tokens'), entry.get('output_tokens'))
+
+    def generate_content(self, prompt_text, generation_config=None, **kwargs):
+        entry = self.find(prompt_text, generation_config)
+        time.sleep(self.delay(entry))
+        return self.result(entry)
+
+    async def generate_content_async(self, prompt_text, generation_config=None, **kwargs):
+        entry = self.find(prompt_text, generation_config)
+        await asyncio.sleep(self.delay(entry))
+        return self.result(entry)
+
+
+class LLMReplay:
+    """The process-wide record or replay session."""
+
+    def __init__(self, mode, corpus, speed=1.0):
+        self.mode = mode
+        self.corpus = corpus
+        self.speed = speed
+        self.models = {}
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def replay_model(self, model_name):
+        with self.lock:
+            model = self.models.get(model_name)
+            if model is None:
+                model = self.models[model_name] = ReplayModel(model_name, self.corpus, self.speed)
+            return model
+
+    def limiter(self, limiter):
+        """The provider's quota limiter on the replay clock: quotas and the queue budget scale with the replay speed."""
+        if self.speed == 1:
+            return limiter
+        scale = self.speed if self.speed > 0 else float('inf')
+        key = (limiter.provider, limiter.model)
+        with self.lock:
+            scaled = self.limiters.get(key)
+            if scaled is None:
+                scaled = self.limiters[key] = ModelLimiter(
+                    limiter.provider, limiter.model,
+                    limiter.requests_per_minute * scale, limiter.tokens_per_minute * scale,
+                    max_retries=limiter.max_retries, base_delay=limiter.base_delay / scale,
+                    max_delay=limiter.max_delay / scale,
+                    max_wait=limiter.max_wait / scale if limiter.max_wait is not None else None,
+                )
+            return scaled
+
+    def wrap(self, model, model_name):
+        return RecordingModel(model, model_name, self.corpus)
+
+    def stats(self):
+        return {'mode': self.mode, 'speed': self.speed, **self.corpus.stats()}
+
+
+_replay = None
+_replay_lock = threading.Lock()
+
+
+def get_replay():
+    """Return the record/replay session configured by LLM_REPLAY, or None when it is off."""
+    global _replay
+    mode = os.getenv('LLM_REPLAY', '').strip().lower()
+    if mode not in REPLAY_MODES:
+        return None
+    with _replay_lock:
+        if _replay is None or _replay.mode != mode:
+            corpus = ReplayCorpus(os.getenv('LLM_REPLAY_CORPUS', 'llm_corpus.jsonl.gz'))
+            _replay = LLMReplay(mode, corpus, float(os.getenv('LLM_REPLAY_SPEED', '1')))
+    return _replay
@@ -0,0 +1,248 @@
+"""Latency- and quality-aware routing for the "auto" model option.
+
+Every LLM call reports its latency and outcome here, and every generation
+reports whether its response passed validation. Per model, the router keeps
+exponentially weighted moving averages (EWMA) of latency, error rate and
+validation-failure rate, plus a sliding window of recent latencies for
+percentiles. An "auto" request goes to the model with the lowest EWMA latency
+among those within the error and validation-failure thresholds. A small share
+of requests explores the other models so their statistics stay current.
+
+A model that times out repeatedly is ejected for a cooldown period that doubles
+on each repeat. When the cooldown ends, one probe request decides whether it
+is reinstated. A probe whose outcome is never reported (the request failed
+before reaching the provider, say) expires after AUTO_PROBE_SECONDS, and the
+next request probes again.
+
+Configuration (environment):
+    AUTO_MODELS             comma-separated candidate models (default: the Gemini models in AI_MODELS)
+    AUTO_MAX_ERROR_RATE     EWMA error rate above which a model is skipped (default: 0.2)
+    AUTO_MAX_INVALID_RATE   EWMA validation-failure rate above which a model is skipped (default: 0.25)
+    AUTO_EJECT_TIMEOUTS     consecutive timeouts that eject a model (default: 2)
+    AUTO_EJECT_SECONDS      first ejection period in seconds, doubled per repeat up to 10 minutes (default: 60)
+    AUTO_EXPLORE_RATE       share of requests sent to a random available model (default: 0.05)
+    AUTO_PROBE_SECONDS      time after which an unanswered probe no longer blocks the next one (default: 180)
+"""
+import os
+import random
+import threading
+import time
+
+AUTO_MODEL = 'auto'
+
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 256
+MAX_EJECT_SECONDS = 600
+
+
+def is_timeout(exc):
+    """Best-effort detection of a provider call that timed out."""
+    if isinstance(exc, TimeoutError):
+        return True
+    # Errors replayed by llm_replay carry the recorded provider error type
+    if getattr(exc, 'error_type', type(exc).__name__) in ('DeadlineExceeded', 'ReadTimeout', 'ConnectTimeout', 'Timeout', 'APITimeoutError'):
+        return True
+    message = str(exc).lower()
+    return 'timed out' in message or 'deadline' in message or 'timeout' in message
+
+
+def ewma(current, sample):
+    return sample if current is None else current + EWMA_ALPHA * (sample - current)
+
+
+class LatencyWindow:
+    """Fixed-size ring of recent latencies for percentile estimates."""
+
+    __slots__ = ('size', 'samples', 'index')
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self.size = size
+        self.samples = []
+        self.index = 0
+
+    def add(self, value):
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            self.samples[self.index] = value
+            self.index = (self.index + 1) % self.size
+
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ModelHealth:
+    """Rolling statistics and ejection state of one model."""
+
+    __slots__ = ('model', 'latency_ewma', 'error_ewma', 'invalid_ewma', 'latencies', 'calls', 'errors',
+                 'timeouts', 'consecutive_timeouts', 'validations', 'invalid', 'ejected_until', 'ejections',
+                 'probe_started')
+
+    def __init__(self, model):
+        self.model = model
+        self.latency_ewma = None
+        self.error_ewma = 0.0
+        self.invalid_ewma = 0.0
+        self.latencies = LatencyWindow()
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.consecutive_timeouts = 0
+        self.validations = 0
+        self.invalid = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.probe_started = None
+
+    def is_ejected(self, now):
+        return now < self.ejected_until
+
+    def is_probing(self, now, probe_seconds):
+        return self.probe_started is not None and now - self.probe_started < probe_seconds
+
+    def healthy(self, max_error_rate, max_invalid_rate):
+        return self.error_ewma <= max_error_rate and self.invalid_ewma <= max_invalid_rate
+
+    def stats(self, now):
+        def rounded(value):
+            return round(value, 3) if value is not None else None
+
+        return {
+            'model': self.model,
+            'calls': self.calls,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'validations': self.validations,
+            'invalid': self.invalid,
+            'latency_ewma_seconds': rounded(self.latency_ewma),
+            'latency_p50_seconds': rounded(self.latencies.percentile(0.5)),
+            'latency_p95_seconds': rounded(self.latencies.percentile(0.95)),
+            'error_rate_ewma': round(self.error_ewma, 4),
+            'invalid_rate_ewma': round(self.invalid_ewma, 4),
+            'ejected': self.is_ejected(now),
+            'ejected_for_seconds': round(max(0.0, self.ejected_until - now), 1),
+            'ejections': self.ejections,
+        }
+
+
+class ModelRouter:
+    """Picks the model for "auto" requests from the rolling health of each candidate."""
+
+    def __init__(self, models, max_error_rate=0.2, max_invalid_rate=0.25, eject_timeouts=2,
+                 eject_seconds=60.0, explore_rate=0.05, probe_seconds=180.0):
+        self.models = list(models)
+        self.max_error_rate = max_error_rate
+        self.max_invalid_rate = max_invalid_rate
+        self.eject_timeouts = eject_timeouts
+        self.eject_seconds = eject_seconds
+        self.explore_rate = explore_rate
+        self.probe_seconds = probe_seconds
+        self.health = {}
+        self.lock = threading.Lock()
+
+    def get_health(self, model):
+        health = self.health.get(model)
+        if health is None:
+            health = self.health[model] = ModelHealth(model)
+        return health
+
+    def choose(self):
+        """The model for the next "auto" request."""
+        now = time.monotonic()
+        with self.lock:
+            candidates = [self.get_health(model) for model in self.models]
+            available = [health for health in candidates if not health.is_ejected(now)]
+            if not available:
+                # Everything is ejected: use whichever model comes back first
+                return min(candidates, key=lambda health: health.ejected_until).model
+            for health in available:
+                # Models without data, or back from ejection, get one probe request at a time
+                if health.calls == 0 or health.consecutive_timeouts >= self.eject_timeouts:
+                    if not health.is_probing(now, self.probe_seconds):
+                        health.probe_started = now
+                        return health.model
+            if random.random() < self.explore_rate:
+                return random.choice(available).model
+            healthy = [health for health in available if health.healthy(self.max_error_rate, self.max_invalid_rate)]
+            if not healthy:
+                # Nothing meets the quality bar: take the least failing model
+                return min(available, key=lambda health: health.error_ewma + health.invalid_ewma).model
+            # A model whose first call is still in flight has no latency yet; rank it last
+            return min(healthy, key=lambda health: health.latency_ewma
+                       if health.latency_ewma is not None else float('inf')).model
+
+    def observe_call(self, model, latency, error=None):
+        """Record one provider call; ejects the model after repeated timeouts."""
+        timed_out = error is not None and is_timeout(error)
+        with self.lock:
+            health = self.get_health(model)
+            health.calls += 1
+            health.error_ewma = ewma(health.error_ewma, 1.0 if error is not None else 0.0)
+            if error is None or timed_out:
+                # A timeout's latency is a lower bound, but still the best signal of a slow model
+                health.latency_ewma = ewma(health.latency_ewma, latency)
+                health.latencies.add(latency)
+            if error is not None:
+                health.errors += 1
+            if not timed_out:
+                probed = health.probe_started is not None and health.consecutive_timeouts >= self.eject_timeouts
+                if error is None and probed:
+                    # The probe after an ejection succeeded; start over with a clean error record
+                    health.error_ewma = 0.0
+                health.consecutive_timeouts = 0
+                health.probe_started = None
+                return
+            health.timeouts += 1
+            health.consecutive_timeouts += 1
+            health.probe_started = None
+            if health.consecutive_timeouts >= self.eject_timeouts:
+                period = min(self.eject_seconds * (2 ** health.ejections), MAX_EJECT_SECONDS)
+                health.ejected_until = time.monotonic() + period
+                health.ejections += 1
+                print(f"Model router: ejecting {model} for {period:.0f}s after "
+                      f"{health.consecutive_timeouts} consecutive timeouts")
+
+    def observe_validation(self, model, valid):
+        """Record whether a generation's response from `model` passed validation."""
+        with self.lock:
+            health = self.get_health(model)
+            health.validations += 1
+            health.invalid += not valid
+            health.invalid_ewma = ewma(health.invalid_ewma, 0.0 if valid else 1.0)
+
+    def stats(self):
+        now = time.monotonic()
+        with self.lock:
+            return {
+                'candidates': list(self.models),
+                'max_error_rate': self.max_error_rate,
+                'max_invalid_rate': self.max_invalid_rate,
+                'models': [health.stats(now) for health in self.health.values()],
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router(default_models):
+    """Return the process-wide router configured from the environment."""
+    global _router
+    if _router is not None:
+        return _router
+    with _router_lock:
+        if _router is None:
+            models = [name.strip() for name in os.getenv('AUTO_MODELS', '').split(',') if name.strip()]
+            _router = ModelRouter(
+                models or default_models,
+                max_error_rate=float(os.getenv('AUTO_MAX_ERROR_RATE', '0.2')),
+                max_invalid_rate=float(os.getenv('AUTO_MAX_INVALID_RATE', '0.25')),
+                eject_timeouts=int(os.getenv('AUTO_EJECT_TIMEOUTS', '2')),
+                eject_seconds=float(os.getenv('AUTO_EJECT_SECONDS', '60')),
+                explore_rate=float(os.getenv('AUTO_EXPLORE_RATE', '0.05')),
+                probe_seconds=float(os.getenv('AUTO_PROBE_SECONDS', '180')),
+            )
+    return _router
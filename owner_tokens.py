@@ -0,0 +1,43 @@
+"""Owner tokens: who may download, regenerate and search a generation.
+
+/generate gives every client without a token a random owner token. Browsers
+keep it in an HttpOnly cookie. API clients get it once as `owner_token` in
+the response and send it back in the X-Owner-Token header. Jobs and history
+entries store only the token's SHA-256. /download, /regenerate and
+/history/search only serve sessions recorded for the caller's token; any
+other session answers exactly like an unknown one, so session ids cannot be
+probed.
+"""
+import hashlib
+import hmac
+import secrets
+
+OWNER_COOKIE = 'crew_owner'
+OWNER_HEADER = 'X-Owner-Token'
+OWNER_COOKIE_MAX_AGE = 365 * 24 * 3600
+
+
+def new_owner_token():
+    return secrets.token_urlsafe(32)
+
+
+def owner_id(token):
+    """The stored form of an owner token, or None without a token."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest() if token else None
+
+
+def request_owner_token(headers, cookies):
+    """The caller's owner token: the header sent by API clients, else the browser cookie."""
+    return headers.get(OWNER_HEADER) or cookies.get(OWNER_COOKIE) or None
+
+
+def is_owner(stored_owner, token):
+    """True if `token` is the owner token recorded (hashed) for a session."""
+    caller = owner_id(token)
+    return stored_owner is not None and caller is not None and hmac.compare_digest(stored_owner, caller)
+
+
+def set_owner_cookie(response, token, secure):
+    """Keep the owner token in the browser; works with both Flask and Quart responses."""
+    response.set_cookie(OWNER_COOKIE, token, max_age=OWNER_COOKIE_MAX_AGE, httponly=True, samesite='Lax',
+                        secure=secure)
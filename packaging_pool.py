@@ -0,0 +1,123 @@
+"""Executor for the CPU-bound packaging stage (rendering, YAML, DEFLATE).
+
+With many generations in flight, rendering and compressing ZIPs in request
+threads holds the GIL and delays every other request, including /status polls.
+Packaging is therefore submitted to a process pool (or a subinterpreter pool on
+Pythons that provide one), while LLM waits stay on threads or the event loop.
+
+Configuration (environment):
+    PACKAGING_EXECUTOR   process (default) / interpreter / inline
+    PACKAGING_WORKERS    pool size (default: min(4, CPU count))
+"""
+import os
+import threading
+
+EXECUTOR_KINDS = ('process', 'interpreter', 'inline')
+
+_executor = None
+_executor_kind = None
+_executor_lock = threading.Lock()
+
+
+def create_executor(kind, workers):
+    """Build the pool for `kind`; None means run packaging in the calling thread."""
+    import concurrent.futures
+    import multiprocessing
+
+    if kind == 'inline':
+        return None
+    if kind == 'interpreter':
+        # Python 3.14+; older interpreters fall back to processes
+        pool_class = getattr(concurrent.futures, 'InterpreterPoolExecutor', None)
+        if pool_class is not None:
+            return pool_class(max_workers=workers)
+    # Forking a process that already runs request threads and SDK clients is unsafe
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+    )
+
+
+def get_packaging_executor():
+    """Return the process-wide packaging executor configured from the environment."""
+    global _executor, _executor_kind
+    if _executor_kind is not None:
+        return _executor
+    with _executor_lock:
+        if _executor_kind is None:
+            kind = os.getenv('PACKAGING_EXECUTOR', 'process').lower()
+            if kind not in EXECUTOR_KINDS:
+                raise ValueError(f"Unknown PACKAGING_EXECUTOR: {kind}")
+            workers = int(os.getenv('PACKAGING_WORKERS') or min(4, os.cpu_count() or 1))
+            _executor = create_executor(kind, workers)
+            _executor_kind = kind
+    return _executor
+
+
+def reset_packaging_executor():
+    """Drop a broken pool so the next call builds a fresh one."""
+    global _executor, _executor_kind
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _executor_kind = None
+
+
+def run_packaging(fn, *args):
+    """Run a picklable packaging function in the pool and wait for its result."""
+    from concurrent.futures.process import BrokenProcessPool
+
+    executor = get_packaging_executor()
+    if executor is None:
+        return fn(*args)
+    try:
+        return executor.submit(fn, *args).result()
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); finish this job here and rebuild the pool
+        reset_packaging_executor()
+        return fn(*args)
+
+
+async def run_packaging_async(fn, *args):
+    """Async variant of run_packaging that awaits the pool without blocking the event loop."""
+    import asyncio
+    from concurrent.futures.process import BrokenProcessPool
+
+    executor = get_packaging_executor()
+    if executor is None:
+        return await asyncio.to_thread(fn, *args)
+    try:
+        return await asyncio.wrap_future(executor.submit(fn, *args))
+    except BrokenProcessPool:
+        reset_packaging_executor()
+        return await asyncio.to_thread(fn, *args)
+
+
+def warm_worker():
+    """Import the packaging dependencies in a worker so the first real job does not pay for it."""
+    import yaml  # noqa: F401
+    import zlib  # noqa: F401
+    import crew_engine  # noqa: F401
+    return os.getpid()
+
+
+def warm_packaging_pool():
+    """Start every pool worker up front; returns the executor kind in use.
+
+    If the workers cannot start at all, packaging falls back to the calling
+    thread for the life of the process instead of failing every job.
+    """
+    global _executor, _executor_kind
+    executor = get_packaging_executor()
+    if executor is None:
+        return _executor_kind
+    try:
+        workers = getattr(executor, '_max_workers', 1)
+        for future in [executor.submit(warm_worker) for _ in range(workers)]:
+            future.result()
+    except Exception as e:
+        print(f"Packaging pool failed to start ({e}); packaging inline")
+        with _executor_lock:
+            executor.shutdown(wait=False, cancel_futures=True)
+            _executor, _executor_kind = None, 'inline'
+    return _executor_kind
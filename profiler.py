@@ -0,0 +1,165 @@
+"""On-demand sampling profiler and allocation snapshots for the live server.
+
+`sample_stacks` snapshots every thread's stack with sys._current_frames() at a
+fixed rate (generation workers included) and aggregates them into collapsed
+stacks, the "frame;frame;frame count" format read by flamegraph.pl, speedscope
+and inferno. Nothing is instrumented between profiles, so it costs nothing
+when idle and roughly one stack walk per thread per sample while running.
+
+`allocation_diff` takes two tracemalloc snapshots N seconds apart and reports
+where memory grew in between.
+
+The /debug/profile endpoint is disabled unless PROFILER_TOKEN is set, and
+then requires `Authorization: Bearer <PROFILER_TOKEN>`.
+"""
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+MAX_PROFILE_SECONDS = 120
+DEFAULT_SAMPLE_HZ = 100
+MAX_SAMPLE_HZ = 1000
+TRACEMALLOC_FRAMES = 25
+
+# One profile at a time; a second request gets a 409
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running."""
+
+
+def profiler_token():
+    return os.getenv('PROFILER_TOKEN') or None
+
+
+def is_authorized(authorization_header):
+    """True if profiling is enabled and the request carries the configured bearer token."""
+    token = profiler_token()
+    if token is None or not authorization_header:
+        return False
+    scheme, _, value = authorization_header.partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(value.strip(), token)
+
+
+def parse_profile_args(args):
+    """(seconds, hz) from query arguments, clamped to safe bounds."""
+    try:
+        seconds = float(args.get('seconds', 10))
+        hz = int(args.get('hz', DEFAULT_SAMPLE_HZ))
+    except (TypeError, ValueError):
+        seconds, hz = 10.0, DEFAULT_SAMPLE_HZ
+    return min(max(seconds, 0.1), MAX_PROFILE_SECONDS), min(max(hz, 1), MAX_SAMPLE_HZ)
+
+
+def frame_label(code):
+    # Function plus file and definition line, so samples aggregate per function
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+def thread_label(thread):
+    # "Thread-12 (generate_project_async)" -> "Thread (generate_project_async)" so workers aggregate
+    name = thread.name if thread is not None else 'unknown'
+    return re.sub(r'-\d+', '', name).replace(';', ':')
+
+
+def sample_stacks(seconds, hz=DEFAULT_SAMPLE_HZ):
+    """Sample all threads for `seconds`; returns (Counter of collapsed stacks, sample count)."""
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        own_ident = threading.get_ident()
+        interval = 1.0 / hz
+        stacks = Counter()
+        samples = 0
+        deadline = time.perf_counter() + seconds
+        next_sample = time.perf_counter()
+        while next_sample < deadline:
+            threads = {thread.ident: thread for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(thread_label(threads.get(ident)))
+                stacks[';'.join(reversed(labels))] += 1
+            samples += 1
+            next_sample += interval
+            time.sleep(max(0.0, next_sample - time.perf_counter()))
+        return stacks, samples
+    finally:
+        _profile_lock.release()
+
+
+def format_collapsed(stacks):
+    """Collapsed-stack text, heaviest stacks first."""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def allocation_diff(seconds, limit=50):
+    """Snapshot tracemalloc, wait, snapshot again; returns the StatisticDiffs grouped by traceback.
+
+    tracemalloc is started for the window if it was not already tracing, and
+    stopped again afterwards so it adds no overhead outside a profile.
+    """
+    import tracemalloc
+
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    started_here = not tracemalloc.is_tracing()
+    try:
+        if started_here:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diffs = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'traceback')
+        return [diff for diff in diffs if diff.size_diff > 0][:limit], current, peak
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _profile_lock.release()
+
+
+def format_allocations(diffs, current, peak, gauges=None, collapsed=False):
+    """Text report of allocation growth, or collapsed stacks weighted by bytes grown."""
+    if collapsed:
+        lines = []
+        for diff in diffs:
+            frames = [f"{os.path.basename(frame.filename)}:{frame.lineno}".replace(';', ':')
+                      for frame in diff.traceback]
+            lines.append(f"{';'.join(frames)} {diff.size_diff}\n")
+        return ''.join(lines)
+
+    lines = [f"# traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n"]
+    for name, value in (gauges or {}).items():
+        lines.append(f"# {name}: {value}\n")
+    for diff in diffs:
+        # Tracebacks run oldest frame first; the allocation site is the last one
+        frame = diff.traceback[-1]
+        lines.append(f"{diff.size_diff / 1024:+10.1f} KiB {diff.count_diff:+8d} blocks  "
+                     f"{frame.filename}:{frame.lineno}\n")
+    return ''.join(lines)
+
+
+def profile_report(args, gauges=None):
+    """Run the profile described by the /debug/profile query arguments and return its text.
+
+    mode=cpu (default) samples stacks at ?hz= for ?seconds=; mode=memory diffs
+    tracemalloc snapshots over the same window (format=collapsed for a
+    flamegraph weighted by bytes grown). Raises ProfilerBusy if one is running.
+    """
+    seconds, hz = parse_profile_args(args)
+    if args.get('mode') == 'memory':
+        diffs, current, peak = allocation_diff(seconds)
+        return format_allocations(diffs, current, peak, gauges, collapsed=args.get('format') == 'collapsed')
+    stacks, samples = sample_stacks(seconds, hz)
+    return f"# {samples} samples at {hz} Hz over {seconds:g}s\n" + format_collapsed(stacks)
@@ -0,0 +1,338 @@
+"""Versioned, precompiled prompt templates and per-provider token counting.
+
+Prompts are registered once as (name, variant, version) templates. Each
+template is parsed into literal and placeholder parts at import time, so
+rendering is a join, and its fixed text is token-counted once per provider.
+Rendered prompts carry their template id (e.g. "config.compact@2"), which
+the LLM call records with its input and output tokens, so variants and
+versions can be compared on cost and on validation results.
+
+Bump a template's version whenever its text changes.
+
+Configuration (environment):
+    PROMPT_VARIANT   variant used where a template has several: full or compact (default: full)
+"""
+import os
+import string
+
+DEFAULT_VARIANT = 'full'
+
+# Average characters per token for providers without a local tokenizer
+CHARS_PER_TOKEN = {'gemini': 4.0, 'openai': 4.0, 'anthropic': 3.5}
+
+_openai_encoding = None
+
+
+class RenderedPrompt(str):
+    """Prompt text that remembers the template that produced it."""
+
+    template_id = None
+
+    def __new__(cls, text, template_id=None):
+        prompt = super().__new__(cls, text)
+        prompt.template_id = template_id
+        return prompt
+
+
+def compile_template(text):
+    """Split str.format-style text into [(literal, field or None)]; `{{`/`}}` are literal braces."""
+    parts = []
+    for literal, field, format_spec, conversion in string.Formatter().parse(text):
+        if field is not None and (not field.isidentifier() or format_spec or conversion):
+            raise ValueError(f"Unsupported placeholder {{{field}}} in prompt template")
+        parts.append((literal, field))
+    return parts
+
+
+class PromptTemplate:
+    """One compiled prompt template."""
+
+    __slots__ = ('name', 'variant', 'version', 'parts', 'fields', 'static_text', '_static_tokens')
+
+    def __init__(self, name, variant, version, text):
+        self.name = name
+        self.variant = variant
+        self.version = version
+        self.parts = compile_template(text)
+        self.fields = frozenset(field for _, field in self.parts if field is not None)
+        self.static_text = ''.join(literal for literal, _ in self.parts)
+        self._static_tokens = {}
+
+    @property
+    def id(self):
+        return f"{self.name}.{self.variant}@{self.version}"
+
+    def render(self, **values):
+        missing = self.fields.difference(values)
+        if missing:
+            raise KeyError(f"Prompt template {self.id} needs {', '.join(sorted(missing))}")
+        pieces = []
+        for literal, field in self.parts:
+            pieces.append(literal)
+            if field is not None:
+                pieces.append(str(values[field]))
+        return RenderedPrompt(''.join(pieces), self.id)
+
+    def static_tokens(self, provider='gemini'):
+        """Tokens in the fixed text of the template, counted once per provider."""
+        tokens = self._static_tokens.get(provider)
+        if tokens is None:
+            tokens = self._static_tokens[provider] = count_tokens(self.static_text, provider)
+        return tokens
+
+    def describe(self):
+        return {
+            'id': self.id,
+            'fields': sorted(self.fields),
+            'static_chars': len(self.static_text),
+            'static_tokens': {provider: self.static_tokens(provider) for provider in CHARS_PER_TOKEN},
+        }
+
+
+def openai_encoding():
+    """tiktoken's cl100k_base encoding if tiktoken is installed, else None."""
+    global _openai_encoding
+    if _openai_encoding is None:
+        try:
+            import tiktoken
+            _openai_encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            _openai_encoding = False
+    return _openai_encoding or None
+
+
+def count_tokens(text, provider='gemini'):
+    """Token count of `text` for `provider`: tiktoken for OpenAI when available, else a per-provider ratio."""
+    if provider == 'openai':
+        encoding = openai_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text))
+    return max(1, round(len(text) / CHARS_PER_TOKEN.get(provider, 4.0)))
+
+
+# (name, variant) -> current PromptTemplate
+TEMPLATES = {}
+
+
+def register(name, variant, version, text):
+    TEMPLATES[(name, variant)] = PromptTemplate(name, variant, version, text)
+
+
+def prompt_variant():
+    return os.getenv('PROMPT_VARIANT', DEFAULT_VARIANT)
+
+
+def get_template(name, variant=None):
+    """The template for `name` in the requested (or configured) variant, else its full variant."""
+    return TEMPLATES.get((name, variant or prompt_variant())) or TEMPLATES[(name, DEFAULT_VARIANT)]
+
+
+def render_prompt(name, variant=None, **values):
+    return get_template(name, variant).render(**values)
+
+
+def template_catalog():
+    """Description of every registered template, for /api/generation-stats."""
+    return [template.describe() for template in TEMPLATES.values()]
+
+
+# Two-agent configuration as free-form YAML
+register('config', 'full', 2, """
+You are an expert CrewAI configuration generator. Create both agents.yaml and tasks.yaml files for the project: "{topic}"{domain_line}
+
+REQUIREMENTS:
+1. Generate 2 agents with consistent naming between files
+2. Agent names should be descriptive and topic-specific (snake_case)
+3. Generate 2 tasks that use these exact agent names
+4. Tasks should build upon each other sequentially
+5. DO NOT include tools in agents - tools are handled separately
+6. Tasks should use user-provided information from inputs, not just the topic
+
+GENERATE BOTH FILES WITH CONSISTENT AGENT NAMES:
+
+--- agents.yaml ---
+agent_name_1:
+  role: >
+    [Specific role for {topic}]
+  goal: >
+    [Measurable goal related to {topic}]
+  backstory: >
+    [Detailed backstory showing expertise in {topic}]
+  verbose: true
+  allow_delegation: true
+
+agent_name_2:
+  role: >
+    [Different specific role for {topic}]
+  goal: >
+    [Different measurable goal for {topic}]
+  backstory: >
+    [Different expertise backstory for {topic}]
+  verbose: true
+  allow_delegation: false
+
+--- tasks.yaml ---
+task_name_1:
+  description: >
+    Analyze the topic "{topic}" and all user-provided information.
+    Extract and understand ALL available inputs including any variables like:
+    {{recipient_name}}, {{subject}}, {{sender_name}}, {{additional_context}}, 
+    {{project_details}}, {{requirements}}, {{target_audience}}, or any other user inputs.
+    
+    Create a comprehensive plan for using this information in the final deliverable.
+    Current year: {{current_year}}
+  expected_output: >
+    A detailed analysis that identifies all user inputs and creates a plan for
+    incorporating them into the final deliverable. No generic content allowed.
+  agent: agent_name_1
+
+task_name_2:
+  description: >
+    Create the final deliverable for "{topic}" using ALL user-provided information.
+    
+    MANDATORY: Use actual user inputs from variables like {{recipient_name}}, {{subject}}, 
+    {{sender_name}}, {{additional_context}}, {{project_details}}, {{requirements}}, 
+    {{target_audience}}, or any other provided inputs.
+    
+    The output MUST be personalized with real user data, not examples or placeholders.
+    Current year: {{current_year}}
+  expected_output: >
+    A complete deliverable that uses ALL user-provided information with actual names,
+    subjects, context, and details. Must be personalized and ready for immediate use.
+  agent: agent_name_2
+
+IMPORTANT: Use the EXACT SAME agent names in both files. Use descriptive names like 'content_analyzer' and 'content_creator'.
+CRITICAL: Tasks MUST use ALL available template variables from user inputs. Include variables like {{recipient_name}}, {{subject}}, {{sender_name}}, {{additional_context}}, {{project_details}}, {{requirements}}, {{target_audience}} etc.
+CRITICAL: Tasks MUST incorporate actual user-provided information and produce personalized outputs, not generic examples.
+CRITICAL: The final deliverable MUST use real user data (names, subjects, context) provided in the inputs dictionary.
+
+Current year: {current_year}
+Topic: "{topic}"
+""")
+
+register('config', 'compact', 2, """
+Generate CrewAI agents.yaml and tasks.yaml for the project: "{topic}"{domain_line}
+
+- 2 agents with descriptive, topic-specific snake_case names, each with `role`, `goal`, `backstory` and
+  `verbose: true`; `allow_delegation: true` for the first, `false` for the second; no tools.
+- 2 sequential tasks (analyze the inputs and plan, then create the final deliverable), each with
+  `description`, `expected_output` and `agent` set to the exact name of one of the agents.
+- Task descriptions must use the user inputs via template variables such as {{topic}}, {{recipient_name}},
+  {{subject}}, {{sender_name}}, {{additional_context}}, {{project_details}}, {{requirements}},
+  {{target_audience}} and {{current_year}}, and produce personalized output, not generic examples.
+
+Return only the two files in this format:
+--- agents.yaml ---
+<agents>
+--- tasks.yaml ---
+<tasks>
+
+Current year: {current_year}
+""")
+
+# Two-agent configuration as schema-constrained JSON (see crew_engine.CONFIG_SCHEMA)
+register('config_structured', 'full', 2, """
+You are an expert CrewAI configuration generator. Design the agents and tasks for the project: "{topic}"{domain_line}
+
+REQUIREMENTS:
+1. Generate 2 agents with descriptive, topic-specific snake_case names (e.g. 'content_analyzer', 'content_creator')
+2. Generate 2 tasks; each task's `agent` must be the exact name of one of the agents
+3. Tasks should build upon each other sequentially: the first analyzes and plans, the second creates the final deliverable
+4. Only the first agent may delegate (allow_delegation true for the first agent, false for the second)
+5. Give each agent a specific role, a measurable goal and a backstory showing expertise in {topic}
+
+CRITICAL: Task descriptions MUST use the template variables for user inputs, written in braces, such as
+{{topic}}, {{recipient_name}}, {{subject}}, {{sender_name}}, {{additional_context}}, {{project_details}},
+{{requirements}}, {{target_audience}} and {{current_year}}.
+CRITICAL: The final deliverable MUST be personalized with the real user data from those inputs, not generic examples or placeholders.
+
+Current year: {current_year}
+Topic: "{topic}"
+""")
+
+register('config_structured', 'compact', 2, """
+Design the CrewAI agents and tasks for the project: "{topic}"{domain_line}
+
+- 2 agents with descriptive, topic-specific snake_case names; only the first may delegate.
+- 2 sequential tasks (analyze the inputs and plan, then create the final deliverable); each task's
+  `agent` is the exact name of one of the agents.
+- Task descriptions must use the user inputs via template variables such as {{topic}}, {{recipient_name}},
+  {{subject}}, {{sender_name}}, {{additional_context}}, {{project_details}}, {{requirements}},
+  {{target_audience}} and {{current_year}}, and produce personalized output, not generic examples.
+
+Current year: {current_year}
+""")
+
+# N-agent crews: roster planning, then one prompt per planned agent
+register('crew_plan', 'full', 1, """
+You are an expert CrewAI crew designer. Plan a crew of {agent_count} agents for the project: "{topic}"
+
+Each agent owns exactly ONE task, and the tasks run in the listed order, each building on the previous one.
+The last task produces the final, personalized deliverable from the user's inputs.
+Use descriptive, topic-specific snake_case names; agent and task names must all be unique.
+Return ONLY a YAML list in this format, no commentary:
+
+- agent: agent_name
+  role: one-line role
+  task: task_name
+  summary: one line describing what the task produces
+
+Current year: {current_year}
+""")
+
+register('crew_member', 'full', 1, """
+You are an expert CrewAI configuration generator for the project: "{topic}"
+
+The crew runs these tasks in order:
+{roster}
+
+Write ONLY the agent `{agent}` and its task `{task}` ({position}).
+The agent needs `role`, `goal`, `backstory`, `verbose: true` and `allow_delegation: false`; no tools.
+The task needs `description`, `expected_output` and `agent: {agent}`. It must use user inputs via
+template variables such as {{recipient_name}}, {{subject}}, {{additional_context}}, {{requirements}},
+{{target_audience}} and {{current_year}}, and produce personalized output, not generic examples.
+Return exactly this format:
+
+--- agents.yaml ---
+{agent}:
+  ...
+
+--- tasks.yaml ---
+{task}:
+  ...
+
+Current year: {current_year}
+""")
+
+# Incremental regeneration
+register('regenerate_tasks', 'full', 1, """
+You are an expert CrewAI configuration generator. Rewrite ONLY tasks.yaml for the project: "{topic}".
+
+The agents are fixed:
+{agents_yaml}
+Write one task per agent, in sequence, each with `description`, `expected_output` and `agent`
+(an agent name from above). Tasks must use user inputs via template variables such as
+{{recipient_name}}, {{subject}}, {{additional_context}}, {{requirements}}, {{target_audience}}
+and {{current_year}}, and produce personalized output, not generic examples.
+Return only the YAML for tasks.yaml, no commentary.
+
+Current year: {current_year}
+""")
+
+register('regenerate_agent', 'full', 1, """
+You are an expert CrewAI configuration generator. The project "{topic}" already has these agents:
+{agents_yaml}
+Add exactly ONE new agent: {description}
+Give it a new snake_case name, `role`, `goal`, `backstory`, `verbose: true`, `allow_delegation: false`,
+and ONE task it performs (`description`, `expected_output`, `agent`) that builds on the existing work
+and uses user inputs via template variables such as {{additional_context}} and {{current_year}}.
+Do not repeat existing agents or tasks. Return exactly this format:
+
+--- agents.yaml ---
+<the new agent only>
+
+--- tasks.yaml ---
+<the new task only>
+
+Current year: {current_year}
+""")
@@ -1,309 +1,263 @@
 import os
+import re
+import sys
+import json
+import shutil
+import argparse
 import subprocess
 import time
-import google.generativeai as genai
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-import yaml
+from crew_engine import (
+    run_command_output,
+    run_command_interactive,
+    generate_yaml_from_prompt,
+    project_name_from_prompt,
+    render_project_files,
+    write_project,
+)
 
 # Load environment variables from .env file (if exists)
 load_dotenv()
 
-def run_command_interactive(cmd_list):
-    """Run a shell command interactively."""
-    process = subprocess.Popen(cmd_list, stdin=None, stdout=None, stderr=None)
-    process.communicate()
-
-def run_command_output(cmd_list):
-    """Run a shell command and get its output."""
-    result = subprocess.run(cmd_list, capture_output=True, text=True)
+def crewai_cache_path():
+    """Location of the cached crewai install check."""
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "auto-crew-builder", "crewai_install.json")
+
+def installed_crewai_version():
+    """Return the installed crewai version, or None if crewai is not on PATH.
+
+    `crewai --version` is slow to start, so the answer is cached keyed by the
+    executable's path and mtime and only recomputed after an install/upgrade.
+    """
+    exe = shutil.which("crewai")
+    if not exe:
+        return None
+    mtime = os.path.getmtime(exe)
+    cache_path = crewai_cache_path()
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("path") == exe and cached.get("mtime") == mtime:
+            return cached["version"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    result = subprocess.run([exe, "--version"], capture_output=True, text=True)
     if result.returncode != 0:
-        print(f"❌ Error running command: {' '.join(cmd_list)}\n{result.stderr}")
-        exit(1)
-    return result.stdout.strip()
-
-def validate_yaml(yaml_text, fallback):
-    """Ensure the YAML is valid; fallback to safe version if not."""
+        return None
+    version = result.stdout.strip().split()[-1] if result.stdout.strip() else "unknown"
     try:
-        data = yaml.safe_load(yaml_text)
-        # Remove any tools sections from agents if present
-        if isinstance(data, dict):
-            for agent_name, agent_config in data.items():
-                if isinstance(agent_config, dict) and 'tools' in agent_config:
-                    del agent_config['tools']
-        # Convert back to YAML string
-        cleaned_yaml = yaml.dump(data, default_flow_style=False, sort_keys=False)
-        return cleaned_yaml
-    except yaml.YAMLError:
-        print("⚠️ Invalid YAML generated. Using fallback.")
-        return fallback
-
-def generate_yaml_from_prompt(prompt, current_year):
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    topic = prompt.strip()
-
-    # Dynamic fallback generation if AI response is invalid
-    def generate_dynamic_fallback():
-        # Determine domain-specific components based on topic keywords
-        domain_keywords = {
-            'email': ('content_analyzer', 'email_composer', 'analyze_content_task', 'compose_email_task'),
-            'research': ('researcher', 'analyst', 'research_task', 'analysis_task'),
-            'development': ('developer', 'tester', 'development_task', 'testing_task'),
-            'marketing': ('marketer', 'strategist', 'market_analysis_task', 'strategy_task'),
-            'data': ('data_scientist', 'analyst', 'data_collection_task', 'data_analysis_task'),
-            'content': ('content_creator', 'editor', 'content_creation_task', 'editing_task')
-        }
-        
-        # Find matching domain or use generic
-        agent1_name, agent2_name, task1_name, task2_name = 'content_analyzer', 'email_composer', 'analyze_content_task', 'compose_email_task'
-        
-        for keyword, names in domain_keywords.items():
-            if keyword in topic.lower():
-                agent1_name, agent2_name, task1_name, task2_name = names
-                break
-        
-        fallback_agents = f"""{agent1_name}:
-  role: >
-    {topic} Content Analyzer
-  goal: >
-    Analyze and extract key information from provided content related to {topic}
-  backstory: >
-    You are a skilled content analyst specializing in {topic}. Your expertise allows you to 
-    quickly identify important details, context, and requirements from various types of content
-    to facilitate effective communication and deliverable creation.
-  verbose: true
-  allow_delegation: true
-
-{agent2_name}:
-  role: >
-    {topic} Content Creator
-  goal: >
-    Create professional, well-structured content based on analyzed information for {topic}
-  backstory: >
-    You are an expert content creator with extensive experience in {topic}. You excel at 
-    transforming analyzed information into polished, professional deliverables that meet 
-    specific requirements and maintain high quality standards.
-  verbose: true
-  allow_delegation: false"""
-
-        fallback_tasks = f"""{task1_name}:
-  description: >
-    Analyze the provided topic: "{{topic}}" and all user-provided information.
-    Extract and understand ALL available inputs including any of these common variables:
-    {{recipient_name}}, {{subject}}, {{sender_name}}, {{additional_context}}, 
-    {{project_details}}, {{requirements}}, {{target_audience}}, {{research_scope}},
-    {{product_service}}, {{content_type}}, {{key_points}}, or any other user inputs.
-    
-    Identify the purpose, requirements, and approach needed for creating the deliverable.
-    Pay special attention to personalization details provided by the user.
-    Current year: {{current_year}}
-  expected_output: >
-    A comprehensive analysis that identifies all user-provided information and creates
-    a clear plan for using this information in the final deliverable. Must include
-    specific recommendations for incorporating user inputs into the output.
-  agent: {agent1_name}
-
-{task2_name}:
-  description: >
-    Create the final deliverable for "{{topic}}" using the analysis from the previous task.
-    
-    CRITICAL: Use ALL available user-provided information from inputs. This may include:
-    - {{recipient_name}} (use as recipient/addressee)
-    - {{subject}} (use as subject line/title)  
-    - {{sender_name}} (use as sender/author)
-    - {{additional_context}} (incorporate into main content)
-    - {{project_details}} (use for project specifications)
-    - {{requirements}} (ensure all requirements are met)
-    - {{target_audience}} (tailor content appropriately)
-    - {{research_scope}} (focus research accordingly)
-    - {{product_service}} (feature in content)
-    - {{content_type}} (format output correctly)
-    - {{key_points}} (include these points)
-    - Any other user inputs provided
-    
-    The output MUST be personalized with the actual user data, not generic examples.
-    Current year: {{current_year}}
-  expected_output: >
-    A complete, professional deliverable that incorporates ALL user-provided information.
-    The output must be personalized with actual user inputs (names, subjects, context, etc.)
-    and ready for immediate use. No generic placeholders or example content allowed.
-  agent: {agent2_name}"""
-        
-        return fallback_agents, fallback_tasks
-
-    # Single comprehensive prompt to generate both files with consistent agent names
-    comprehensive_prompt = f"""
-You are an expert CrewAI configuration generator. Create both agents.yaml and tasks.yaml files for the project: "{topic}"
-
-REQUIREMENTS:
-1. Generate 2 agents with consistent naming between files
-2. Agent names should be descriptive and topic-specific (snake_case)
-3. Generate 2 tasks that use these exact agent names
-4. Tasks should build upon each other sequentially
-5. DO NOT include tools in agents - tools are handled separately
-6. Tasks should use user-provided information from inputs, not just the topic
-
-GENERATE BOTH FILES WITH CONSISTENT AGENT NAMES:
-
---- agents.yaml ---
-agent_name_1:
-  role: >
-    [Specific role for {topic}]
-  goal: >
-    [Measurable goal related to {topic}]
-  backstory: >
-    [Detailed backstory showing expertise in {topic}]
-  verbose: true
-  allow_delegation: true
-
-agent_name_2:
-  role: >
-    [Different specific role for {topic}]
-  goal: >
-    [Different measurable goal for {topic}]
-  backstory: >
-    [Different expertise backstory for {topic}]
-  verbose: true
-  allow_delegation: false
-
---- tasks.yaml ---
-task_name_1:
-  description: >
-    Analyze the topic "{topic}" and all user-provided information.
-    Extract and understand ALL available inputs including any variables like:
-    {{recipient_name}}, {{subject}}, {{sender_name}}, {{additional_context}}, 
-    {{project_details}}, {{requirements}}, {{target_audience}}, or any other user inputs.
-    
-    Create a comprehensive plan for using this information in the final deliverable.
-    Current year: {{current_year}}
-  expected_output: >
-    A detailed analysis that identifies all user inputs and creates a plan for
-    incorporating them into the final deliverable. No generic content allowed.
-  agent: agent_name_1
-
-task_name_2:
-  description: >
-    Create the final deliverable for "{topic}" using ALL user-provided information.
-    
-    MANDATORY: Use actual user inputs from variables like {{recipient_name}}, {{subject}}, 
-    {{sender_name}}, {{additional_context}}, {{project_details}}, {{requirements}}, 
-    {{target_audience}}, or any other provided inputs.
-    
-    The output MUST be personalized with real user data, not examples or placeholders.
-    Current year: {{current_year}}
-  expected_output: >
-    A complete deliverable that uses ALL user-provided information with actual names,
-    subjects, context, and details. Must be personalized and ready for immediate use.
-  agent: agent_name_2
-
-IMPORTANT: Use the EXACT SAME agent names in both files. Use descriptive names like 'content_analyzer' and 'content_creator'.
-CRITICAL: Tasks MUST use ALL available template variables from user inputs. Include variables like {{recipient_name}}, {{subject}}, {{sender_name}}, {{additional_context}}, {{project_details}}, {{requirements}}, {{target_audience}} etc.
-CRITICAL: Tasks MUST incorporate actual user-provided information and produce personalized outputs, not generic examples.
-CRITICAL: The final deliverable MUST use real user data (names, subjects, context) provided in the inputs dictionary.
-
-Current year: {current_year}
-Topic: "{topic}"
-"""
-
-    print("🤖 Generating both agents.yaml and tasks.yaml configurations...")
-    response = model.generate_content(comprehensive_prompt)
-    full_response = response.text.strip()
-    
-    # Remove markdown formatting if present
-    if "```yaml" in full_response:
-        full_response = full_response.split("```yaml")[1].split("```")[0].strip()
-    elif "```" in full_response:
-        full_response = full_response.split("```")[1].strip()
-
-    # Split the response into agents and tasks
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump({"path": exe, "mtime": mtime, "version": version}, f)
+    except OSError:
+        pass
+    return version
+
+def ensure_crewai_installed():
+    """Install crewai with uv only when it is not already available."""
+    version = installed_crewai_version()
+    if version:
+        print(f"✅ CrewAI {version} already installed")
+        return
+    print("\n🔧 Installing CrewAI...")
     try:
-        parts = full_response.split("--- tasks.yaml ---")
-        if len(parts) == 2:
-            agents_yaml = parts[0].replace("--- agents.yaml ---", "").strip()
-            tasks_yaml = parts[1].strip()
-        else:
-            # Fallback parsing
-            agents_start = full_response.find("agent")
-            tasks_start = full_response.find("task")
-            if agents_start != -1 and tasks_start != -1 and agents_start < tasks_start:
-                # Find the split point
-                lines = full_response.split('\n')
-                split_index = 0
-                for i, line in enumerate(lines):
-                    if line.strip().endswith(':') and 'task' in line.lower():
-                        split_index = i
-                        break
-                
-                agents_yaml = '\n'.join(lines[:split_index]).strip()
-                tasks_yaml = '\n'.join(lines[split_index:]).strip()
-            else:
-                raise ValueError("Could not parse response")
-    except:
-        print("⚠️ Failed to parse AI response. Using fallback...")
-        agents_yaml, tasks_yaml = generate_dynamic_fallback()
-
-    # Validate YAML and use dynamic fallback if needed
+        run_command_output(["uv", "tool", "install", "crewai"])
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+def read_batch_jobs(source):
+    """Read batch jobs from a file path or '-' (stdin); returns (jobs, invalid_lines).
+
+    Each non-empty line is either a plain prompt or a JSON object with
+    'prompt' and optional 'ai_provider' / 'model_name' / 'agent_count' keys.
+    Malformed lines are reported as (line_number, error) and skipped.
+    """
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    jobs = []
+    invalid_lines = []
     try:
-        agents_data = yaml.safe_load(agents_yaml)
-        tasks_data = yaml.safe_load(tasks_yaml)
-        
-        # Check if agent names in tasks match agents
-        if agents_data and tasks_data:
-            agent_names = set(agents_data.keys())
-            task_agent_names = set()
-            for task_config in tasks_data.values():
-                if isinstance(task_config, dict) and 'agent' in task_config:
-                    task_agent_names.add(task_config['agent'])
-            
-            if not task_agent_names.issubset(agent_names):
-                print(f"⚠️ Agent name mismatch detected. Using fallback...")
-                agents_yaml, tasks_yaml = generate_dynamic_fallback()
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    job = json.loads(line)
+                except json.JSONDecodeError as e:
+                    invalid_lines.append((line_number, f"invalid JSON: {e}"))
+                    continue
+                if not isinstance(job, dict) or not str(job.get("prompt", "")).strip():
+                    invalid_lines.append((line_number, "JSON line has no 'prompt'"))
+                    continue
             else:
-                print("✅ Generated valid YAML configurations with consistent agent names")
-    except yaml.YAMLError as e:
-        print(f"⚠️ Invalid YAML generated ({e}). Using dynamic fallback...")
-        agents_yaml, tasks_yaml = generate_dynamic_fallback()
-
-    # Clean up any tools sections
-    agents_yaml = validate_yaml(agents_yaml, generate_dynamic_fallback()[0])
-    tasks_yaml = validate_yaml(tasks_yaml, generate_dynamic_fallback()[1])
-
-    return agents_yaml, tasks_yaml
-
+                job = {"prompt": line}
+            job.setdefault("ai_provider", "gemini")
+            job.setdefault("model_name", "gemini-1.5-flash")
+            jobs.append(job)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return jobs, invalid_lines
+
+def batch_project_name(prompt):
+    """Directory name for a batch project: the prompt reduced to a safe identifier, never a path."""
+    return re.sub(r"\W+", "_", project_name_from_prompt(prompt)).strip("_") or "crew"
+
+def project_dir(output_dir, name):
+    """`output_dir/name`, refusing any name that would resolve outside `output_dir`."""
+    root = os.path.realpath(output_dir)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.dirname(path) != root:
+        raise ValueError(f"project name {name!r} escapes the output directory")
+    return path
+
+def build_batch_project(job, current_year):
+    """Generate one project with the shared generation core; return (name, files, seconds)."""
+    started = time.perf_counter()
+    prompt = job["prompt"]
+    agents_yaml, tasks_yaml = generate_yaml_from_prompt(
+        prompt, current_year, job["ai_provider"], job["model_name"], agent_count=job.get("agent_count")
+    )
+    # Batch lines are untrusted: the name becomes a directory and archive path
+    project_name = batch_project_name(prompt)
+    files = render_project_files(project_name, prompt, agents_yaml, tasks_yaml)
+    return project_name, files, time.perf_counter() - started
+
+def print_progress(done, total, failed, started):
+    """Draw a single-line progress bar on stderr."""
+    width = 30
+    filled = int(width * done / total) if total else width
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    sys.stderr.write(f"\r[{'#' * filled}{'.' * (width - filled)}] {done}/{total} "
+                     f"({failed} failed) {rate:.2f} projects/s")
+    sys.stderr.flush()
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_batch(source, output_dir=None, archive=None, concurrency=4):
+    """Generate every project in `source` with bounded concurrency.
+
+    Projects are written under `output_dir`, or into a single ZIP at `archive`.
+    Files are written from this thread only, as results complete.
+    """
+    jobs, invalid_lines = read_batch_jobs(source)
+    for line_number, error in invalid_lines:
+        print(f"⚠️  Skipping line {line_number}: {error}")
+    if not jobs:
+        print("❌ No prompts found in batch input")
+        return 1
+
+    current_year = time.localtime().tm_year
+    latencies = []
+    failures = []
+    used_names = set()
+    archive_file = zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) if archive else None
+    started = time.perf_counter()
+    print_progress(0, len(jobs), 0, started)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = {executor.submit(build_batch_project, job, current_year): job for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    project_name, files, seconds = future.result()
+                except Exception as e:
+                    failures.append((futures[future]["prompt"], str(e)))
+                else:
+                    # Keep duplicate prompts from overwriting each other
+                    unique_name, suffix = project_name, 2
+                    while unique_name in used_names:
+                        unique_name, suffix = f"{project_name}_{suffix}", suffix + 1
+                    used_names.add(unique_name)
+                    try:
+                        if archive_file:
+                            for rel_path, content in files.items():
+                                archive_file.writestr(f"{unique_name}/{rel_path}", content)
+                        else:
+                            write_project(project_dir(output_dir, unique_name), files)
+                    except ValueError as e:
+                        failures.append((futures[future]["prompt"], str(e)))
+                    else:
+                        latencies.append(seconds)
+                print_progress(len(latencies) + len(failures), len(jobs), len(failures), started)
+    finally:
+        if archive_file:
+            archive_file.close()
+    elapsed = time.perf_counter() - started
+    sys.stderr.write("\n")
+
+    latencies.sort()
+    print(f"\n✅ Generated {len(latencies)}/{len(jobs)} projects in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed if elapsed > 0 else 0:.2f} projects/s, concurrency {concurrency})")
+    if latencies:
+        print(f"⏱️  Latency p50 {percentile(latencies, 0.5):.2f}s, p95 {percentile(latencies, 0.95):.2f}s, "
+              f"max {latencies[-1]:.2f}s")
+    print(f"📦 Output: {archive or output_dir}")
+    for prompt, error in failures:
+        print(f"❌ {prompt}: {error}")
+    if invalid_lines:
+        print(f"⚠️  {len(invalid_lines)} malformed input line(s) skipped")
+    return 1 if failures or invalid_lines else 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate CrewAI projects interactively or in batch.")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="read prompts from FILE ('-' for stdin), one per line or JSONL with provider/model")
+    parser.add_argument("--output-dir", default="crews", help="directory for batch projects (default: crews)")
+    parser.add_argument("--archive", metavar="ZIP", help="write all batch projects into a single ZIP instead")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel generations in batch mode (default: 4)")
+    return parser.parse_args(argv)
 
 def main():
-    user_prompt = input("📝 What task should your Crew AI perform? (e.g. 'Market research on electric vehicles')\n> ")
-    project_name = user_prompt.lower().replace(" ", "_").replace("-", "_")
-
-    print("\n🔧 Installing CrewAI (if not already installed)...")
-    run_command_output(["uv", "tool", "install", "crewai"])
+    args = parse_args()
+    if args.batch:
+        sys.exit(run_batch(args.batch, args.output_dir, args.archive, args.concurrency))
 
-    print(f"\n🚀 Creating CrewAI project: '{project_name}'...")
-    run_command_interactive(["crewai", "create", "crew", project_name])
+    user_prompt = input("📝 What task should your Crew AI perform? (e.g. 'Market research on electric vehicles')\n> ")
+    project_name = project_name_from_prompt(user_prompt)
 
-    print("⏳ Generating file structure...")
-    time.sleep(3)
+    ensure_crewai_installed()
 
-    # Load the Gemini API key
-    project_env_path = os.path.join(project_name, ".env")
-    if os.path.exists(project_env_path):
-        load_dotenv(project_env_path)
-        api_key = os.getenv("GEMINI_API_KEY")
+    # If the key is already in the environment, talk to Gemini while the scaffold is created
+    api_key = os.getenv("GEMINI_API_KEY")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        yaml_future = None
         if api_key:
-            genai.configure(api_key=api_key)
+            print("🤖 Generating 'agents.yaml' and 'tasks.yaml' using Gemini AI...")
+            yaml_future = executor.submit(generate_yaml_from_prompt, user_prompt, time.localtime().tm_year, api_key=api_key)
+
+        print(f"\n🚀 Creating CrewAI project: '{project_name}'...")
+        run_command_interactive(["crewai", "create", "crew", project_name])
+
+        if yaml_future is None:
+            # Fall back to the key written into the new project's .env
+            project_env_path = os.path.join(project_name, ".env")
+            if not os.path.exists(project_env_path):
+                print("❌ .env file not found in project directory")
+                return
+            load_dotenv(project_env_path)
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                print("❌ GEMINI_API_KEY not found in .env")
+                return
             print("✅ Loaded Gemini API key from .env")
-        else:
-            print("❌ GEMINI_API_KEY not found in .env")
-            return
-    else:
-        print("❌ .env file not found in project directory")
-        return
+            print("🤖 Generating 'agents.yaml' and 'tasks.yaml' using Gemini AI...")
+            yaml_future = executor.submit(generate_yaml_from_prompt, user_prompt, time.localtime().tm_year, api_key=api_key)
+
+        agents_yaml, tasks_yaml = yaml_future.result()
 
     config_dir = os.path.join(project_name, "src", project_name, "config")
     os.makedirs(config_dir, exist_ok=True)
 
-    print("🤖 Generating 'agents.yaml' and 'tasks.yaml' using Gemini AI...")
-    agents_yaml, tasks_yaml = generate_yaml_from_prompt(user_prompt, time.localtime().tm_year)
-
     agents_path = os.path.join(config_dir, "agents.yaml")
     tasks_path = os.path.join(config_dir, "tasks.yaml")
 
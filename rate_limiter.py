@@ -0,0 +1,282 @@
+"""Token-bucket rate limiting and quota accounting for LLM provider calls.
+
+Each (provider, model) pair gets a limiter with two buckets: one for requests
+per minute and one for tokens per minute. Callers are scheduled (they sleep
+until their reservation is due) instead of being rejected, and upstream 429
+responses are retried with jittered exponential backoff. A call that would
+spend longer than LLM_MAX_QUEUE_SECONDS waiting for quota or backing off
+fails fast with QuotaExhausted instead of holding its worker.
+
+Configuration (environment):
+    LLM_MAX_QUEUE_SECONDS   longest a call may wait for quota and retries (default: 30)
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+
+class QuotaExhausted(Exception):
+    """A call could not be scheduled within the limiter's maximum wait."""
+
+    def __init__(self, provider, model, retry_after):
+        super().__init__(f"{provider}/{model} quota exhausted; retry in {retry_after:.1f}s")
+        self.provider = provider
+        self.model = model
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket that refills continuously at `rate` tokens per second."""
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def reserve(self, amount=1):
+        """Reserve `amount` tokens and return the seconds to wait before using them.
+
+        The balance may go negative, so concurrent callers queue up behind each
+        other in arrival order instead of all waking at once.
+        """
+        amount = min(float(amount), self.capacity)
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def wait_time(self, amount=1):
+        """Seconds until `amount` tokens would be available, without reserving them."""
+        amount = min(float(amount), self.capacity)
+        with self.lock:
+            self._refill(time.monotonic())
+            deficit = amount - self.tokens
+            return deficit / self.rate if deficit > 0 else 0.0
+
+    def adjust(self, amount):
+        """Charge (positive) or refund (negative) tokens after the real cost is known."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def available(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+
+def is_rate_limit_error(exc):
+    """Return True if an exception raised by a provider SDK signals HTTP 429.
+
+    Only the status code or the SDK's rate-limit exception type count; a message
+    that merely mentions a quota is not retried.
+    """
+    if getattr(exc, 'code', None) == 429 or getattr(exc, 'status_code', None) == 429:
+        return True
+    # Errors replayed by llm_replay carry the recorded provider error type
+    return getattr(exc, 'error_type', type(exc).__name__) in ('ResourceExhausted', 'RateLimitError', 'TooManyRequests')
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) used before the real count is known."""
+    return max(1, len(text) // 4)
+
+
+class ModelLimiter:
+    """Request and token buckets plus usage counters for one provider model."""
+
+    def __init__(self, provider, model, requests_per_minute, tokens_per_minute,
+                 max_retries=5, base_delay=1.0, max_delay=32.0, max_wait=None):
+        self.provider = provider
+        self.model = model
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Seconds a call may spend queued for quota plus backing off; None waits indefinitely
+        self.max_wait = max_wait
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.lock = threading.Lock()
+        self.counters = {
+            'requests': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'rate_limited': 0,
+            'rejected': 0,
+            'retries': 0,
+            'prompt_tokens': 0,
+            'response_tokens': 0,
+            'throttled_seconds': 0.0,
+        }
+
+    def _count(self, **increments):
+        with self.lock:
+            for key, value in increments.items():
+                self.counters[key] += value
+
+    def expected_wait(self, tokens=1):
+        """Seconds a call made now would queue for quota, without reserving anything."""
+        return max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(tokens))
+
+    def would_reject(self, tokens=1):
+        """True if a call made now could not be scheduled within max_wait."""
+        return self.max_wait is not None and self.expected_wait(tokens) > self.max_wait
+
+    def reserve(self, tokens, budget=None):
+        """Reserve quota for one call and return the wait; raises QuotaExhausted if it exceeds `budget`."""
+        wait = max(self.request_bucket.reserve(1), self.token_bucket.reserve(tokens))
+        if budget is not None and wait > budget:
+            # Give the reservation back so callers queued behind this one are not delayed by it
+            self.request_bucket.adjust(-1)
+            self.token_bucket.adjust(-min(tokens, self.token_bucket.capacity))
+            self._count(rejected=1)
+            raise QuotaExhausted(self.provider, self.model, wait)
+        return wait
+
+    def acquire(self, tokens, budget=None):
+        """Block until one request and `tokens` tokens are available; return the time waited."""
+        wait = self.reserve(tokens, budget)
+        if wait > 0:
+            time.sleep(wait)
+        self._count(requests=1, throttled_seconds=wait)
+        return wait
+
+    async def acquire_async(self, tokens, budget=None):
+        """Event-loop friendly variant of acquire()."""
+        wait = self.reserve(tokens, budget)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._count(requests=1, throttled_seconds=wait)
+        return wait
+
+    def backoff_delay(self, attempt):
+        """Full-jitter exponential backoff delay for the given retry attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def retry_delay(self, error, attempt, budget):
+        """Backoff before retrying `error`, or raise if it must not be retried within `budget`."""
+        if not is_rate_limit_error(error) or attempt >= self.max_retries:
+            self._count(failed=1)
+            raise error
+        delay = self.backoff_delay(attempt)
+        if budget is not None and delay > budget:
+            self._count(failed=1, rate_limited=1)
+            raise QuotaExhausted(self.provider, self.model, delay) from error
+        self._count(rate_limited=1, retries=1)
+        return delay
+
+    def call(self, fn, prompt_tokens):
+        """Run `fn()` under the limiter, retrying 429 responses with jittered backoff.
+
+        Raises QuotaExhausted when queueing and backoff together would exceed max_wait.
+        """
+        attempt = 0
+        budget = self.max_wait
+        while True:
+            waited = self.acquire(prompt_tokens, budget)
+            budget = budget - waited if budget is not None else None
+            try:
+                response = fn()
+            except Exception as e:
+                delay = self.retry_delay(e, attempt, budget)
+                budget = budget - delay if budget is not None else None
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.record_usage(response, prompt_tokens)
+            return response
+
+    async def call_async(self, fn, prompt_tokens):
+        """Await `fn()` under the limiter, retrying 429 responses with jittered backoff."""
+        attempt = 0
+        budget = self.max_wait
+        while True:
+            waited = await self.acquire_async(prompt_tokens, budget)
+            budget = budget - waited if budget is not None else None
+            try:
+                response = await fn()
+            except Exception as e:
+                delay = self.retry_delay(e, attempt, budget)
+                budget = budget - delay if budget is not None else None
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.record_usage(response, prompt_tokens)
+            return response
+
+    def record_usage(self, response, estimated_prompt_tokens):
+        """Account real token usage from the response, correcting the pre-call estimate."""
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None) or estimated_prompt_tokens
+        response_tokens = getattr(usage, 'candidates_token_count', None)
+        if response_tokens is None:
+            response_tokens = estimate_tokens(getattr(response, 'text', '') or '')
+        self.token_bucket.adjust(prompt_tokens + response_tokens - estimated_prompt_tokens)
+        self._count(succeeded=1, prompt_tokens=prompt_tokens, response_tokens=response_tokens)
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+        counters['throttled_seconds'] = round(counters['throttled_seconds'], 3)
+        counters.update({
+            'provider': self.provider,
+            'model': self.model,
+            'requests_per_minute': self.requests_per_minute,
+            'tokens_per_minute': self.tokens_per_minute,
+            'requests_available': max(0, int(self.request_bucket.available())),
+            'tokens_available': max(0, int(self.token_bucket.available())),
+        })
+        return counters
+
+
+DEFAULT_LIMITS = {'requests_per_minute': 60, 'tokens_per_minute': 100000}
+
+
+def max_queue_seconds():
+    return float(os.getenv('LLM_MAX_QUEUE_SECONDS', '30'))
+
+
+class RateLimiterRegistry:
+    """Lazily creates one ModelLimiter per (provider, model) from AI_MODELS-style config."""
+
+    def __init__(self, ai_models):
+        self.ai_models = ai_models
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def limits_for(self, provider, model):
+        rate_limits = self.ai_models.get(provider, {}).get('rate_limits', {})
+        limits = dict(DEFAULT_LIMITS)
+        limits.update(rate_limits.get('default', {}))
+        limits.update(rate_limits.get(model, {}))
+        return limits
+
+    def get(self, provider, model):
+        key = (provider, model)
+        with self.lock:
+            limiter = self.limiters.get(key)
+            if limiter is None:
+                limiter = ModelLimiter(provider, model, max_wait=max_queue_seconds(),
+                                       **self.limits_for(provider, model))
+                self.limiters[key] = limiter
+            return limiter
+
+    def stats(self):
+        with self.lock:
+            limiters = list(self.limiters.values())
+        return [limiter.stats() for limiter in limiters]
@@ -0,0 +1,145 @@
+"""Precomputed, precompressed responses for the parts of the app that only change on deploy.
+
+The rendered index page and the /api/models lists are built once per process
+and stored as identity, gzip and (when the brotli package is installed)
+brotli bodies. Requests are answered by picking the body that matches
+Accept-Encoding, and a matching If-None-Match gets an empty 304. Each encoding
+has its own strong ETag derived from the content hash, so shared caches never
+mix representations.
+
+The page is revalidated on every load (the 304 costs the app almost nothing).
+The model lists are cached for STATIC_MAX_AGE.
+
+Configuration (environment):
+    STATIC_MAX_AGE    max-age in seconds for the model lists (default: 3600)
+"""
+import gzip
+import hashlib
+import json
+import os
+
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Preferred order when the client accepts several encodings equally
+ENCODINGS = ('br', 'gzip', 'identity')
+ETAG_SUFFIXES = {'br': '-br', 'gzip': '-gz', 'identity': ''}
+
+
+def brotli_compress(data):
+    """Brotli at maximum quality if the brotli package is installed, else None."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def accepted_encodings(header):
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def static_max_age():
+    return int(os.getenv('STATIC_MAX_AGE', '3600'))
+
+
+class StaticAsset:
+    """One response body in every available encoding, with per-encoding strong ETags."""
+
+    __slots__ = ('mimetype', 'version', 'bodies', 'etags', 'cache_control')
+
+    def __init__(self, body, mimetype, cache_control=REVALIDATE_CACHE_CONTROL):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        self.bodies = {'identity': body}
+        # mtime=0 keeps the gzip bytes (and so their ETag) identical across processes
+        compressed = {'gzip': gzip.compress(body, compresslevel=9, mtime=0), 'br': brotli_compress(body)}
+        for encoding, data in compressed.items():
+            # A tiny body can grow when compressed; only keep encodings that pay off
+            if data is not None and len(data) < len(body):
+                self.bodies[encoding] = data
+        self.etags = {encoding: f'"{self.version}{ETAG_SUFFIXES[encoding]}"' for encoding in self.bodies}
+
+    def negotiate(self, accept_encoding):
+        """The best available encoding for an Accept-Encoding header."""
+        accepted = accepted_encodings(accept_encoding)
+        wildcard = accepted.get('*', 0.0)
+        best, best_q = 'identity', 0.0
+        for encoding in ENCODINGS:
+            if encoding == 'identity' or encoding not in self.bodies:
+                continue
+            q = accepted.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def not_modified(self, if_none_match):
+        """True if If-None-Match names any representation of this content."""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        # If-None-Match uses weak comparison, so a W/ prefix added by a proxy still matches
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return not tags.isdisjoint(self.etags.values())
+
+    def respond(self, request_headers):
+        """(body, status, headers) for a request; works with both Flask and Quart responses."""
+        encoding = self.negotiate(request_headers.get('Accept-Encoding'))
+        headers = {
+            'Content-Type': self.mimetype,
+            'ETag': self.etags[encoding],
+            'Cache-Control': self.cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+        if self.not_modified(request_headers.get('If-None-Match')):
+            return b'', 304, headers
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return self.bodies[encoding], 200, headers
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'bytes': {encoding: len(body) for encoding, body in self.bodies.items()},
+        }
+
+
+def html_asset(html):
+    """The rendered index page; browsers revalidate it on every load."""
+    return StaticAsset(html, 'text/html; charset=utf-8')
+
+
+def json_asset(data):
+    """A JSON document serialized the way jsonify would send it."""
+    body = json.dumps(data, separators=(',', ':')) + '\n'
+    return StaticAsset(body, 'application/json', f'public, max-age={static_max_age()}')
+
+
+def model_assets(ai_models):
+    """A model-list asset per provider, plus the empty list served for unknown providers."""
+    assets = {provider: json_asset(info['models']) for provider, info in ai_models.items()}
+    assets[None] = json_asset([])
+    return assets
+
+
+def model_list_response(assets, provider, request_headers):
+    """Respond with a provider's model list, or the empty list for an unknown provider."""
+    return assets.get(provider, assets[None]).respond(request_headers)
@@ -0,0 +1,10 @@
+"""Shared pytest setup: import the app modules from the repository root and keep tests offline."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# No provider calls, background catalog refreshes or history database during tests
+os.environ.pop('GEMINI_API_KEY', None)
+os.environ['CREW_CATALOG_ENABLED'] = '0'
+os.environ['HISTORY_ENABLED'] = '0'
@@ -0,0 +1,186 @@
+import os
+
+import pytest
+
+import artifact_storage
+import crew_engine
+import generation_service
+import packaging_pool
+from artifact_storage import LocalDiskStorage, artifact_key
+from job_status import Stage
+from owner_tokens import new_owner_token, owner_id
+
+ENDPOINT = 'http://minio.test:9000'
+
+
+class Body:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client calls S3Storage makes, like a local MinIO."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = []
+
+    def missing(self, operation, bucket, key):
+        from botocore.exceptions import ClientError
+        if (bucket, key) not in self.objects:
+            raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, operation)
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        self.uploads.append((bucket, key, ExtraArgs, Config))
+        self.objects[(bucket, key)] = fileobj.read()
+
+    def head_object(self, Bucket, Key):
+        self.missing('HeadObject', Bucket, Key)
+        return {'ContentLength': len(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key):
+        self.missing('GetObject', Bucket, Key)
+        return {'Body': Body(self.objects[(Bucket, Key)])}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"{ENDPOINT}/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+
+@pytest.fixture
+def s3_storage():
+    pytest.importorskip('boto3')
+    storage = artifact_storage.S3Storage('crews', endpoint_url=ENDPOINT, region_name='us-east-1',
+                                         presign_expires=600)
+    storage.client = FakeS3Client()
+    return storage
+
+
+def test_local_storage_is_content_addressed(tmp_path):
+    storage = LocalDiskStorage(str(tmp_path))
+    key = storage.put(b'PK zip bytes')
+    assert key == artifact_key(b'PK zip bytes')
+    assert storage.put(b'PK zip bytes') == key
+    assert storage.get(key) == b'PK zip bytes'
+    assert storage.exists(key)
+    assert storage.local_path(key) == str(tmp_path / key[:2] / f'{key}.zip')
+    assert storage.download_url(key, 'crew.zip') is None
+    assert list(tmp_path.rglob('*.part')) == []
+
+
+def test_local_storage_unknown_key(tmp_path):
+    storage = LocalDiskStorage(str(tmp_path))
+    missing = artifact_key(b'never stored')
+    assert (storage.get(missing), storage.exists(missing), storage.local_path(missing)) == (None, False, None)
+
+
+def stored(storage, data, mtime):
+    """Put `data` and date its file `mtime` seconds after the epoch."""
+    key = storage.put(data)
+    os.utime(storage.path_for(key), (mtime, mtime))
+    return key
+
+
+def test_local_storage_prunes_least_recently_used_artifacts(tmp_path):
+    storage = LocalDiskStorage(str(tmp_path), max_bytes=250)
+    first = stored(storage, b'a' * 100, 1000)
+    second = stored(storage, b'b' * 100, 2000)
+    # Reading the oldest artifact makes it the most recently used
+    assert storage.get(first) == b'a' * 100
+    third = storage.put(b'c' * 100)
+    assert (storage.exists(first), storage.exists(second), storage.exists(third)) == (True, False, True)
+    assert storage.total_bytes == 200
+    assert LocalDiskStorage(str(tmp_path)).total_bytes == 200
+
+
+def test_local_storage_keeps_the_artifact_it_just_stored(tmp_path):
+    storage = LocalDiskStorage(str(tmp_path), max_bytes=50)
+    old = stored(storage, b'a' * 40, 1000)
+    new = storage.put(b'b' * 100)
+    assert (storage.exists(old), storage.exists(new)) == (False, True)
+    assert storage.prune(0) == 100 and not storage.exists(new)
+
+
+def test_get_storage_bounds_the_local_backend(monkeypatch, tmp_path):
+    monkeypatch.setattr(artifact_storage, '_storage', None)
+    monkeypatch.setenv('ARTIFACT_DIR', str(tmp_path))
+    monkeypatch.setenv('ARTIFACT_MAX_MB', '2')
+    assert artifact_storage.get_storage().max_bytes == 2 * 1024 * 1024
+    monkeypatch.setattr(artifact_storage, '_storage', None)
+    monkeypatch.setenv('ARTIFACT_MAX_MB', '0')
+    assert artifact_storage.get_storage().max_bytes is None
+
+
+def test_pruned_downloads_are_rebuilt_under_the_same_key(monkeypatch, tmp_path):
+    import app
+    storage = LocalDiskStorage(str(tmp_path))
+    monkeypatch.setattr(app, 'get_storage', lambda: storage)
+    monkeypatch.setattr(generation_service, 'get_storage', lambda: storage)
+    monkeypatch.setattr(packaging_pool, '_executor_kind', 'inline')
+    monkeypatch.setattr(packaging_pool, '_executor', None)
+    agents_yaml, tasks_yaml = crew_engine.fallback_config('Market research')
+    key = storage.put(crew_engine.package_zip('market_research', 'Market research', agents_yaml, tasks_yaml))
+    token = new_owner_token()
+    app.service.project_state['pruned-download'] = {
+        'prompt': 'Market research', 'project_name': 'market_research', 'agents_yaml': agents_yaml,
+        'tasks_yaml': tasks_yaml, 'artifact_key': key,
+    }
+    app.generation_status.create('pruned-download', owner_id(token)).update(
+        Stage.COMPLETED, artifact_key=key, project_name='market_research', revision=1
+    )
+    storage.prune(0)
+    response = app.app.test_client().get('/download/pruned-download', headers={'X-Owner-Token': token})
+    assert response.status_code == 200
+    assert artifact_key(response.data) == key and storage.exists(key)
+    response.close()
+
+
+def test_s3_storage_uploads_each_artifact_once(s3_storage):
+    key = s3_storage.put(b'PK zip bytes')
+    assert s3_storage.put(b'PK zip bytes') == key == artifact_key(b'PK zip bytes')
+    assert len(s3_storage.client.uploads) == 1
+    bucket, object_key, extra_args, config = s3_storage.client.uploads[0]
+    assert (bucket, object_key) == ('crews', f'artifacts/{key}.zip')
+    assert extra_args == {'ContentType': 'application/zip'}
+    assert config is s3_storage.transfer_config
+    assert s3_storage.get(key) == b'PK zip bytes'
+    assert s3_storage.exists(key)
+    assert s3_storage.local_path(key) is None
+
+
+def test_s3_storage_unknown_key(s3_storage):
+    missing = artifact_key(b'never stored')
+    assert s3_storage.get(missing) is None
+    assert not s3_storage.exists(missing)
+
+
+def test_s3_download_url_is_presigned(s3_storage):
+    key = s3_storage.put(b'PK zip bytes')
+    assert s3_storage.download_url(key, 'crew.zip') == f'{ENDPOINT}/crews/artifacts/{key}.zip?expires=600'
+
+
+def test_get_storage_builds_the_configured_backend(monkeypatch):
+    pytest.importorskip('boto3')
+    monkeypatch.setattr(artifact_storage, '_storage', None)
+    monkeypatch.setenv('ARTIFACT_STORAGE', 's3')
+    monkeypatch.setenv('S3_BUCKET', 'crews')
+    monkeypatch.setenv('S3_PREFIX', 'zips/')
+    monkeypatch.setenv('S3_ENDPOINT_URL', ENDPOINT)
+    storage = artifact_storage.get_storage()
+    assert isinstance(storage, artifact_storage.S3Storage)
+    assert (storage.bucket, storage.prefix, storage.client.meta.endpoint_url) == ('crews', 'zips/', ENDPOINT)
+
+
+def test_download_redirects_to_s3(monkeypatch, s3_storage):
+    import app
+    monkeypatch.setattr(app, 'get_storage', lambda: s3_storage)
+    key = s3_storage.put(b'PK zip bytes')
+    token = new_owner_token()
+    app.generation_status.create('s3-download', owner_id(token)).update(
+        Stage.COMPLETED, artifact_key=key, project_name='market_research', revision=1
+    )
+    response = app.app.test_client().get('/download/s3-download', headers={'X-Owner-Token': token})
+    assert response.status_code == 302
+    assert response.headers['Location'] == f'{ENDPOINT}/crews/artifacts/{key}.zip?expires=600'
@@ -0,0 +1,128 @@
+import sqlite3
+
+import pytest
+
+import crew_engine
+import generation_service
+from generation_history import GenerationHistory
+from job_status import Stage
+from owner_tokens import new_owner_token, owner_id
+
+ALICE = owner_id('alice-token')
+BOB = owner_id('bob-token')
+
+
+def state(topic, owner, revision=1):
+    agents_yaml, tasks_yaml = crew_engine.fallback_config(topic)
+    return {
+        'prompt': topic,
+        'project_name': crew_engine.project_name_from_prompt(topic),
+        'ai_provider': 'gemini',
+        'model_name': crew_engine.DEFAULT_MODEL,
+        'agent_count': None,
+        'agents_yaml': agents_yaml,
+        'tasks_yaml': tasks_yaml,
+        'artifact_key': f'key-{revision}',
+        'revision': revision,
+        'owner': owner,
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    return GenerationHistory(str(tmp_path / 'history.db'))
+
+
+def test_search_only_returns_the_callers_entries(history):
+    history.record('alice-1', state('Email campaign for a launch', ALICE))
+    history.record('bob-1', state('Email newsletter for customers', BOB))
+    assert [entry['session_id'] for entry in history.search('email', ALICE)] == ['alice-1']
+    assert [entry['session_id'] for entry in history.search('', BOB)] == ['bob-1']
+    assert history.search('email', None) == []
+    assert history.search('email', owner_id('nobody')) == []
+
+
+def test_revisions_keep_the_original_owner(history):
+    history.record('alice-1', state('Email campaign for a launch', ALICE))
+    history.record('alice-1', state('Email campaign for a launch', BOB, revision=2))
+    entry = history.get('alice-1')
+    assert (entry['owner'], entry['revision']) == (ALICE, 2)
+    assert history.project_state('alice-1')['owner'] == ALICE
+
+
+def test_databases_from_before_owners_are_migrated(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE generations (id INTEGER PRIMARY KEY, session_id TEXT NOT NULL UNIQUE, created_at REAL NOT NULL, "
+        "updated_at REAL NOT NULL, topic TEXT NOT NULL, project_name TEXT NOT NULL, ai_provider TEXT, "
+        "model_name TEXT, agent_count INTEGER, agents_yaml TEXT NOT NULL, tasks_yaml TEXT NOT NULL, "
+        "artifact_key TEXT NOT NULL, revision INTEGER NOT NULL)"
+    )
+    conn.execute("INSERT INTO generations VALUES (1, 'old-1', 0, 0, 'Email', 'email', NULL, NULL, NULL, "
+                 "'a: {}', 'b: {}', 'key', 1)")
+    conn.commit()
+    conn.close()
+
+    history = GenerationHistory(path)
+    assert history.get('old-1')['owner'] is None
+    # Unowned entries from before the migration are not listed to anyone
+    assert history.search('', ALICE) == []
+    history.record('alice-1', state('Email campaign for a launch', ALICE))
+    assert [entry['session_id'] for entry in history.search('', ALICE)] == ['alice-1']
+
+
+@pytest.fixture
+def flask_app(monkeypatch, history):
+    import app
+    monkeypatch.setattr(generation_service, 'get_history', lambda: history)
+    return app
+
+
+def finished(app, session_id, token):
+    """A completed session owned by `token`, as /generate leaves it."""
+    app.service.project_state[session_id] = state('Email campaign for a launch', owner_id(token))
+    app.generation_status.create(session_id, owner_id(token)).update(
+        Stage.COMPLETED, artifact_key='key-1', project_name='email_campaign', revision=1
+    )
+    generation_service.run_steps(app.service.record_history(session_id))
+
+
+def test_generate_issues_an_owner_token(flask_app):
+    response = flask_app.app.test_client().post('/generate', json={'prompt': 'Email campaign'})
+    token = response.get_json()['owner_token']
+    assert 'crew_owner=' in response.headers['Set-Cookie'] and 'HttpOnly' in response.headers['Set-Cookie']
+    job = flask_app.generation_status.get(response.get_json()['session_id'])
+    assert job.owner == owner_id(token)
+    # A client that already has a token keeps it and is not sent a new one
+    again = flask_app.app.test_client().post('/generate', json={'prompt': 'Email campaign'},
+                                             headers={'X-Owner-Token': token})
+    assert 'owner_token' not in again.get_json()
+    assert flask_app.generation_status.get(again.get_json()['session_id']).owner == owner_id(token)
+
+
+def test_other_clients_get_404_for_a_session(flask_app):
+    token = new_owner_token()
+    finished(flask_app, 'owned-session', token)
+    client = flask_app.app.test_client()
+    for headers in ({}, {'X-Owner-Token': new_owner_token()}):
+        assert client.get('/download/owned-session', headers=headers).status_code == 404
+        assert client.post('/regenerate/owned-session', json={'change': 'tasks'}, headers=headers).status_code == 404
+    assert client.get('/history/search?q=email').get_json()['results'] == []
+    results = client.get('/history/search?q=email', headers={'X-Owner-Token': token}).get_json()['results']
+    assert [result['session_id'] for result in results] == ['owned-session']
+
+
+def test_evicted_sessions_are_restored_only_for_their_owner(flask_app):
+    token = new_owner_token()
+    finished(flask_app, 'evicted-session', token)
+    flask_app.generation_status._jobs.pop('evicted-session')
+    flask_app.service.forget_session('evicted-session')
+
+    def restore(owner_token):
+        return generation_service.run_steps(flask_app.service.restore_session('evicted-session', owner_token))
+
+    assert restore(new_owner_token()) is None
+    assert flask_app.generation_status.get('evicted-session') is None
+    assert restore(token)['owner'] == owner_id(token)
+    assert flask_app.generation_status.get('evicted-session').stage is Stage.COMPLETED
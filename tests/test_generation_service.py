@@ -0,0 +1,136 @@
+import asyncio
+import threading
+
+import pytest
+
+import crew_engine
+import generation_service
+from generation_service import GenerationService, RequestError, Step, generate_params, run_steps, run_steps_async
+from job_status import Stage
+from owner_tokens import new_owner_token, owner_id
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def pipeline(calls):
+    """Two steps: the first result is passed back in, the second step's error is caught by the pipeline."""
+    first = yield Step(calls.append, 'sync')
+    try:
+        yield Step(fail, 'storage down')
+    except ValueError as e:
+        return first, str(e), threading.current_thread() is threading.main_thread()
+
+
+def test_run_steps_performs_each_step_in_the_calling_thread():
+    calls = []
+    assert run_steps(pipeline(calls)) == (None, 'storage down', True)
+    assert calls == ['sync']
+
+
+def test_run_steps_async_awaits_async_steps_and_threads_the_rest():
+    async def double(value):
+        return value * 2
+
+    def steps():
+        # async_fn replaces fn on the event loop; other steps run in a worker thread
+        doubled = yield Step(fail, 21, async_fn=double)
+        thread = yield Step(threading.current_thread)
+        return doubled, thread is threading.main_thread()
+
+    assert asyncio.run(run_steps_async(steps())) == (42, False)
+    calls = []
+    assert asyncio.run(run_steps_async(pipeline(calls))) == (None, 'storage down', True)
+    assert calls == ['sync']
+
+
+def test_errors_the_pipeline_does_not_catch_propagate():
+    def steps():
+        yield Step(fail, 'packaging failed')
+
+    with pytest.raises(ValueError, match='packaging failed'):
+        run_steps(steps())
+    with pytest.raises(ValueError, match='packaging failed'):
+        asyncio.run(run_steps_async(steps()))
+
+
+@pytest.mark.parametrize('data, status', [
+    (None, 400),
+    ({'prompt': '   '}, 400),
+    ({'prompt': 'Research', 'agent_count': 0}, 400),
+    ({'prompt': 'Research', 'agent_count': '2'}, 400),
+])
+def test_generate_params_rejects_bad_requests(data, status):
+    with pytest.raises(RequestError) as refused:
+        generate_params(data)
+    assert refused.value.status == status
+    assert 'error' in refused.value.body
+
+
+@pytest.fixture
+def service():
+    """A service whose pipelines are collected in `started` instead of run."""
+    started = []
+    service = GenerationService(started.append)
+    service.started = started
+    return service
+
+
+def finished(service, session_id, token):
+    agents_yaml, tasks_yaml = crew_engine.fallback_config('Email campaign')
+    service.project_state[session_id] = {
+        'prompt': 'Email campaign', 'project_name': 'email_campaign', 'ai_provider': 'gemini',
+        'model_name': crew_engine.DEFAULT_MODEL, 'agent_count': None, 'agents_yaml': agents_yaml,
+        'tasks_yaml': tasks_yaml, 'artifact_key': 'key-1', 'revision': 1, 'owner': owner_id(token),
+    }
+    service.jobs.create(session_id, owner_id(token)).update(
+        Stage.COMPLETED, artifact_key='key-1', project_name='email_campaign', revision=1
+    )
+
+
+def regenerate(service, session_id, token):
+    try:
+        run_steps(service.regenerate(session_id, {'change': 'tasks'}, token))
+    except RequestError as e:
+        return e.status
+    return 200
+
+
+def test_a_second_regenerate_is_refused_while_the_first_runs(service):
+    token = new_owner_token()
+    finished(service, 'session', token)
+    assert regenerate(service, 'session', token) == 200
+    assert regenerate(service, 'session', token) == 409
+    assert len(service.started) == 1
+    assert service.jobs.get('session').stage is Stage.STARTING
+
+
+def test_a_running_job_without_project_state_is_busy_not_missing(service):
+    token = new_owner_token()
+    service.jobs.create('running', owner_id(token)).update(Stage.GENERATING_AI)
+    assert regenerate(service, 'running', token) == 409
+    service.jobs.create('failed', owner_id(token)).update(Stage.ERROR, detail='boom')
+    assert regenerate(service, 'failed', token) == 404
+    assert regenerate(service, 'running', new_owner_token()) == 404
+    assert service.started == []
+
+
+def test_the_worker_keeps_the_state_it_was_started_with(monkeypatch, service):
+    monkeypatch.setattr(generation_service, 'regenerate_config',
+                        lambda *args, **kwargs: (None, None, 'llm_error'))
+    token = new_owner_token()
+    finished(service, 'session', token)
+    assert regenerate(service, 'session', token) == 200
+    service.project_state.clear()
+    run_steps(service.started[0])
+    job = service.jobs.get('session')
+    assert (job.stage, job.message_key, job.revision) == (Stage.COMPLETED, 'regenerate_failed', 1)
+
+
+def test_a_pruned_zip_is_packaged_in_full():
+    agents_yaml, tasks_yaml = crew_engine.fallback_config('Email campaign')
+    patched = generation_service.config_step(b'PK', 'email_campaign', 'Email campaign', agents_yaml, tasks_yaml)
+    rebuilt = generation_service.config_step(None, 'email_campaign', 'Email campaign', agents_yaml, tasks_yaml)
+    assert (patched.args[0], rebuilt.args[0]) == (crew_engine.patch_config, crew_engine.package_zip)
+    assert rebuilt.args[1:] == ('email_campaign', 'Email campaign', agents_yaml, tasks_yaml)
@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+import types
+
+import pytest
+
+import job_status
+from job_status import Job, Stage
+
+
+def update_later(job, delay):
+    timer = threading.Timer(delay, job.update, (Stage.GENERATING_AI,))
+    timer.start()
+    return timer
+
+
+def test_wait_for_change_returns_on_update():
+    job = Job()
+    version = job.version
+    update_later(job, 0.05)
+    started = time.monotonic()
+    assert job.wait_for_change(version, 5) == version + 1
+    assert time.monotonic() - started < 1
+
+
+def test_wait_for_change_times_out_unchanged():
+    job = Job()
+    started = time.monotonic()
+    assert job.wait_for_change(job.version, 0.1) == job.version
+    assert time.monotonic() - started >= 0.1
+
+
+def test_wait_for_change_returns_at_once_for_an_old_version():
+    job = Job()
+    job.update(Stage.GENERATING_AI)
+    assert job.wait_for_change(1, 5) == 2
+
+
+
+def test_transition_if_moves_only_from_the_expected_stage():
+    job = Job()
+    assert not job.transition_if(Stage.COMPLETED, Stage.STARTING)
+    job.update(Stage.COMPLETED)
+    version = job.version
+    assert job.transition_if(Stage.COMPLETED, Stage.STARTING, 'regenerate_starting')
+    assert (job.stage, job.message_key, job.version) == (Stage.STARTING, 'regenerate_starting', version + 1)
+
+
+def test_transition_if_lets_one_of_many_threads_through():
+    job = Job()
+    job.update(Stage.COMPLETED)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def claim():
+        barrier.wait()
+        results.append(job.transition_if(Stage.COMPLETED, Stage.STARTING))
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [False] * 7 + [True]
+
+
+
+def test_to_json_serializes_once_per_version(monkeypatch):
+    dumps = []
+
+    def counting_dumps(data):
+        dumps.append(data)
+        return json.dumps(data)
+
+    monkeypatch.setattr(job_status, 'json', types.SimpleNamespace(dumps=counting_dumps))
+    job = Job()
+    body = job.to_json()
+    assert job.to_json() is body
+    assert len(dumps) == 1
+
+    job.update(Stage.COMPLETED, artifact_key='abc', project_name='crew', revision=1)
+    updated = job.to_json()
+    assert updated is not body and job.to_json() is updated
+    assert len(dumps) == 2
+    assert json.loads(updated) == {
+        'status': 'completed', 'message': 'Project generation completed!', 'progress': 100, 'version': 2,
+        'artifact_key': 'abc', 'project_name': 'crew', 'revision': 1, 'provisional': False,
+    }
+
+
+def test_to_json_fills_the_message_detail():
+    job = Job()
+    job.update(Stage.ERROR, detail='quota exceeded')
+    assert json.loads(job.to_json())['message'] == 'Error: quota exceeded'
+    assert 'artifact_key' not in json.loads(job.to_json())
+
+
+@pytest.fixture
+def flask_app():
+    import app
+    return app
+
+
+def test_status_long_poll_answers_304_on_timeout(flask_app):
+    job = flask_app.generation_status.create('long-poll-timeout')
+    started = time.monotonic()
+    response = flask_app.app.test_client().get(f'/status/long-poll-timeout?since={job.version}&wait=0.1')
+    assert response.status_code == 304
+    assert response.data == b''
+    assert time.monotonic() - started >= 0.1
+
+
+def test_status_long_poll_returns_the_next_version(flask_app):
+    job = flask_app.generation_status.create('long-poll-change')
+    version = job.version
+    update_later(job, 0.05)
+    response = flask_app.app.test_client().get(f'/status/long-poll-change?since={version}&wait=5')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert (data['version'], data['status']) == (version + 1, Stage.GENERATING_AI.value)
+
+
+def test_status_without_wait_answers_304_immediately(flask_app):
+    job = flask_app.generation_status.create('short-poll')
+    client = flask_app.app.test_client()
+    assert client.get(f'/status/short-poll?since={job.version}').status_code == 304
+    assert client.get(f'/status/short-poll?since={job.version - 1}').status_code == 200
+
+
+def finished_registry(monkeypatch, **kwargs):
+    """A registry on a fake monotonic clock, plus the list of evicted session ids."""
+    now = [1000.0]
+    monkeypatch.setattr(job_status, 'time', types.SimpleNamespace(monotonic=lambda: now[0]))
+    evicted = []
+    registry = job_status.JobRegistry(on_evict=evicted.append, **kwargs)
+    return registry, evicted, now
+
+
+def test_registry_evicts_idle_finished_jobs_only(monkeypatch):
+    registry, evicted, now = finished_registry(monkeypatch, max_jobs=100, ttl_seconds=60)
+    registry.create('running')
+    registry.create('done').update(Stage.COMPLETED)
+    registry.create('failed').update(Stage.ERROR)
+    now[0] += 61
+    registry.create('new')
+    assert evicted == ['done', 'failed']
+    assert registry.get('running') is not None and registry.get('done') is None
+    assert len(registry) == 2
+
+
+def test_registry_evicts_oldest_finished_jobs_over_capacity(monkeypatch):
+    registry, evicted, now = finished_registry(monkeypatch, max_jobs=2, ttl_seconds=3600)
+    for session_id in ('a', 'b'):
+        registry.create(session_id).update(Stage.COMPLETED)
+        now[0] += 1
+    registry.create('c')
+    assert evicted == ['a']
+    assert [registry.get(session_id) is not None for session_id in 'abc'] == [False, True, True]
+
+
+def test_registry_keeps_running_jobs_over_capacity(monkeypatch):
+    registry, evicted, now = finished_registry(monkeypatch, max_jobs=1, ttl_seconds=0)
+    registry.create('a')
+    registry.create('b')
+    assert evicted == []
+    assert len(registry) == 2
+
+
+def test_registry_keeps_a_finished_job_once_it_is_restarted(monkeypatch):
+    registry, evicted, now = finished_registry(monkeypatch, max_jobs=100, ttl_seconds=60)
+    registry.create('done').update(Stage.COMPLETED)
+    now[0] += 61
+    assert registry.get('done').transition_if(Stage.COMPLETED, Stage.STARTING)
+    registry.create('new')
+    assert evicted == []
+    assert registry.get('done').stage is Stage.STARTING
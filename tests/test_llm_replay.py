@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+import crew_engine
+import llm_replay
+from generation_stats import GenerationStats
+from rate_limiter import ModelLimiter, RateLimiterRegistry
+
+TOPICS = ['Email campaign for a product launch', 'Market research on electric vehicles']
+
+STRUCTURED = {
+    'agents': [
+        {'name': 'analyst', 'role': 'Analyst', 'goal': 'Plan', 'backstory': 'Experienced', 'allow_delegation': True},
+        {'name': 'writer', 'role': 'Writer', 'goal': 'Write', 'backstory': 'Copywriter', 'allow_delegation': False},
+    ],
+    'tasks': [
+        {'name': 'plan_task', 'description': 'Plan {topic}', 'expected_output': 'A plan', 'agent': 'analyst'},
+        {'name': 'write_task', 'description': 'Write {topic}', 'expected_output': 'A draft', 'agent': 'writer'},
+    ],
+}
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+class Usage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = Usage(100, len(text) // 4)
+
+
+class ProviderModel:
+    """A provider that is rate limited once, answers the first topic with an invalid response, then valid JSON."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt_text, generation_config=None, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise ResourceExhausted('429 quota exceeded')
+        if self.calls == 2:
+            return Response('{"agents": []}')
+        return Response(json.dumps(STRUCTURED))
+
+
+@pytest.fixture
+def replay_env(monkeypatch, tmp_path):
+    """Fresh replay session, stats and limiters; returns a function that switches the replay mode."""
+    monkeypatch.setenv('LLM_REPLAY_CORPUS', str(tmp_path / 'corpus.jsonl.gz'))
+    monkeypatch.setenv('STRUCTURED_OUTPUT', '1')
+    monkeypatch.setenv('STRUCTURED_OUTPUT_RETRIES', '1')
+    monkeypatch.setattr(llm_replay, '_replay', None)
+    monkeypatch.setattr(crew_engine, 'rate_limiters', RateLimiterRegistry(crew_engine.AI_MODELS))
+    # Retry 429s without sleeping for a backoff
+    monkeypatch.setattr(ModelLimiter, 'backoff_delay', lambda self, attempt: 0.0)
+
+    def mode(name, speed='1'):
+        monkeypatch.setenv('LLM_REPLAY', name)
+        monkeypatch.setenv('LLM_REPLAY_SPEED', speed)
+        monkeypatch.setattr(llm_replay, '_replay', None)
+        monkeypatch.setattr(crew_engine, 'generation_stats', GenerationStats())
+
+    return mode
+
+
+def run_topics():
+    results = [crew_engine.generate_config(topic, 2025, 'gemini', crew_engine.DEFAULT_MODEL) for topic in TOPICS]
+    return results, crew_engine.generation_stats.metrics()
+
+
+def test_replay_reproduces_the_recorded_run(monkeypatch, replay_env):
+    provider = ProviderModel()
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(crew_engine, 'get_gemini_model', lambda model_name, api_key: provider)
+    replay_env('record')
+    recorded, recorded_stats = run_topics()
+    assert provider.calls == 4
+    assert recorded_stats['modes']['structured']['retries'] == 1
+
+    monkeypatch.delenv('GEMINI_API_KEY')
+    replay_env('replay', speed='0')
+    replayed, replayed_stats = run_topics()
+    assert provider.calls == 4
+    assert replayed == recorded
+    assert replayed_stats == recorded_stats
+    assert llm_replay.get_replay().corpus.stats()['misses'] == 0
+
+
+def test_replay_limiter_scales_the_queue_budget():
+    replay = llm_replay.LLMReplay('replay', llm_replay.ReplayCorpus('unused.jsonl.gz'), speed=10)
+    scaled = replay.limiter(ModelLimiter('gemini', 'model', 60, 1000, max_wait=30))
+    assert (scaled.requests_per_minute, scaled.max_wait) == (600, 3)
+    assert replay.limiter(ModelLimiter('gemini', 'other', 60, 1000)).max_wait is None
+
+
+def test_quota_check_uses_the_replay_limiter(monkeypatch, replay_env):
+    replay_env('replay', speed='10')
+    live = crew_engine.rate_limiters.get('gemini', crew_engine.DEFAULT_MODEL)
+    scaled = crew_engine.quota_limiter(crew_engine.DEFAULT_MODEL)
+    assert scaled is not live
+    # Exhaust the request bucket on the replay clock only
+    for _ in range(int(scaled.requests_per_minute) * 2):
+        scaled.request_bucket.reserve()
+    assert scaled.would_reject() and not live.would_reject()
+    assert crew_engine.quota_retry_after('gemini', crew_engine.DEFAULT_MODEL) == pytest.approx(
+        scaled.expected_wait(), rel=0.1)
+
+
+def test_quota_rejections_are_not_counted_as_calls(monkeypatch, replay_env):
+    provider = ProviderModel()
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(crew_engine, 'get_gemini_model', lambda model_name, api_key: provider)
+    replay_env('off')
+    limiter = crew_engine.rate_limiters.get('gemini', crew_engine.DEFAULT_MODEL)
+    limiter.max_wait = 0.5
+    for _ in range(int(limiter.requests_per_minute) * 2):
+        limiter.request_bucket.reserve()
+    assert crew_engine.generate_config(TOPICS[0], 2025)[2] == 'quota_rejected'
+    assert provider.calls == 0
+    stats = crew_engine.generation_stats.metrics()['modes']['structured']
+    assert (stats['llm_calls'], stats['fallbacks'], stats['wasted_call_rate']) == (0, {'quota_rejected': 1}, 0.0)
+
+
+def test_backoff_past_the_budget_counts_the_rate_limited_call(monkeypatch, replay_env):
+    provider = ProviderModel()
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(crew_engine, 'get_gemini_model', lambda model_name, api_key: provider)
+    monkeypatch.setattr(ModelLimiter, 'backoff_delay', lambda self, attempt: 60.0)
+    replay_env('off')
+    assert crew_engine.generate_config(TOPICS[0], 2025)[2] == 'rate_limited'
+    assert provider.calls == 1
+    stats = crew_engine.generation_stats.metrics()['modes']['structured']
+    assert (stats['llm_calls'], stats['fallbacks']) == (1, {'rate_limited': 1})
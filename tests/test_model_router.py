@@ -0,0 +1,98 @@
+import pytest
+
+import model_router
+from model_router import ModelRouter
+
+
+class Clock:
+    """Stands in for the time module so ejections and probes can be stepped through."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(model_router, 'time', clock)
+    return clock
+
+
+def router(**kwargs):
+    return ModelRouter(['fast', 'slow'], **{'explore_rate': 0.0, 'eject_seconds': 60.0, **kwargs})
+
+
+def warm(route, latencies):
+    for model, latency in latencies.items():
+        route.observe_call(model, latency)
+
+
+def test_new_models_are_probed_one_request_at_a_time(clock):
+    route = router()
+    assert route.choose() == 'fast'
+    # 'fast' has its probe in flight, so the next request probes 'slow'
+    assert route.choose() == 'slow'
+
+
+def test_lowest_latency_healthy_model_wins(clock):
+    route = router()
+    warm(route, {'fast': 0.5, 'slow': 2.0})
+    assert route.choose() == 'fast'
+    for _ in range(5):
+        route.observe_validation('fast', False)
+    assert route.choose() == 'slow'
+
+
+def test_repeated_timeouts_eject_until_a_probe_succeeds(clock):
+    route = router()
+    warm(route, {'fast': 0.5, 'slow': 2.0})
+    route.observe_call('fast', 30.0, TimeoutError())
+    assert not route.get_health('fast').is_ejected(clock.now)
+    route.observe_call('fast', 30.0, TimeoutError())
+    assert route.choose() == 'slow'
+    assert route.stats()['models'][0]['ejected']
+
+    clock.now += 61
+    # Back from ejection: one probe goes to 'fast', everything else stays on 'slow' meanwhile
+    assert route.choose() == 'fast'
+    assert route.choose() == 'slow'
+    route.observe_call('fast', 0.5)
+    health = route.get_health('fast')
+    assert (health.consecutive_timeouts, health.error_ewma, health.probe_started) == (0, 0.0, None)
+    assert not route.stats()['models'][0]['ejected']
+
+
+def test_ejection_period_doubles_on_repeat(clock):
+    route = router(eject_timeouts=1)
+    warm(route, {'fast': 0.5, 'slow': 2.0})
+    route.observe_call('fast', 30.0, TimeoutError())
+    assert route.get_health('fast').ejected_until == clock.now + 60
+    clock.now += 61
+    assert route.choose() == 'fast'
+    route.observe_call('fast', 30.0, TimeoutError())
+    assert route.get_health('fast').ejected_until == clock.now + 120
+
+
+def test_unanswered_probe_expires(clock):
+    route = router(probe_seconds=180.0)
+    warm(route, {'fast': 0.5, 'slow': 2.0})
+    route.observe_call('fast', 30.0, TimeoutError())
+    route.observe_call('fast', 30.0, TimeoutError())
+    clock.now += 61
+    assert route.choose() == 'fast'
+    # The probe never reports back; until it expires, 'fast' gets no further requests
+    clock.now += 179
+    assert route.choose() == 'slow'
+    clock.now += 2
+    assert route.choose() == 'fast'
+
+
+def test_everything_ejected_uses_the_first_model_back(clock):
+    route = router(eject_timeouts=1)
+    route.observe_call('slow', 30.0, TimeoutError())
+    clock.now += 10
+    route.observe_call('fast', 30.0, TimeoutError())
+    assert route.choose() == 'slow'
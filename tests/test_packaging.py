@@ -0,0 +1,77 @@
+import io
+import re
+import zipfile
+
+import crew_engine
+
+PROJECT = 'market_research'
+PROMPT = 'Market research'
+
+
+def zip_files(zip_bytes):
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zipf:
+        return {info.filename: zipf.read(info).decode('utf-8') for info in zipf.infolist()}
+
+
+def crew_methods(crew_py):
+    """Names of the @agent and @task methods and the config keys they read."""
+    return re.findall(r'def (\w+)\(self\) -> (?:Agent|Task)', crew_py), re.findall(r"_config\['(\w+)'\]", crew_py)
+
+
+def config(agents, tasks):
+    agents_yaml = ''.join(f"{name}:\n  role: r\n  goal: g\n  backstory: b\n" for name in agents)
+    tasks_yaml = ''.join(f"{name}:\n  description: d\n  expected_output: e\n  agent: {agent}\n"
+                         for name, agent in tasks.items())
+    return crew_engine.validate_config(agents_yaml, tasks_yaml)
+
+
+def test_patch_zip_replaces_and_adds_files_and_keeps_the_rest():
+    original = crew_engine.build_zip(PROJECT, {'a.txt': 'one', 'b.txt': 'two'})
+    patched = crew_engine.patch_zip(original, PROJECT, {'b.txt': 'TWO', 'c.txt': 'three'})
+    assert zip_files(patched) == {f'{PROJECT}/a.txt': 'one', f'{PROJECT}/b.txt': 'TWO', f'{PROJECT}/c.txt': 'three'}
+    with zipfile.ZipFile(io.BytesIO(patched)) as zipf:
+        assert zipf.testzip() is None
+
+
+def test_patch_config_matches_a_full_rebuild():
+    agents_yaml, tasks_yaml = crew_engine.fallback_config(PROMPT)
+    new_agents, new_tasks = config(['researcher', 'writer', 'reviewer'],
+                                   {'research_task': 'researcher', 'write_task': 'writer', 'review_task': 'reviewer'})
+    draft = crew_engine.package_zip(PROJECT, PROMPT, agents_yaml, tasks_yaml)
+
+    patched = zip_files(crew_engine.patch_config(draft, PROJECT, PROMPT, new_agents, new_tasks))
+
+    assert patched == zip_files(crew_engine.package_zip(PROJECT, PROMPT, new_agents, new_tasks))
+
+
+def test_regenerated_crew_py_declares_every_new_agent_and_task():
+    # /regenerate once patched only the YAML files, leaving crew.py with the previous @agent/@task methods
+    agents_yaml, tasks_yaml = crew_engine.fallback_config(PROMPT)
+    draft = crew_engine.package_zip(PROJECT, PROMPT, agents_yaml, tasks_yaml)
+    new_agents, new_tasks = crew_engine.merge_config(
+        agents_yaml, tasks_yaml,
+        "fact_checker:\n  role: r\n  goal: g\n  backstory: b\n",
+        "fact_check_task:\n  description: d\n  expected_output: e\n  agent: fact_checker\n",
+    )
+
+    crew_py = zip_files(crew_engine.patch_config(draft, PROJECT, PROMPT, new_agents, new_tasks))[
+        f'{PROJECT}/src/{PROJECT}/crew.py']
+
+    methods, keys = crew_methods(crew_py)
+    agent_names, task_names = crew_engine.crew_roster(new_agents, new_tasks)
+    assert methods == keys == agent_names + task_names
+    assert 'fact_checker' in methods and 'fact_check_task' in methods
+
+
+def test_method_names_match_config_keys_for_reserved_and_clashing_names():
+    agents_yaml, tasks_yaml = config(['class', 'crew'], {'crew': 'crew', 'Final Report': 'class'})
+    crew_py = crew_engine.render_project_files(PROJECT, PROMPT, agents_yaml, tasks_yaml)[f'src/{PROJECT}/crew.py']
+
+    methods, keys = crew_methods(crew_py)
+    agent_names, task_names = crew_engine.crew_roster(agents_yaml, tasks_yaml)
+    assert methods == keys == agent_names + task_names
+    assert len(set(methods)) == len(methods)
+    assert 'class' not in methods and 'crew' not in methods
+    # Every task's agent is one of the declared agent methods
+    tasks = crew_engine.load_yaml(tasks_yaml)
+    assert {task['agent'] for task in tasks.values()} <= set(agent_names)
@@ -0,0 +1,90 @@
+import asyncio
+import concurrent.futures
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import packaging_pool
+
+
+def caller_thread(value):
+    return value, threading.current_thread().name
+
+
+class FakeExecutor:
+    """An executor whose futures fail with `error`, recording submissions and shutdowns."""
+
+    def __init__(self, error, max_workers=2):
+        self.error = error
+        self._max_workers = max_workers
+        self.submitted = []
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        self.submitted.append(fn)
+        future = concurrent.futures.Future()
+        future.set_exception(self.error)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def executor_env(monkeypatch):
+    """A fresh executor state; returns a function that installs `executor` as the pool of `kind`."""
+    monkeypatch.setattr(packaging_pool, '_executor', None)
+    monkeypatch.setattr(packaging_pool, '_executor_kind', None)
+
+    def install(executor, kind='process'):
+        monkeypatch.setattr(packaging_pool, '_executor', executor)
+        monkeypatch.setattr(packaging_pool, '_executor_kind', kind)
+        return executor
+
+    return install
+
+
+def test_inline_executor_packages_in_the_calling_thread(monkeypatch, executor_env):
+    monkeypatch.setenv('PACKAGING_EXECUTOR', 'inline')
+    assert packaging_pool.get_packaging_executor() is None
+    name = threading.current_thread().name
+    assert packaging_pool.run_packaging(caller_thread, 1) == (1, name)
+    assert packaging_pool.warm_packaging_pool() == 'inline'
+
+
+def test_unknown_executor_kind_is_rejected(monkeypatch, executor_env):
+    monkeypatch.setenv('PACKAGING_EXECUTOR', 'gpu')
+    with pytest.raises(ValueError, match='PACKAGING_EXECUTOR'):
+        packaging_pool.get_packaging_executor()
+
+
+def test_a_broken_pool_finishes_the_job_inline_and_is_rebuilt(executor_env):
+    executor = executor_env(FakeExecutor(BrokenProcessPool('worker killed')))
+    name = threading.current_thread().name
+    assert packaging_pool.run_packaging(caller_thread, 2) == (2, name)
+    assert executor.shut_down
+    assert (packaging_pool._executor, packaging_pool._executor_kind) == (None, None)
+
+
+def test_async_packaging_falls_back_to_a_thread(executor_env):
+    executor = executor_env(FakeExecutor(BrokenProcessPool('worker killed')))
+    value, thread_name = asyncio.run(packaging_pool.run_packaging_async(caller_thread, 3))
+    assert value == 3 and thread_name != threading.current_thread().name
+    assert executor.shut_down and packaging_pool._executor_kind is None
+
+
+def test_other_packaging_errors_are_not_retried(executor_env):
+    executor_env(FakeExecutor(ValueError('bad project')))
+    with pytest.raises(ValueError, match='bad project'):
+        packaging_pool.run_packaging(caller_thread, 4)
+
+
+def test_pool_that_cannot_start_switches_to_inline(executor_env, capsys):
+    executor = executor_env(FakeExecutor(OSError('cannot spawn')))
+    assert packaging_pool.warm_packaging_pool() == 'inline'
+    assert executor.submitted == [packaging_pool.warm_worker] * 2 and executor.shut_down
+    assert 'packaging inline' in capsys.readouterr().out
+    # Later jobs run in the caller without trying the dead pool again
+    assert packaging_pool.get_packaging_executor() is None
+    assert packaging_pool.run_packaging(caller_thread, 5)[0] == 5
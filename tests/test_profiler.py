@@ -0,0 +1,98 @@
+import re
+import threading
+import time
+
+import pytest
+
+import profiler
+
+
+def busy_marker(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_marker, args=(stop,), name='profiled-worker-7')
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+@pytest.mark.parametrize('header, authorized', [
+    ('Bearer s3cret', True),
+    ('bearer  s3cret ', True),
+    ('Bearer wrong', False),
+    ('Basic s3cret', False),
+    ('s3cret', False),
+    (None, False),
+])
+def test_bearer_token_is_required(monkeypatch, header, authorized):
+    monkeypatch.setenv('PROFILER_TOKEN', 's3cret')
+    assert profiler.is_authorized(header) is authorized
+
+
+def test_profiling_is_disabled_without_a_token(monkeypatch):
+    monkeypatch.delenv('PROFILER_TOKEN', raising=False)
+    assert profiler.profiler_token() is None
+    assert not profiler.is_authorized('Bearer ')
+
+
+def test_profile_arguments_are_clamped():
+    assert profiler.parse_profile_args({}) == (10.0, profiler.DEFAULT_SAMPLE_HZ)
+    assert profiler.parse_profile_args({'seconds': '9999', 'hz': '0'}) == (profiler.MAX_PROFILE_SECONDS, 1)
+    assert profiler.parse_profile_args({'seconds': 'x'}) == (10.0, profiler.DEFAULT_SAMPLE_HZ)
+
+
+def test_samples_are_collapsed_stacks_rooted_at_the_thread(busy_thread):
+    stacks, samples = profiler.sample_stacks(0.2, hz=200)
+    assert samples > 0
+    worker = [stack for stack in stacks if stack.startswith('profiled-worker;')]
+    assert worker and all('busy_marker (test_profiler.py:' in stack for stack in worker)
+    # The sampling thread itself is left out
+    assert not any('sample_stacks (profiler.py:' in stack for stack in stacks)
+
+    text = profiler.format_collapsed(stacks)
+    lines = text.splitlines()
+    assert all(re.fullmatch(r'\S.* \d+', line) for line in lines)
+    counts = [int(line.rsplit(' ', 1)[1]) for line in lines]
+    assert counts == sorted(counts, reverse=True)
+
+
+def test_one_profile_at_a_time():
+    with profiler._profile_lock:
+        with pytest.raises(profiler.ProfilerBusy):
+            profiler.sample_stacks(0.1)
+        with pytest.raises(profiler.ProfilerBusy):
+            profiler.allocation_diff(0.1)
+
+
+@pytest.fixture
+def flask_client():
+    import app
+    return app.app.test_client()
+
+
+def test_profile_endpoint_is_gated(monkeypatch, flask_client):
+    monkeypatch.delenv('PROFILER_TOKEN', raising=False)
+    assert flask_client.get('/debug/profile', headers={'Authorization': 'Bearer s3cret'}).status_code == 404
+    monkeypatch.setenv('PROFILER_TOKEN', 's3cret')
+    assert flask_client.get('/debug/profile').status_code == 401
+    assert flask_client.get('/debug/profile', headers={'Authorization': 'Bearer nope'}).status_code == 401
+
+
+def test_profile_endpoint_returns_collapsed_stacks(monkeypatch, flask_client, busy_thread):
+    monkeypatch.setenv('PROFILER_TOKEN', 's3cret')
+    started = time.monotonic()
+    response = flask_client.get('/debug/profile?seconds=0.2&hz=100', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    header, *stacks = response.get_data(as_text=True).splitlines()
+    assert re.fullmatch(r'# \d+ samples at 100 Hz over 0\.2s', header)
+    assert any(stack.startswith('profiled-worker;') for stack in stacks)
+    assert time.monotonic() - started >= 0.2
+    with profiler._profile_lock:
+        busy = flask_client.get('/debug/profile?seconds=0.1', headers={'Authorization': 'Bearer s3cret'})
+    assert busy.status_code == 409
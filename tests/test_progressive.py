@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+import crew_engine
+import generation_service
+import packaging_pool
+from artifact_storage import LocalDiskStorage, artifact_key
+from generation_history import GenerationHistory
+from generation_service import GenerationService, run_steps, run_steps_async
+from owner_tokens import new_owner_token
+
+PROMPT = 'Email campaign for a product launch'
+PROJECT_NAME = crew_engine.project_name_from_prompt(PROMPT)
+DRAFT = crew_engine.fallback_config(PROMPT)
+LLM_CONFIG = crew_engine.fallback_config('Market research on electric vehicles')
+
+
+class Progressive:
+    """A service on temporary storage and history whose pipelines are collected, then run by `run()`."""
+
+    def __init__(self, storage, history):
+        self.storage = storage
+        self.history = history
+        self.pipelines = []
+        self.service = GenerationService(self.pipelines.append)
+
+    def start(self):
+        self.session_id = self.service.generate({'prompt': PROMPT, 'progressive': True}, new_owner_token())
+        return self.service.jobs.get(self.session_id)
+
+    def run(self, driver):
+        pipeline = self.pipelines.pop()
+        if driver == 'async':
+            asyncio.run(run_steps_async(pipeline))
+        else:
+            run_steps(pipeline)
+
+
+@pytest.fixture
+def progressive(monkeypatch, tmp_path):
+    storage = LocalDiskStorage(str(tmp_path / 'artifacts'))
+    history = GenerationHistory(str(tmp_path / 'history.db'))
+    monkeypatch.setattr(generation_service, 'get_storage', lambda: storage)
+    monkeypatch.setattr(generation_service, 'get_history', lambda: history)
+    monkeypatch.setattr(packaging_pool, '_executor_kind', 'inline')
+    monkeypatch.setattr(packaging_pool, '_executor', None)
+    return Progressive(storage, history)
+
+
+@pytest.fixture
+def llm(monkeypatch, progressive):
+    """Answer the LLM step with a config (or raise an exception), recording the job status it ran under."""
+    seen = []
+
+    def answer(result):
+        def generate(prompt, current_year, ai_provider, model_name, agent_count=None):
+            seen.append(progressive.service.jobs.get(progressive.session_id).snapshot())
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        async def generate_async(*args, **kwargs):
+            return generate(*args, **kwargs)
+
+        monkeypatch.setattr(generation_service, 'generate_yaml_from_prompt', generate)
+        monkeypatch.setattr(generation_service, 'generate_yaml_from_prompt_async', generate_async)
+        return seen
+
+    return answer
+
+
+@pytest.mark.parametrize('driver', ['sync', 'async'])
+def test_the_draft_is_served_until_revision_2_replaces_it(progressive, llm, driver):
+    seen = llm(LLM_CONFIG)
+    job = progressive.start()
+    progressive.run(driver)
+
+    # While the LLM runs, the fallback draft is already advertised and stored
+    [during] = seen
+    draft_key = artifact_key(crew_engine.package_zip(PROJECT_NAME, PROMPT, *DRAFT))
+    assert (during['status'], during['revision'], during['provisional'], during['artifact_key']) == (
+        'generating_ai', 1, True, draft_key)
+    assert progressive.storage.exists(draft_key)
+
+    assert (job.stage.value, job.message_key, job.revision, job.provisional) == ('completed', 'upgraded', 2, False)
+    # Patching the draft gives the same bytes as packaging the LLM config from scratch
+    assert job.artifact_key == artifact_key(crew_engine.package_zip(PROJECT_NAME, PROMPT, *LLM_CONFIG))
+    assert progressive.storage.exists(job.artifact_key)
+    state = progressive.service.project_state[progressive.session_id]
+    assert ((state['agents_yaml'], state['tasks_yaml']), state['revision']) == (LLM_CONFIG, 2)
+    entry = progressive.history.get(progressive.session_id)
+    assert (entry['revision'], entry['artifact_key']) == (2, job.artifact_key)
+
+
+def test_an_llm_fallback_makes_the_draft_final(progressive, llm):
+    llm(DRAFT)
+    job = progressive.start()
+    progressive.run('sync')
+    assert (job.stage.value, job.message_key, job.revision, job.provisional) == ('completed', 'completed', 1, False)
+    assert progressive.history.get(progressive.session_id)['revision'] == 1
+
+
+@pytest.mark.parametrize('driver', ['sync', 'async'])
+def test_a_failed_upgrade_keeps_the_draft(progressive, llm, driver):
+    llm(ConnectionError('provider unreachable'))
+    job = progressive.start()
+    progressive.run(driver)
+    assert (job.stage.value, job.message_key, job.revision, job.provisional) == (
+        'completed', 'upgrade_failed', 1, False)
+    assert job.snapshot()['message'] == 'AI generation failed (provider unreachable); the draft project is kept.'
+    assert progressive.storage.exists(job.artifact_key)
+    assert progressive.history.get(progressive.session_id)['artifact_key'] == job.artifact_key
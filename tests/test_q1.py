@@ -0,0 +1,132 @@
+import os
+import zipfile
+
+import pytest
+
+import crew_engine
+import q1
+
+
+@pytest.fixture
+def batch_file(tmp_path):
+    def write(*lines):
+        path = tmp_path / 'batch.jsonl'
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        return str(path)
+
+    return write
+
+
+@pytest.fixture
+def fake_crewai(tmp_path, monkeypatch):
+    """A `crewai` executable on an isolated PATH that counts its runs, with the cache under tmp_path."""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    runs = tmp_path / 'runs'
+    exe = bin_dir / 'crewai'
+
+    def install(version='0.130.0', status=0):
+        exe.write_text(f'#!/bin/sh\necho run >> "{runs}"\necho "crewai version {version}"\nexit {status}\n')
+        exe.chmod(0o755)
+
+    def run_count():
+        return len(runs.read_text().splitlines()) if runs.exists() else 0
+
+    monkeypatch.setenv('PATH', str(bin_dir))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    install.run_count = run_count
+    install.exe = exe
+    return install
+
+
+@pytest.fixture
+def offline_generation(monkeypatch):
+    """Generate every batch project from the built-in fallback configuration."""
+    monkeypatch.setattr(q1, 'generate_yaml_from_prompt',
+                        lambda prompt, current_year, *args, **kwargs: crew_engine.fallback_config(prompt))
+
+
+def test_read_batch_jobs_skips_blank_lines_and_comments(batch_file):
+    jobs, invalid = q1.read_batch_jobs(batch_file('', '# header', 'Market research', '   ',
+                                                  '{"prompt": "Email campaign", "model_name": "gemini-1.5-pro"}'))
+    assert invalid == []
+    assert [(job['prompt'], job['ai_provider'], job['model_name']) for job in jobs] == [
+        ('Market research', 'gemini', 'gemini-1.5-flash'),
+        ('Email campaign', 'gemini', 'gemini-1.5-pro'),
+    ]
+
+
+def test_read_batch_jobs_reports_malformed_lines(batch_file):
+    jobs, invalid = q1.read_batch_jobs(batch_file('{"prompt": "ok"', '{"model_name": "x"}', '{"prompt": "  "}',
+                                                  'Market research'))
+    assert [job['prompt'] for job in jobs] == ['Market research']
+    assert [line_number for line_number, _ in invalid] == [1, 2, 3]
+    assert invalid[0][1].startswith('invalid JSON')
+    assert invalid[1][1] == "JSON line has no 'prompt'"
+
+
+@pytest.mark.parametrize('prompt, name', [
+    ('Market research', 'market_research'),
+    ('../../etc/passwd', 'etc_passwd'),
+    ('/tmp/x', 'tmp_x'),
+    ('..', 'crew'),
+    ('C:\\Windows\\evil', 'c_windows_evil'),
+])
+def test_batch_project_names_are_safe_identifiers(prompt, name):
+    assert q1.batch_project_name(prompt) == name
+
+
+def test_project_dir_stays_inside_the_output_directory(tmp_path):
+    assert q1.project_dir(str(tmp_path), 'crew') == os.path.realpath(tmp_path / 'crew')
+    for name in ('..', '../crew', 'a/b', '/etc'):
+        with pytest.raises(ValueError):
+            q1.project_dir(str(tmp_path), name)
+
+
+def test_run_batch_writes_hostile_prompts_inside_the_output_dir(tmp_path, batch_file, offline_generation):
+    output_dir = tmp_path / 'crews'
+    assert q1.run_batch(batch_file('../../escape attempt', '/absolute/path'), str(output_dir), concurrency=1) == 0
+    assert sorted(os.listdir(output_dir)) == ['absolute_path', 'escape_attempt']
+    assert sorted(os.listdir(tmp_path)) == ['batch.jsonl', 'crews']
+
+
+def test_run_batch_keeps_duplicate_names_apart(tmp_path, batch_file, offline_generation):
+    archive = tmp_path / 'crews.zip'
+    source = batch_file('Market research', 'market research', '{"prompt": "Market-research"}', '{bad')
+    # The malformed line is skipped and makes the exit status non-zero
+    assert q1.run_batch(source, archive=str(archive), concurrency=2) == 1
+    with zipfile.ZipFile(archive) as zipf:
+        projects = {name.split('/')[0] for name in zipf.namelist()}
+    assert projects == {'market_research', 'market_research_2', 'market_research_3'}
+
+
+def test_crewai_version_is_cached_until_the_executable_changes(fake_crewai):
+    fake_crewai('0.130.0')
+    assert q1.installed_crewai_version() == '0.130.0'
+    assert q1.installed_crewai_version() == '0.130.0'
+    assert fake_crewai.run_count() == 1
+    assert os.path.exists(q1.crewai_cache_path())
+
+    # An upgrade replaces the executable, which changes its mtime
+    fake_crewai('0.140.0')
+    mtime = os.path.getmtime(fake_crewai.exe) + 10
+    os.utime(fake_crewai.exe, (mtime, mtime))
+    assert q1.installed_crewai_version() == '0.140.0'
+    assert fake_crewai.run_count() == 2
+
+
+def test_crewai_version_recovers_from_a_corrupt_cache(fake_crewai):
+    fake_crewai()
+    os.makedirs(os.path.dirname(q1.crewai_cache_path()))
+    with open(q1.crewai_cache_path(), 'w', encoding='utf-8') as f:
+        f.write('{not json')
+    assert q1.installed_crewai_version() == '0.130.0'
+    assert q1.installed_crewai_version() == '0.130.0'
+    assert fake_crewai.run_count() == 1
+
+
+def test_crewai_version_when_missing_or_broken(fake_crewai):
+    assert q1.installed_crewai_version() is None
+    fake_crewai(status=1)
+    assert q1.installed_crewai_version() is None
+    assert not os.path.exists(q1.crewai_cache_path())
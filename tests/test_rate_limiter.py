@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from rate_limiter import ModelLimiter, QuotaExhausted, TokenBucket, is_rate_limit_error
+
+
+class RateLimited(Exception):
+    code = 429
+
+
+class Response:
+    text = 'ok'
+    usage_metadata = None
+
+
+def flaky(failures, error=RateLimited):
+    """A provider call that raises `error` `failures` times, then succeeds."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error('slow down')
+        return Response()
+
+    return fn, calls
+
+
+def limiter(**kwargs):
+    # Backoff of at most a millisecond keeps retries fast
+    return ModelLimiter('gemini', 'test-model', 60, 100000, **{'base_delay': 0.001, 'max_delay': 0.001, **kwargs})
+
+
+def test_token_bucket_queues_callers_once_empty():
+    bucket = TokenBucket(capacity=2, rate=1)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.wait_time() == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    # The second caller behind an empty bucket waits for two refills
+    assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+
+def test_token_bucket_refund_makes_tokens_available_again():
+    bucket = TokenBucket(capacity=10, rate=1)
+    bucket.reserve(10)
+    bucket.adjust(-4)
+    assert bucket.available() == pytest.approx(4.0, abs=0.05)
+    assert bucket.reserve(20) == pytest.approx(6.0, abs=0.05)
+
+
+def test_rate_limit_errors_are_recognized_by_status_or_type():
+    assert is_rate_limit_error(RateLimited())
+    assert not is_rate_limit_error(ValueError('quota exceeded'))
+
+
+def test_call_retries_rate_limited_responses():
+    model_limiter = limiter()
+    fn, calls = flaky(2)
+    assert isinstance(model_limiter.call(fn, 10), Response)
+    assert len(calls) == 3
+    stats = model_limiter.stats()
+    assert (stats['requests'], stats['succeeded'], stats['rate_limited'], stats['retries']) == (3, 1, 2, 2)
+
+
+def test_call_async_retries_rate_limited_responses():
+    model_limiter = limiter()
+    fn, calls = flaky(1)
+
+    async def call():
+        return fn()
+
+    assert isinstance(asyncio.run(model_limiter.call_async(call, 10)), Response)
+    assert len(calls) == 2
+    assert model_limiter.stats()['retries'] == 1
+
+
+def test_other_errors_are_not_retried():
+    model_limiter = limiter()
+    fn, calls = flaky(1, ValueError)
+    with pytest.raises(ValueError):
+        model_limiter.call(fn, 10)
+    assert len(calls) == 1
+    assert model_limiter.stats()['failed'] == 1
+
+
+def test_retries_stop_after_max_retries():
+    model_limiter = limiter(max_retries=2)
+    fn, calls = flaky(5)
+    with pytest.raises(RateLimited):
+        model_limiter.call(fn, 10)
+    assert len(calls) == 3
+
+
+def test_quota_exhausted_when_the_queue_exceeds_max_wait():
+    model_limiter = ModelLimiter('gemini', 'test-model', 1, 100000, max_wait=5)
+    fn, calls = flaky(0)
+    model_limiter.call(fn, 10)
+    with pytest.raises(QuotaExhausted) as excinfo:
+        model_limiter.call(fn, 10)
+    assert excinfo.value.retry_after == pytest.approx(60, abs=1)
+    assert len(calls) == 1
+    assert model_limiter.stats()['rejected'] == 1
+    # The rejected reservation was handed back, so the next caller does not queue behind it
+    assert model_limiter.expected_wait() == pytest.approx(60, abs=1)
+
+
+def test_quota_exhausted_when_backoff_exceeds_max_wait(monkeypatch):
+    model_limiter = limiter(max_wait=1)
+    monkeypatch.setattr(model_limiter, 'backoff_delay', lambda attempt: 10.0)
+    fn, calls = flaky(1)
+    with pytest.raises(QuotaExhausted) as excinfo:
+        model_limiter.call(fn, 10)
+    assert isinstance(excinfo.value.__cause__, RateLimited)
+    assert len(calls) == 1
+    stats = model_limiter.stats()
+    assert (stats['failed'], stats['rate_limited'], stats['retries']) == (1, 1, 0)
@@ -0,0 +1,97 @@
+import gzip
+import json
+
+import pytest
+
+import static_assets
+from static_assets import StaticAsset, accepted_encodings, json_asset
+
+PAGE = '<html><body>' + 'crew ' * 400 + '</body></html>'
+
+
+@pytest.fixture
+def page():
+    return static_assets.html_asset(PAGE)
+
+
+def test_accept_encoding_q_values():
+    assert accepted_encodings('gzip, br;q=0.5, identity;q=0, x;q=bad, ') == {
+        'gzip': 1.0, 'br': 0.5, 'identity': 0.0, 'x': 0.0,
+    }
+    assert accepted_encodings(None) == {}
+
+
+def test_negotiation_prefers_the_best_accepted_encoding(page):
+    best = 'br' if 'br' in page.bodies else 'gzip'
+    assert page.negotiate('gzip') == 'gzip'
+    assert page.negotiate('gzip, br') == best
+    assert page.negotiate('*') == best
+    assert page.negotiate('br;q=0.5, gzip') == 'gzip'
+    assert page.negotiate('gzip;q=0') == 'identity'
+    assert page.negotiate('*;q=0, identity') == 'identity'
+    assert page.negotiate(None) == 'identity'
+
+
+def test_each_encoding_has_its_own_stable_etag(page):
+    assert gzip.decompress(page.bodies['gzip']) == PAGE.encode()
+    assert len(set(page.etags.values())) == len(page.bodies)
+    assert page.etags['gzip'] == f'"{page.version}-gz"' and page.etags['identity'] == f'"{page.version}"'
+    # gzip is written with mtime=0, so another process builds the same bytes and ETags
+    assert static_assets.html_asset(PAGE).etags == page.etags
+
+
+def test_encodings_that_do_not_shrink_the_body_are_dropped():
+    tiny = StaticAsset('[]', 'application/json')
+    assert list(tiny.bodies) == ['identity']
+    assert tiny.negotiate('gzip, br') == 'identity'
+
+
+def test_responses_vary_on_accept_encoding(page):
+    body, status, headers = page.respond({'Accept-Encoding': 'gzip;q=1, br;q=0'})
+    assert (status, headers['Content-Encoding'], headers['ETag']) == (200, 'gzip', page.etags['gzip'])
+    assert gzip.decompress(body) == PAGE.encode()
+    assert (headers['Vary'], headers['Cache-Control']) == ('Accept-Encoding', 'no-cache')
+    body, status, headers = page.respond({})
+    assert (body, status, 'Content-Encoding' in headers) == (PAGE.encode(), 200, False)
+
+
+@pytest.mark.parametrize('if_none_match', [
+    lambda asset: asset.etags['identity'],
+    lambda asset: f"\"other\", W/{asset.etags['gzip']}",
+    lambda asset: '*',
+])
+def test_matching_if_none_match_gets_an_empty_304(page, if_none_match):
+    body, status, headers = page.respond({'Accept-Encoding': 'gzip', 'If-None-Match': if_none_match(page)})
+    assert (body, status) == (b'', 304)
+    assert (headers['ETag'], headers['Vary']) == (page.etags['gzip'], 'Accept-Encoding')
+    assert 'Content-Encoding' not in headers
+
+
+def test_a_stale_etag_gets_the_full_body(page):
+    _, status, _ = page.respond({'If-None-Match': '"0123456789abcdef"'})
+    assert status == 200
+
+
+def test_model_lists_are_cached_for_static_max_age(monkeypatch):
+    monkeypatch.setenv('STATIC_MAX_AGE', '60')
+    asset = json_asset(['gemini-1.5-flash'])
+    body, _, headers = asset.respond({})
+    assert json.loads(body) == ['gemini-1.5-flash']
+    assert (headers['Content-Type'], headers['Cache-Control']) == ('application/json', 'public, max-age=60')
+
+
+def test_flask_routes_serve_the_negotiated_assets():
+    import app
+    client = app.app.test_client()
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert (response.status_code, response.headers['Content-Encoding'], response.headers['Vary']) == (
+        200, 'gzip', 'Accept-Encoding')
+    assert b'<html' in gzip.decompress(response.data).lower()
+    etag = response.headers['ETag']
+    revalidated = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert (revalidated.status_code, revalidated.data) == (304, b'')
+
+    models = client.get('/api/models/gemini')
+    assert models.headers['Cache-Control'].startswith('public, max-age=')
+    assert json.loads(models.data) == app.AI_MODELS['gemini']['models']
+    assert json.loads(client.get('/api/models/unknown').data) == []
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+import pytest
+
+from tracing import Tracer
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def tracer():
+    return Tracer(ListExporter(), max_sessions=2)
+
+
+def test_nested_spans_share_the_session_trace(tracer):
+    with tracer.span('POST /generate', 'session-1', prompt_chars=12) as root:
+        with tracer.span('generate_project', 'session-1') as child:
+            with tracer.span('llm.call', model=None) as grandchild:
+                pass
+    assert root.parent_id is None
+    assert (child.trace_id, child.parent_id, child.session_id) == (root.trace_id, root.span_id, 'session-1')
+    assert (grandchild.parent_id, grandchild.session_id) == (child.span_id, 'session-1')
+    # None attributes are dropped
+    assert (root.attributes, grandchild.attributes) == ({'prompt_chars': 12}, {})
+    assert [span.name for span in tracer.get_trace('session-1')] == ['POST /generate', 'generate_project', 'llm.call']
+    assert [span.name for span in tracer.exporter.spans] == ['llm.call', 'generate_project', 'POST /generate']
+    assert [row['depth'] for row in tracer.waterfall('session-1')] == [0, 1, 2]
+
+
+def test_a_worker_thread_rejoins_its_session_under_the_root(tracer):
+    spans = {}
+    with tracer.span('POST /generate', 'session-1') as root:
+        def worker():
+            with tracer.span('generate_project', 'session-1') as span:
+                spans['worker'] = span
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    # The worker starts with an empty context, so it links to the session root by id
+    assert (spans['worker'].trace_id, spans['worker'].parent_id) == (root.trace_id, root.span_id)
+    with tracer.span('GET /download', 'session-1') as later:
+        pass
+    assert (later.trace_id, later.parent_id) == (root.trace_id, root.span_id)
+
+
+def test_a_span_for_another_session_starts_a_new_trace(tracer):
+    with tracer.span('POST /generate', 'session-1') as first:
+        with tracer.span('POST /generate', 'session-2') as second:
+            pass
+    assert second.trace_id != first.trace_id and second.parent_id is None
+    with tracer.span('untracked') as untracked:
+        pass
+    assert untracked.session_id is None and untracked.trace_id not in (first.trace_id, second.trace_id)
+
+
+def test_spans_follow_asyncio_tasks_and_threads(tracer):
+    async def main():
+        with tracer.span('POST /generate', 'session-1') as root:
+            async def task():
+                with tracer.span('generate_project') as span:
+                    return span
+
+            def blocking():
+                with tracer.span('storage.put') as span:
+                    return span
+
+            return root, await asyncio.create_task(task()), await asyncio.to_thread(blocking)
+
+    root, task_span, thread_span = asyncio.run(main())
+    assert task_span.parent_id == root.span_id and task_span.session_id == 'session-1'
+    assert thread_span.parent_id == root.span_id and thread_span.session_id == 'session-1'
+
+
+def test_errors_are_recorded_and_reraised(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span('validate_config', 'session-1') as span:
+            raise ValueError('bad yaml')
+    assert span.error == 'ValueError: bad yaml' and span.end_ns is not None
+    assert span.to_otlp()['status'] == {'code': 2, 'message': 'ValueError: bad yaml'}
+
+
+def test_only_the_most_recent_sessions_are_kept(tracer):
+    for session_id in ('a', 'b', 'c'):
+        with tracer.span('POST /generate', session_id):
+            pass
+    assert tracer.get_trace('a') is None
+    assert [row['name'] for row in tracer.waterfall('c')] == ['POST /generate']
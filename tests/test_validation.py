@@ -0,0 +1,229 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+import crew_engine
+import prompt_templates
+
+TOPIC = 'Email campaign for a product launch'
+
+AGENTS_YAML = """
+content_analyzer:
+  role: Analyst
+  goal: Understand the inputs
+  backstory: Years of campaign work
+  verbose: true
+  allow_delegation: true
+  tools: [search]
+email_writer:
+  role: Writer
+  goal: Write the email
+  backstory: Copywriter
+  verbose: true
+  allow_delegation: false
+"""
+TASKS_YAML = """
+analysis_task:
+  description: Analyze {subject}
+  expected_output: A plan
+  agent: content_analyzer
+writing_task:
+  description: Write to {recipient_name}
+  expected_output: The email
+  agent: email_writer
+"""
+TEXT_RESPONSE = f"```yaml\n--- agents.yaml ---\n{AGENTS_YAML}\n--- tasks.yaml ---\n{TASKS_YAML}\n```"
+
+STRUCTURED = {
+    'agents': [
+        {'name': 'content_analyzer', 'role': 'Analyst', 'goal': 'Understand the inputs',
+         'backstory': 'Years of campaign work', 'allow_delegation': True},
+        {'name': 'email_writer', 'role': 'Writer', 'goal': 'Write the email', 'backstory': 'Copywriter',
+         'allow_delegation': False},
+    ],
+    'tasks': [
+        {'name': 'analysis_task', 'description': 'Analyze {subject}', 'expected_output': 'A plan',
+         'agent': 'content_analyzer'},
+        {'name': 'writing_task', 'description': 'Write to {recipient_name}', 'expected_output': 'The email',
+         'agent': 'email_writer'},
+    ],
+}
+
+
+def structured(**changes):
+    data = json.loads(json.dumps(STRUCTURED))
+    for path, value in changes.items():
+        section, index, field = path.split('__')
+        data[section][int(index)][field] = value
+    return json.dumps(data)
+
+
+def fake_llm(monkeypatch, response_text):
+    """Answer every provider call with `response_text`; returns the list of prompts sent."""
+    prompts = []
+
+    def call_llm(prompt_text, ai_provider='gemini', model_name=None, api_key=None, generation_config=None):
+        prompts.append(prompt_text)
+        return response_text, None
+
+    monkeypatch.setattr(crew_engine, 'call_llm', call_llm)
+    return prompts
+
+
+def test_validate_config_drops_tools_and_keeps_names():
+    agents_yaml, tasks_yaml = crew_engine.validate_config(AGENTS_YAML, TASKS_YAML)
+    agents, tasks = crew_engine.load_yaml(agents_yaml), crew_engine.load_yaml(tasks_yaml)
+    assert list(agents) == ['content_analyzer', 'email_writer']
+    assert 'tools' not in agents['content_analyzer']
+    assert [task['agent'] for task in tasks.values()] == ['content_analyzer', 'email_writer']
+
+
+@pytest.mark.parametrize('agents_yaml, tasks_yaml', [
+    (AGENTS_YAML, TASKS_YAML.replace('agent: email_writer', 'agent: nobody')),
+    ('just a string', TASKS_YAML),
+    (AGENTS_YAML, 'analysis_task: [unclosed'),
+])
+def test_validate_config_rejects_inconsistent_or_malformed_yaml(agents_yaml, tasks_yaml):
+    assert crew_engine.validate_config(agents_yaml, tasks_yaml) is None
+
+
+def test_validate_structured_renders_the_same_yaml_as_text_mode():
+    assert crew_engine.validate_structured(json.dumps(STRUCTURED)) == crew_engine.validate_config(AGENTS_YAML,
+                                                                                                  TASKS_YAML)
+
+
+@pytest.mark.parametrize('response_text', [
+    'not json',
+    json.dumps({'agents': STRUCTURED['agents']}),
+    json.dumps({'agents': [], 'tasks': STRUCTURED['tasks']}),
+    structured(agents__0__allow_delegation='yes'),
+    structured(agents__1__role='  '),
+    structured(agents__1__name='content_analyzer'),
+    structured(tasks__1__agent='nobody'),
+])
+def test_validate_structured_rejects_schema_violations(response_text):
+    assert crew_engine.validate_structured(response_text) is None
+
+
+@pytest.mark.parametrize('variant', ['full', 'compact'])
+def test_prompt_variants_share_text_mode_validation(monkeypatch, variant):
+    monkeypatch.setenv('PROMPT_VARIANT', variant)
+    monkeypatch.setenv('STRUCTURED_OUTPUT', '0')
+    prompts = fake_llm(monkeypatch, TEXT_RESPONSE)
+    agents_yaml, tasks_yaml, reason = crew_engine.generate_config(TOPIC, 2025)
+    assert prompts[0].template_id == f'config.{variant}@2'
+    assert reason is None
+    assert (agents_yaml, tasks_yaml) == crew_engine.validate_config(AGENTS_YAML, TASKS_YAML)
+
+
+@pytest.mark.parametrize('variant', ['full', 'compact'])
+def test_prompt_variants_share_structured_validation(monkeypatch, variant):
+    monkeypatch.setenv('PROMPT_VARIANT', variant)
+    monkeypatch.setenv('STRUCTURED_OUTPUT', '1')
+    monkeypatch.setenv('STRUCTURED_OUTPUT_RETRIES', '0')
+    prompts = fake_llm(monkeypatch, json.dumps(STRUCTURED))
+    agents_yaml, tasks_yaml, reason = crew_engine.generate_structured_config(TOPIC, 2025)
+    assert prompts[0].template_id == f'config_structured.{variant}@2'
+    assert reason is None
+    assert (agents_yaml, tasks_yaml) == crew_engine.validate_structured(json.dumps(STRUCTURED))
+
+
+@pytest.mark.parametrize('variant', ['full', 'compact'])
+def test_invalid_responses_fall_back_in_every_variant(monkeypatch, variant):
+    monkeypatch.setenv('PROMPT_VARIANT', variant)
+    monkeypatch.setenv('STRUCTURED_OUTPUT', '0')
+    fake_llm(monkeypatch, 'no tasks section here')
+    agents_yaml, tasks_yaml, reason = crew_engine.generate_config(TOPIC, 2025)
+    assert reason == 'invalid_response'
+    assert (agents_yaml, tasks_yaml) == crew_engine.fallback_config(TOPIC)
+
+
+def format_source(template):
+    """The str.format text a compiled template was built from."""
+    return ''.join(literal.replace('{', '{{').replace('}', '}}') + (f'{{{field}}}' if field else '')
+                   for literal, field in template.parts)
+
+
+@pytest.mark.parametrize('key', sorted(prompt_templates.TEMPLATES))
+def test_compiled_templates_render_like_str_format(key):
+    template = prompt_templates.TEMPLATES[key]
+    values = {field: f'<{field}>' for field in template.fields}
+    rendered = template.render(**values)
+    assert rendered == format_source(template).format(**values)
+    assert rendered.template_id == template.id
+
+
+def test_template_literal_braces_and_errors():
+    template = prompt_templates.PromptTemplate('sample', 'full', 1, 'Topic {topic}, inputs {{subject}}')
+    assert template.render(topic='email') == 'Topic email, inputs {subject}'
+    with pytest.raises(KeyError):
+        template.render()
+    with pytest.raises(ValueError):
+        prompt_templates.compile_template('{topic!r}')
+
+
+def test_domain_line_only_appears_when_given():
+    assert 'Domain:' not in crew_engine.build_prompt(TOPIC, 2025)
+    assert f'"{TOPIC}"\nDomain: email\n' in crew_engine.build_prompt(TOPIC, 2025, domain='email')
+
+
+def engine_prompts():
+    """Every prompt the engine builds, rendered with the arguments the engine passes."""
+    agents_yaml, _ = crew_engine.fallback_config(TOPIC)
+    plan = crew_engine.parse_plan(
+        '- {agent: analyst, role: Analyst, task: analysis_task, summary: plan}\n'
+        '- {agent: writer, role: Writer, task: writing_task, summary: write}', 2
+    )
+    return [
+        crew_engine.build_prompt(TOPIC, 2025),
+        crew_engine.build_prompt(TOPIC, 2025, domain='email'),
+        crew_engine.build_structured_prompt(TOPIC, 2025),
+        crew_engine.build_structured_prompt(TOPIC, 2025, domain='email'),
+        crew_engine.build_plan_prompt(TOPIC, 2, 2025),
+        *(crew_engine.build_member_prompt(TOPIC, plan, index, 2025) for index in range(len(plan))),
+        *(crew_engine.regenerate_prompt(change, TOPIC, agents_yaml, 2025) for change in ('tasks', 'add_agent')),
+    ]
+
+
+def test_engine_prompt_builders_render_every_registered_template(monkeypatch):
+    rendered = set()
+    for variant in ('full', 'compact'):
+        monkeypatch.setenv('PROMPT_VARIANT', variant)
+        rendered.update(prompt.template_id for prompt in engine_prompts())
+    assert rendered == {template.id for template in prompt_templates.TEMPLATES.values()}
+
+
+def test_prompt_benchmark_renders_sizes(monkeypatch, capsys):
+    # The benchmark switches variants through the environment; monkeypatch restores it afterwards
+    monkeypatch.setenv('PROMPT_VARIANT', 'full')
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'bench_prompts.py')
+    spec = importlib.util.spec_from_file_location('bench_prompts', path)
+    bench = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bench)
+    bench.report_sizes()
+    output = capsys.readouterr().out
+    for template in prompt_templates.TEMPLATES.values():
+        assert template.id in output
+
+
+@pytest.mark.parametrize('agent_count', [True, False, 2.0, '2', 0, crew_engine.MAX_CREW_AGENTS + 1])
+def test_generate_rejects_agent_counts_that_are_not_ints_in_range(agent_count):
+    import app
+    response = app.app.test_client().post('/generate', json={'prompt': TOPIC, 'agent_count': agent_count})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': f'agent_count must be between 1 and {crew_engine.MAX_CREW_AGENTS}'}
+
+
+def test_asgi_generate_rejects_boolean_agent_counts():
+    import asyncio
+    pytest.importorskip('quart')
+    import asgi_app
+
+    async def post():
+        async with asgi_app.app.test_app() as test_app:
+            response = await test_app.test_client().post('/generate', json={'prompt': TOPIC, 'agent_count': True})
+            return response.status_code
+
+    assert asyncio.run(post()) == 400
@@ -0,0 +1,62 @@
+import time
+import types
+
+import pytest
+
+import packaging_pool
+import warmup
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Run warm_up() on a fresh state with its backoff sleeps recorded instead of slept."""
+    monkeypatch.setitem(warmup.warmup_state, 'ready', False)
+    for key in ('llm_client', 'packaging', 'error', 'seconds'):
+        monkeypatch.setitem(warmup.warmup_state, key, None)
+    delays = []
+    monkeypatch.setattr(warmup, 'time', types.SimpleNamespace(sleep=delays.append, perf_counter=time.perf_counter))
+    return delays
+
+
+def failing(monkeypatch, failures):
+    attempts = []
+
+    def warm_llm_client():
+        attempts.append(1)
+        if len(attempts) <= failures:
+            raise ConnectionError('provider unreachable')
+        return 'fallback'
+
+    monkeypatch.setattr(warmup, 'warm_llm_client', warm_llm_client)
+    return attempts
+
+
+def test_required_steps_are_retried_until_ready(monkeypatch, sleeps):
+    monkeypatch.setattr(warmup, 'warm_optional', lambda: None)
+    attempts = failing(monkeypatch, 2)
+    warmup.warm_up()
+    assert len(attempts) == 3
+    assert sleeps == [1, 2]
+    assert warmup.is_ready()
+    assert (warmup.warmup_state['llm_client'], warmup.warmup_state['error']) == ('fallback', None)
+
+
+def test_retry_backoff_is_capped(monkeypatch, sleeps):
+    monkeypatch.setattr(warmup, 'warm_optional', lambda: None)
+    monkeypatch.setattr(warmup, 'WARMUP_MAX_RETRY_SECONDS', 3)
+    failing(monkeypatch, 4)
+    warmup.warm_up()
+    assert sleeps == [1, 2, 3, 3]
+
+
+def test_optional_failure_does_not_block_readiness(monkeypatch, sleeps):
+    failing(monkeypatch, 0)
+
+    def warm_packaging_pool():
+        raise OSError('cannot spawn workers')
+
+    monkeypatch.setattr(packaging_pool, 'warm_packaging_pool', warm_packaging_pool)
+    warmup.warm_up()
+    assert sleeps == []
+    assert warmup.is_ready()
+    assert warmup.warmup_state['error'] == 'cannot spawn workers'
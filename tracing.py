@@ -0,0 +1,283 @@
+"""Lightweight OpenTelemetry-style tracing for generations.
+
+Spans carry trace/span ids, parent links, nanosecond timestamps and
+attributes, and are exported in OTLP/JSON form, so a local OpenTelemetry
+collector (or Jaeger, Tempo, ...) can ingest them without the OTel SDK.
+Every span opened with a `session_id` joins that session's trace, and the most
+recent traces are kept in memory for /debug/trace/<session_id>.
+
+The current span lives in a context variable: it follows asyncio tasks and
+asyncio.to_thread, and a new thread (e.g. a generation worker) rejoins its
+session's trace through the `session_id` argument.
+
+Configuration (environment):
+    TRACE_EXPORTER                       comma-separated: file, otlp (default: none)
+    TRACE_FILE                           file exporter path (default: traces.jsonl)
+    OTEL_EXPORTER_OTLP_TRACES_ENDPOINT   OTLP/HTTP endpoint (default: http://localhost:4318/v1/traces)
+    OTEL_SERVICE_NAME                    resource service.name (default: crewai-generator)
+    TRACE_MAX_SESSIONS                   traces kept for /debug/trace (default: 500)
+"""
+import contextlib
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+EXPORT_INTERVAL_SECONDS = 1.0
+EXPORT_BATCH_SIZE = 256
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'session_id', 'name',
+                 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name, trace_id, parent_id=None, session_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.session_id = session_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {key: value for key, value in (attributes or {}).items() if value is not None}
+        self.error = None
+
+    def set(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        for key, value in attributes.items():
+            self.set(key, value)
+
+    @property
+    def duration_ms(self):
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+    def to_otlp(self):
+        """The span in OTLP/JSON encoding."""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [{'key': key, 'value': otlp_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class SpanExporter:
+    """Batches finished spans on a daemon thread and writes them to a file and/or an OTLP endpoint."""
+
+    def __init__(self, service_name, file_path=None, otlp_endpoint=None):
+        self.service_name = service_name
+        self.file_path = file_path
+        self.otlp_endpoint = otlp_endpoint
+        self.queue = queue.Queue(maxsize=10000)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, name='span-exporter', daemon=True)
+        self.thread.start()
+
+    def export(self, span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def payload(self, spans):
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'crewai-generator'}, 'spans': [span.to_otlp() for span in spans]}],
+        }]}
+
+    def flush(self, spans):
+        body = json.dumps(self.payload(spans))
+        if self.file_path:
+            with open(self.file_path, 'a', encoding='utf-8') as f:
+                f.write(body + '\n')
+        if self.otlp_endpoint:
+            import urllib.request
+            request = urllib.request.Request(
+                self.otlp_endpoint, data=body.encode(), headers={'Content-Type': 'application/json'}
+            )
+            urllib.request.urlopen(request, timeout=5).close()
+
+    def run(self):
+        while True:
+            spans = [self.queue.get()]
+            deadline = time.monotonic() + EXPORT_INTERVAL_SECONDS
+            while len(spans) < EXPORT_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    spans.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.flush(spans)
+            except Exception as e:
+                print(f"Span export failed: {e}")
+
+
+class Tracer:
+    """Creates spans, keeps recent session traces in memory and hands finished spans to the exporter."""
+
+    def __init__(self, exporter=None, max_sessions=500):
+        self.exporter = exporter
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, session_id=None, **attributes):
+        """Open a span under the current one, or under the session's root, or as a new trace."""
+        parent = _current_span.get()
+        if parent is not None and session_id in (None, parent.session_id):
+            span = Span(name, parent.trace_id, parent.span_id, parent.session_id, attributes)
+        else:
+            span = self.start_session_span(name, session_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span)
+
+    def start_session_span(self, name, session_id, attributes):
+        if session_id is None:
+            return Span(name, os.urandom(16).hex(), attributes=attributes)
+        with self.lock:
+            trace = self.sessions.get(session_id)
+            if trace is None:
+                span = Span(name, os.urandom(16).hex(), session_id=session_id, attributes=attributes)
+                self.sessions[session_id] = {'root': span, 'spans': []}
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+                return span
+            root = trace['root']
+            return Span(name, root.trace_id, root.span_id, session_id, attributes)
+
+    def finish(self, span):
+        span.end_ns = time.time_ns()
+        if span.session_id is not None:
+            with self.lock:
+                trace = self.sessions.get(span.session_id)
+                if trace is not None:
+                    trace['spans'].append(span)
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+    def get_trace(self, session_id):
+        """Spans of a session's trace in start order (including unfinished ones), or None."""
+        with self.lock:
+            trace = self.sessions.get(session_id)
+            if trace is None:
+                return None
+            spans = list(trace['spans'])
+            if trace['root'] not in spans:
+                spans.append(trace['root'])
+        return sorted(spans, key=lambda span: span.start_ns)
+
+    def waterfall(self, session_id):
+        """Rows for rendering a session's trace as a waterfall, or None."""
+        spans = self.get_trace(session_id)
+        if spans is None:
+            return None
+        start = spans[0].start_ns
+        end = max((span.end_ns or time.time_ns()) for span in spans)
+        total = max(end - start, 1)
+        by_id = {span.span_id: span for span in spans}
+
+        def depth(span):
+            level = 0
+            while span.parent_id in by_id:
+                span, level = by_id[span.parent_id], level + 1
+            return level
+
+        return [{
+            **span.to_dict(),
+            'depth': depth(span),
+            'offset_ms': round((span.start_ns - start) / 1e6, 3),
+            'left_pct': round(100 * (span.start_ns - start) / total, 2),
+            'width_pct': max(round(100 * ((span.end_ns or end) - span.start_ns) / total, 2), 0.2),
+        } for span in spans]
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Return the process-wide tracer configured from the environment."""
+    global _tracer
+    if _tracer is not None:
+        return _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            exporters = {name.strip() for name in os.getenv('TRACE_EXPORTER', '').lower().split(',') if name.strip()}
+            exporter = None
+            if exporters & {'file', 'otlp'}:
+                exporter = SpanExporter(
+                    os.getenv('OTEL_SERVICE_NAME', 'crewai-generator'),
+                    file_path=os.getenv('TRACE_FILE', 'traces.jsonl') if 'file' in exporters else None,
+                    otlp_endpoint=os.getenv('OTEL_EXPORTER_OTLP_TRACES_ENDPOINT', 'http://localhost:4318/v1/traces')
+                    if 'otlp' in exporters else None,
+                )
+            _tracer = Tracer(exporter, int(os.getenv('TRACE_MAX_SESSIONS', '500')))
+    return _tracer
+
+
+def span(name, session_id=None, **attributes):
+    """Context manager for a span on the process-wide tracer."""
+    return get_tracer().span(name, session_id, **attributes)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def set_attributes(**attributes):
+    """Set attributes on the current span, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attributes(**attributes)
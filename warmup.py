@@ -0,0 +1,119 @@
+"""Background warm-up of heavy dependencies once the server is accepting traffic.
+
+Importing app.py only pulls in Flask and the lightweight engine module. The
+.env file, yaml/zipfile and the provider SDK client are loaded here instead,
+either on first use or in a daemon thread started after the server binds.
+The thread retries the steps readiness depends on with exponential backoff,
+so a transient failure delays /readyz instead of leaving it at 503 forever.
+"""
+import os
+import threading
+import time
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+
+# Backoff between attempts at the required warm-up steps
+WARMUP_RETRY_SECONDS = 1
+WARMUP_MAX_RETRY_SECONDS = 60
+
+warmup_state = {
+    'ready': False,
+    'started_at': None,
+    'seconds': None,
+    'llm_client': None,
+    'packaging': None,
+    'error': None,
+}
+
+
+def load_environment():
+    """Load the .env file exactly once; safe to call on every request."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
+
+
+def warm_llm_client():
+    """Build the default LLM client (or load the replay corpus); returns what was warmed."""
+    from crew_engine import DEFAULT_MODEL, get_gemini_model
+    from llm_replay import get_replay
+
+    api_key = os.getenv('GEMINI_API_KEY')
+    replay = get_replay()
+    if replay is not None and replay.replaying:
+        # Responses come from the recorded corpus; loading it here keeps that off the first request
+        return f"replay:{replay.corpus.stats()['prompts']} prompts"
+    if api_key:
+        get_gemini_model(DEFAULT_MODEL, api_key)
+        return DEFAULT_MODEL
+    # Nothing to warm: generations will use the offline fallback
+    return 'fallback'
+
+
+def warm_required():
+    """The steps readiness depends on: .env, yaml/zipfile and the LLM client."""
+    load_environment()
+    import yaml  # noqa: F401
+    import zipfile  # noqa: F401
+    warmup_state['llm_client'] = warm_llm_client()
+
+
+def warm_optional():
+    """Steps that only save later latency; a failure is recorded but does not block readiness."""
+    try:
+        # Spawn the packaging workers now rather than on the first download
+        from packaging_pool import warm_packaging_pool
+        warmup_state['packaging'] = warm_packaging_pool()
+
+        # Pre-generate the popular-domain catalog in its own background thread
+        from crew_catalog import get_catalog
+        catalog = get_catalog()
+        if catalog is not None:
+            catalog.start()
+    except Exception as e:
+        warmup_state['error'] = str(e)
+        print(f"Optional warm-up step failed: {e}")
+
+
+def warm_up():
+    """Run the required steps until they succeed (with backoff), mark the process ready, then the optional ones."""
+    started = time.perf_counter()
+    delay = WARMUP_RETRY_SECONDS
+    while True:
+        try:
+            warm_required()
+            break
+        except Exception as e:
+            warmup_state['error'] = str(e)
+            print(f"Warm-up failed: {e}; retrying in {delay}s")
+            time.sleep(delay)
+            delay = min(delay * 2, WARMUP_MAX_RETRY_SECONDS)
+    warmup_state['error'] = None
+    warmup_state['ready'] = True
+    warm_optional()
+    warmup_state['seconds'] = round(time.perf_counter() - started, 3)
+
+
+def start_warmup():
+    """Start the warm-up thread once; later calls are no-ops."""
+    global _warmup_thread
+    if _warmup_thread is not None:
+        return
+    with _warmup_lock:
+        if _warmup_thread is None:
+            warmup_state['started_at'] = time.time()
+            _warmup_thread = threading.Thread(target=warm_up, name='warmup', daemon=True)
+            _warmup_thread.start()
+
+
+def is_ready():
+    return warmup_state['ready']